@@ -1,18 +1,134 @@
 
-import sys
 import os
 import math
+import threading
+import io
+import asyncio
+import contextlib
+import functools
+import itertools
+import concurrent.futures
+import collections
+import collections.abc
+
+import numpy as np
 
 from clip.Utils import *
 from clip.read_responses import *
 from clip.read_ORIGEN_output import *
 from clip.Predict import *
 from clip.read_serpent_output import *
+from clip.response_library import *
+from clip.cache import cache_settings
+from clip.messages import *
 
 default_data_folder = "Data"
 
 
 
+def load_binned_response(filename):
+    return binned_spectrum(*read_binned_response(filename))
+
+def load_isotope_response(filename):
+    #Both the decay and the mass responses are read in one pass.
+    return isotope_response(*read_isotope_responses(filename))
+
+def load_sampled_response(filename):
+    return sampled_spectrum(*read_sampled_response(filename))
+
+def find_response_files(folder):
+    """
+    Find the response files in a response folder, by fuel type.
+    """
+    
+    filenames = {}
+    
+    if os.path.isdir(folder):
+        for file in os.listdir(folder):
+            filenames[file[:-4]] = folder + file #remove the .txt
+            
+    return filenames
+
+class lazy_responses(collections.abc.Mapping):
+    """
+    The responses in a response folder, by fuel type. The fuel types and the sources of their responses, 
+    e.g. the response files, are found when the folder is opened, and each response is loaded from its 
+    source with the loader when it is first used.
+    """
+    
+    def __init__(self, sources, loader):
+        self.loader = loader
+        self.sources = sources
+        self.responses = {}
+        self.lock = threading.Lock()
+        
+    def __getitem__(self, fuel):
+        with self.lock:
+            if fuel not in self.responses:
+                self.responses[fuel] = self.loader(self.sources[fuel])
+            return self.responses[fuel]
+        
+    def __contains__(self, fuel):
+        return fuel in self.sources
+        
+    def __iter__(self):
+        return iter(self.sources)
+    
+    def __len__(self):
+        return len(self.sources)
+    
+#The parameters of a prediction, from get_prediction_config: the fuel type, the gamma and beta prediction 
+#modes, the burnup code output and the ORIGEN cooling time header. The parameters can not be changed.
+prediction_config = collections.namedtuple("prediction_config", ["fuel_type", "gamma_prediction_mode", "beta_prediction_mode", "burnup_calculation", "ORIGEN_cooling_time_header"])
+
+#The result of a prediction for one file in a batch: the prediction and uncertainty, None or a dictionary 
+#with the type and message of the error if the prediction failed, and the warnings, e.g. for missing isotopes.
+prediction_result = collections.namedtuple("prediction_result", ["filename", "prediction", "uncertainty", "error", "warnings"], defaults = [()])
+
+def predict_file(predictor, filename, config):
+    """
+    Make a prediction for one file, catching errors. The errors that Clip reports when a prediction 
+    fails, e.g. for mismatched bins, are returned as the error instead of a silent zero prediction, 
+    and the warnings are returned with the prediction. Only the messages of this prediction are 
+    collected, so predictions can be made in several threads at once.
+    """
+    
+    with collect_messages() as messages:
+        try:
+            result = predictor.predict(filename, config)
+        except Exception as e:
+            #With the errors reported before the exception, e.g. a missing cooling time
+            return prediction_result(filename, 0, 0, {"type": type(e).__name__, "message": "\n".join(get_errors(messages) + [str(e)])}, get_warnings(messages))
+    
+    errors = "\n".join(get_errors(messages))
+    warnings = get_warnings(messages)
+    
+    if result is None:
+        if len(errors) == 0:
+            errors = "No prediction was made for the burnup calculation " + str(config.burnup_calculation)
+        return prediction_result(filename, 0, 0, {"type": "PredictionError", "message": errors}, warnings)
+    
+    if len(errors) > 0:
+        return prediction_result(filename, result[0], result[1], {"type": "PredictionError", "message": errors}, warnings)
+    
+    return prediction_result(filename, result[0], result[1], None, warnings)
+
+#The Clip instance of each worker process of predict_many, with the responses loaded once per worker.
+worker_predictor = None
+
+def initialize_prediction_worker(data_folder, worker_cache_settings, lookup_table_settings = None):
+    global worker_predictor
+    
+    cache_settings.update(worker_cache_settings)
+    with contextlib.redirect_stdout(io.StringIO()):
+        worker_predictor = Clip(data_folder)
+        #The same lookup tables as in the parent process, which are tabulated again in each worker.
+        if lookup_table_settings is not None:
+            worker_predictor.set_sampled_lookup_tables(*lookup_table_settings)
+
+def predict_in_worker(filename, config):
+    return predict_file(worker_predictor, filename, config)
+
 class Clip:
     
     fuel_type = ""
@@ -24,15 +140,13 @@ class Clip:
     
     ready_to_predict = False
     
-    binned_beta_responses = {}
-    binned_gamma_responses = {}
-    isotope_beta_responses = {}
-    isotope_gamma_responses = {}
-    sampled_beta_responses = {}
-    sampled_gamma_responses = {}
-    
     def __init__(self, data_folder = default_data_folder):
+        self.data_folder = data_folder
         self.load_responses(data_folder)
+        self.prediction_executor = None
+        self.prediction_workers = 0
+        self.executor_lock = threading.Lock()
+        self.lookup_table_settings = None
         self.fuel_type = ""
         self.gamma_prediction_mode = ""
         self.beta_prediction_mode = ""
@@ -43,267 +157,314 @@ class Clip:
         self.ready_to_predict = False
         
     def load_responses(self, data_folder):
-        if os.path.isdir(data_folder + "/Binned_beta_response/"):
-            for file in os.listdir(data_folder + "/Binned_beta_response/"):
-                filename = file[:-4] #remove the .txt
-                
-                #Load the data and save it.
-                bin_edges, bin_count, bin_uncertainty = read_binned_response(data_folder + "/Binned_beta_response/" + file)
-                data = binned_spectrum(bin_edges, bin_count, bin_uncertainty)
-                self.binned_beta_responses[filename] = data
-        
-        if os.path.isdir(data_folder + "/Binned_gamma_response/"):
-            for file in os.listdir(data_folder + "/Binned_gamma_response/"):
-                filename = file[:-4] #remove the .txt
-                
-                #Load the data and save it.
-                bin_edges, bin_count, bin_uncertainty = read_binned_response(data_folder + "/Binned_gamma_response/" + file)
-                data = binned_spectrum(bin_edges, bin_count, bin_uncertainty)
-                self.binned_gamma_responses[filename] = data
-         
-        if os.path.isdir(data_folder + "/Isotope_beta_response/"):
-            for file in os.listdir(data_folder + "/Isotope_beta_response/"):
-                filename = file[:-4] #remove the .txt
-                
-                #Load the data and save it.
-                isotope_list, isotope_activity_response, isotope_activity_uncertainty = read_isotope_response(data_folder + "/Isotope_beta_response/" + file, "decay")
-                isotope_list2, isotope_mass_response, isotope_mass_uncertainty = read_isotope_response(data_folder + "/Isotope_beta_response/" + file, "mass")
-                
-                data = isotope_response(isotope_list, isotope_activity_response, isotope_activity_uncertainty, isotope_mass_response, isotope_mass_uncertainty)
-                self.isotope_beta_responses[filename] = data
+        """
+        Find the responses in the response folders of the data folder, or in a compiled response library. 
+        The responses are only parsed, or read from the library, when they are first used.
+        """
         
-        if os.path.isdir(data_folder + "/Isotope_gamma_response/"):
-            for file in os.listdir(data_folder + "/Isotope_gamma_response/"):
-                filename = file[:-4] #remove the .txt
-                
-                #Load the data and save it.
-                isotope_list, isotope_activity_response, isotope_activity_uncertainty = read_isotope_response(data_folder + "/Isotope_gamma_response/" + file, "decay")
-                isotope_list2, isotope_mass_response, isotope_mass_uncertainty = read_isotope_response(data_folder + "/Isotope_gamma_response/" + file, "mass")
-                
-                data = isotope_response(isotope_list, isotope_activity_response, isotope_activity_uncertainty, isotope_mass_response, isotope_mass_uncertainty)
-                self.isotope_gamma_responses[filename] = data
+        if is_response_library(data_folder):
+            library = response_library(data_folder)
+            
+            responses = {}
+            for folder in library_response_formats:
+                fuel_types = library.get_fuel_types(folder)
+                responses[folder] = lazy_responses(dict(zip(fuel_types, fuel_types)), functools.partial(library.load_response, folder))
+        else:
+            loaders = {"binned": load_binned_response, "isotope": load_isotope_response, "sampled": load_sampled_response}
+            
+            responses = {}
+            for folder in library_response_formats:
+                responses[folder] = lazy_responses(find_response_files(data_folder + "/" + folder + "/"), loaders[library_response_formats[folder]])
         
-        if os.path.isdir(data_folder + "/Sampled_beta_response/"):        
-            for file in os.listdir(data_folder + "/Sampled_beta_response/"):
-                filename = file[:-4] #remove the .txt
-                
-                #Load the data and save it.
-                sampled_energies, response, uncertainty = read_sampled_response(data_folder + "/Sampled_beta_response/" + file)
-                data = sampled_spectrum(sampled_energies, response, uncertainty)
-                self.sampled_beta_responses[filename] = data
-           
-        if os.path.isdir(data_folder + "/Sampled_gamma_response/"):
-            for file in os.listdir(data_folder + "/Sampled_gamma_response/"):
-                filename = file[:-4] #remove the .txt
-                
-                #Load the data and save it.
-                sampled_energies, response, uncertainty = read_sampled_response(data_folder + "/Sampled_gamma_response/" + file)
-                data = sampled_spectrum(sampled_energies, response, uncertainty)
-                self.sampled_gamma_responses[filename] = data
-                
-        print("Clip initialization: loaded " + str(len(self.binned_beta_responses)) + " binned beta responses.")
-        print("Clip initialization: loaded " + str(len(self.binned_gamma_responses)) + " binned gamma responses.")
-        print("Clip initialization: loaded " + str(len(self.isotope_beta_responses)) + " isotope beta responses.")
-        print("Clip initialization: loaded " + str(len(self.isotope_gamma_responses)) + " isotope gamma responses.")
-        print("Clip initialization: loaded " + str(len(self.sampled_beta_responses)) + " sampled beta responses.")
-        print("Clip initialization: loaded " + str(len(self.sampled_gamma_responses)) + " sampled gamma responses.")
+        self.binned_beta_responses = responses["Binned_beta_response"]
+        self.binned_gamma_responses = responses["Binned_gamma_response"]
+        self.isotope_beta_responses = responses["Isotope_beta_response"]
+        self.isotope_gamma_responses = responses["Isotope_gamma_response"]
+        self.sampled_beta_responses = responses["Sampled_beta_response"]
+        self.sampled_gamma_responses = responses["Sampled_gamma_response"]
         
+        print("Clip initialization: found " + str(len(self.binned_beta_responses)) + " binned beta, " + str(len(self.binned_gamma_responses)) + " binned gamma, " +
+              str(len(self.isotope_beta_responses)) + " isotope beta, " + str(len(self.isotope_gamma_responses)) + " isotope gamma, " + 
+              str(len(self.sampled_beta_responses)) + " sampled beta and " + str(len(self.sampled_gamma_responses)) + " sampled gamma responses.")
         
-    def set_prediction_parameters(self, fuel, gamma, beta, burnup, ORIGEN_header = ""):
-
-        self.load_OK = True
+    def set_sampled_lookup_tables(self, number_of_points = default_lookup_table_points, target_error = None):
+        """
+        Evaluate the sampled responses by linear interpolation in dense lookup tables instead of by 
+        their cubic splines, which is faster for spectra with very many gamma lines. The tables have 
+        number_of_points points, or as many as needed for the target relative error if one is given. 
+        Returns the maximum relative interpolation error of each sampled response, as dictionaries 
+        by fuel type for the \"beta\" and \"gamma\" responses.
+        The worker processes of predict_many and get_prediction_executor use the same lookup tables, 
+        and a running pool of worker processes is stopped, to be started again with the tables.
+        """
         
-        if burnup != "ORIGEN" and burnup != "Serpent_bumat" and burnup != "Serpent_gamma":
-            print("Asked for a prediction based on a burnup calculation from: " + burnup + ". Supported outputs are ORIGEN, Serpent_bumat and Serpent_gamma.")
-            self.load_OK = False
-        else:
-            self.burnup_calculation = burnup
-            if burnup == "ORIGEN":
-                if ORIGEN_header != "":
-                    self.ORIGEN_cooling_time_header = ORIGEN_header
-                else:
-                    print ("ORIGEN prediciton requested, but no cooling time header was provided.")
-                    self.load_OK = False
-        
-        if gamma != "binned" and gamma != "sampled" and gamma != "isotope" and gamma != "none":
-            print("Asked for a gamma response of type: " + str(gamma) + ". Supported responses are binned, sampled, isotope or none.")
-            self.load_OK = False
-        else:
-            self.gamma_prediction_mode = gamma
-            
-        if beta != "isotope" and beta != "none":
-            print("Asked for a beta response of type: " + str(beta) + ". Supported responses are isotope or none.")
-            self.load_OK = False
-        else:
-            self.beta_prediction_mode = beta
-            
-        if gamma == "binned":
-            if fuel in self.binned_gamma_responses:
-                self.fuel_type = fuel
-            else:
-                print("Asked for a binned gamma response for fuel: " + str(fuel) + ", but no such response was found in the loaded responses.")
-                self.load_OK = False
-            
-        if beta == "binned":
-            if fuel in self.binned_beta_responses:
-                self.fuel_type = fuel
-            else:
-                print("Asked for a binned beta response for fuel: " + str(fuel) + ", but no such response was found in the loaded responses.")
-                self.load_OK = False
-            
-            
-        if gamma == "sampled":
-            if fuel in self.sampled_gamma_responses:
-                self.fuel_type = fuel
-            else:
-                print("Asked for a sampled gamma response for fuel: " + str(fuel) + ", but no such response was found in the loaded responses.")
-                self.load_OK = False
-            
-        if beta == "sampled":
-            if fuel in self.sampled_beta_responses:
-                self.fuel_type = fuel
-            else:
-                print("Asked for a sampled beta response for fuel: " + str(fuel) + ", but no such response was found in the loaded responses.")
-                self.load_OK = False
+        self.lookup_table_settings = (number_of_points, target_error)
+        self.shutdown_prediction_executor()
+        
+        errors = {"beta": {}, "gamma": {}}
+        
+        for radiation, responses in [("beta", self.sampled_beta_responses), ("gamma", self.sampled_gamma_responses)]:
+            for fuel in responses:
+                energies, response, uncertainty = responses[fuel].get_response()
+                if len(energies) < 4:
+                    #Malformed responses can not be interpolated.
+                    continue
+                errors[radiation][fuel] = responses[fuel].set_lookup_table(number_of_points, target_error)
+                print("Clip: tabulated the sampled " + radiation + " response " + fuel + " with a maximum relative error of " + str(errors[radiation][fuel]))
+        
+        return errors
+        
+    def check_prediction_config(self, config):
+        """
+        Check that predictions can be made with a prediction configuration, printing what is wrong if they can not.
+        """
+        
+        config_OK = True
+        
+        if config.burnup_calculation != "ORIGEN" and config.burnup_calculation != "Serpent_bumat" and config.burnup_calculation != "Serpent_gamma":
+            report_error("Asked for a prediction based on a burnup calculation from: " + str(config.burnup_calculation) + ". Supported outputs are ORIGEN, Serpent_bumat and Serpent_gamma.")
+            config_OK = False
+        elif config.burnup_calculation == "ORIGEN" and config.ORIGEN_cooling_time_header == "":
+            report_error("ORIGEN prediciton requested, but no cooling time header was provided.")
+            config_OK = False
+        
+        if config.gamma_prediction_mode != "binned" and config.gamma_prediction_mode != "sampled" and config.gamma_prediction_mode != "isotope" and config.gamma_prediction_mode != "none":
+            report_error("Asked for a gamma response of type: " + str(config.gamma_prediction_mode) + ". Supported responses are binned, sampled, isotope or none.")
+            config_OK = False
             
-        if gamma == "isotope":
-            if fuel in self.isotope_gamma_responses:
-                self.fuel_type = fuel
-            else:
-                print("Asked for an isotope gamma response for fuel: " + str(fuel) + ", but no such response was found in the loaded responses.")
-                self.load_OK = False
+        if config.beta_prediction_mode != "isotope" and config.beta_prediction_mode != "none":
+            report_error("Asked for a beta response of type: " + str(config.beta_prediction_mode) + ". Supported responses are isotope or none.")
+            config_OK = False
+        
+        gamma_responses = {"binned": self.binned_gamma_responses, "sampled": self.sampled_gamma_responses, "isotope": self.isotope_gamma_responses}
+        
+        if config.gamma_prediction_mode in gamma_responses and config.fuel_type not in gamma_responses[config.gamma_prediction_mode]:
+            report_error("Asked for " + ("an " if config.gamma_prediction_mode == "isotope" else "a ") + config.gamma_prediction_mode + " gamma response for fuel: " + str(config.fuel_type) + ", but no such response was found in the loaded responses.")
+            config_OK = False
             
-        if beta == "isotope":
-            if fuel in self.isotope_beta_responses:
-                self.fuel_type = fuel
-            else:
-                print("Asked for an isotope beta response for fuel: " + str(fuel) + ", but no such response was found in the loaded responses.")
-                self.load_OK = False
+        if config.beta_prediction_mode == "isotope" and config.fuel_type not in self.isotope_beta_responses:
+            report_error("Asked for an isotope beta response for fuel: " + str(config.fuel_type) + ", but no such response was found in the loaded responses.")
+            config_OK = False
             
+        return config_OK
+        
+    def get_prediction_config(self, fuel, gamma, beta, burnup, ORIGEN_header = ""):
+        """
+        Get a prediction configuration, for the same parameters as set_prediction_parameters. 
+        The configuration can not be changed, and can be given to the predict methods instead of 
+        setting the prediction parameters of the instance, so that one instance can make predictions 
+        with different configurations from many threads at once. 
+        Returns None, after printing what is wrong, if predictions can not be made with the configuration.
+        """
+        
+        config = prediction_config(fuel, gamma, beta, burnup, ORIGEN_header)
+        
+        if not self.check_prediction_config(config):
+            report_error("Cannot make predictions for the selected response type and burnup calculation")
+            return None
+        
+        return config
+        
+    def get_current_config(self):
+        """
+        Get the prediction configuration set with set_prediction_parameters.
+        """
+        
+        return prediction_config(self.fuel_type, self.gamma_prediction_mode, self.beta_prediction_mode, self.burnup_calculation, self.ORIGEN_cooling_time_header)
+        
+    def get_checked_config(self, config):
+        """
+        Get the configuration of a prediction: config, checked as by get_prediction_config, or the one set with 
+        set_prediction_parameters if config is None. Returns None, after reporting what is wrong, if predictions 
+        can not be made with config.
+        """
+        
+        if config is None:
+            return self.get_current_config()
+        
+        if not self.check_prediction_config(config):
+            #A configuration that was not made with get_prediction_config
+            report_error("Cannot make predictions for the selected response type and burnup calculation")
+            return None
+        
+        return config
+        
+    def set_prediction_parameters(self, fuel, gamma, beta, burnup, ORIGEN_header = ""):
+
+        config = self.get_prediction_config(fuel, gamma, beta, burnup, ORIGEN_header)
+        
+        self.load_OK = config is not None
+        
         if self.load_OK == False:
             self.burnup_calculation = ""
             self.gamma_prediction_mode = ""
             self.beta_prediction_mode = ""
-            self.burnup_calculation = ""
-            print("Cannot make predictions for the selected response type and burnup calculation")
         else:
+            self.fuel_type = config.fuel_type
+            self.gamma_prediction_mode = config.gamma_prediction_mode
+            self.beta_prediction_mode = config.beta_prediction_mode
+            self.burnup_calculation = config.burnup_calculation
+            self.ORIGEN_cooling_time_header = config.ORIGEN_cooling_time_header
             self.ready_to_predict = True
         
-    def predict(self, filename):
+    def predict(self, filename, config = None):
+        """
+        Make a prediction for a burnup output file. The prediction parameters are taken from config 
+        if it is given, and otherwise from set_prediction_parameters. A given config is checked as by 
+        get_prediction_config. Returns the prediction and its uncertainty, or None, after reporting what 
+        is wrong, if predictions can not be made with the configuration.
+        """
+        
+        result = self.predict_breakdown(filename, config)
+        
+        if result is None:
+            return None
+        
+        return result[0], result[1]
+        
+    def predict_breakdown(self, filename, config = None, gradients = False):
+        """
+        Make a prediction for a burnup output file as predict does, and get the contributions to it 
+        from the same computation. Returns the prediction, its uncertainty and a dictionary with the 
+        prediction_breakdown of the \"gamma\" and the \"beta\" prediction, or None if it was not made. 
+        Bins are labelled by their index, isotopes by their names, and the gamma lines of sampled 
+        Serpent predictions are grouped by the ZAI of their nuclide. 
+        If gradients is True, the breakdowns also have the derivatives of the prediction with respect to 
+        each bin count or isotope mass, and to each response value: the binned, isotope or sampled values 
+        of the response that was used. For grouped gamma lines, the derivatives with respect to the contents are 
+        those of each line, in content_gradient, with the index of the line in content_labels.
+        """
+        
+        config = self.get_checked_config(config)
+        if config is None:
+            return None
         
         gamma_prediction = 0
         gamma_uncertainty = 0
         beta_prediction = 0
         beta_uncertainty = 0
+        gamma_breakdown = None
+        beta_breakdown = None
         
-        if self.burnup_calculation == "ORIGEN":
-            if self.gamma_prediction_mode == "binned":
+        if config.burnup_calculation == "ORIGEN":
+            
+            #Read the output file once, all gamma and beta predictions are made from it.
+            with read_ORIGEN_output(filename) as ORIGEN_data:
+            
+                if config.gamma_prediction_mode == "binned":
                 
-                #Load data
-                spectrum_edges, spectrum_counts = read_ORIGEN_gamma_spectrum(filename, self.ORIGEN_cooling_time_header) 
-                response_edges, response_counts, response_uncertainties = self.binned_gamma_responses[self.fuel_type].get_response()
+                    #Load data
+                    spectrum_edges, spectrum_counts = read_ORIGEN_gamma_spectrum(ORIGEN_data, config.ORIGEN_cooling_time_header) 
+                    response_edges, response_counts, response_uncertainties = self.binned_gamma_responses[config.fuel_type].get_response()
     
-                #Check that data has been loaded
-                if len(spectrum_edges) == 1 or len(response_edges) == 1:
-                    print("Failed in loading data for ORIGEN binned response prediction")
-                    gamma_prediction, gamma_uncertainty = 0,0
-                    
-                #Check that bin structure matches.
-                if len(spectrum_edges) != len(response_edges):
-                   print("Different bin structure for the gamma emissions and the simulated response")
-                   gamma_prediction, gamma_uncertainty = 0,0
-                    
-                for i in range(0,len(spectrum_edges)):
-                   if spectrum_edges[i] != response_edges[i]:
-                       print("Different bin structure for the gamma emissions and the simulated response")
-                       gamma_prediction, gamma_uncertainty = 0,0
-                        
-                #Uncertainty in gamma spectrum not provided by ORIGEN, so do not include here.
-                spectrum_uncertainties = [0] * len(spectrum_counts)    
-                gamma_prediction, gamma_uncertainty = Predict_binned_response(spectrum_counts, spectrum_uncertainties, response_counts, response_uncertainties)
-            
-            elif self.gamma_prediction_mode == "sampled":
+                    #Check that data has been loaded, and that bin structure matches. Otherwise there is no gamma prediction.
+                    if len(spectrum_edges) == 1 or len(response_edges) == 1:
+                        report_error("Failed in loading data for ORIGEN binned response prediction")
+                    elif list(spectrum_edges) != list(response_edges):
+                        report_error("Different bin structure for the gamma emissions and the simulated response")
+                    else:
+                        #Uncertainty in gamma spectrum not provided by ORIGEN, so do not include here.
+                        spectrum_uncertainties = [0] * len(spectrum_counts)    
+                        gamma_breakdown = Predict_binned_response(spectrum_counts, spectrum_uncertainties, response_counts, response_uncertainties, breakdown = True, gradients = gradients)
+            
+                elif config.gamma_prediction_mode == "sampled":
                 
-                #Load data
-                spectrum_edges, spectrum_counts = read_ORIGEN_gamma_spectrum(filename, self.ORIGEN_cooling_time_header) 
-                sampled_energies, sampled_response, sampled_uncertainties = self.sampled_gamma_responses[self.fuel_type].get_response()
+                    #Load data
+                    spectrum_edges, spectrum_counts = read_ORIGEN_gamma_spectrum(ORIGEN_data, config.ORIGEN_cooling_time_header) 
                 
-                #Convert from sampled response to the binning used in the ORIGEN gamma spectrum
-                binned_response = get_binned_response_function(sampled_energies, sampled_response, spectrum_edges)
-                binned_response_uncertainties = get_binned_response_function(sampled_energies, sampled_uncertainties, spectrum_edges)
+                    #Convert from sampled response to the binning used in the ORIGEN gamma spectrum, once for each binning
+                    binned_response, binned_response_uncertainties = self.sampled_gamma_responses[config.fuel_type].get_binned_response(spectrum_edges)
                   
-                #Uncertainty in gamma spectrum not provided by ORIGEN, so do not include here.
-                spectrum_uncertainties = [0] * len(spectrum_counts)    
-                gamma_prediction, gamma_uncertainty = Predict_binned_response(spectrum_counts, spectrum_uncertainties, binned_response, binned_response_uncertainties)    
+                    #Uncertainty in gamma spectrum not provided by ORIGEN, so do not include here.
+                    spectrum_uncertainties = [0] * len(spectrum_counts)    
+                    gamma_breakdown = Predict_binned_response(spectrum_counts, spectrum_uncertainties, binned_response, binned_response_uncertainties, breakdown = True, gradients = gradients)
+                
+                    if gradients:
+                        #From the derivatives with respect to the binned response to those with respect to the sampled values
+                        binned_basis = self.sampled_gamma_responses[config.fuel_type].get_binned_basis(spectrum_edges)
+                        gamma_breakdown.set_gradients(gamma_breakdown.content_gradient, gamma_breakdown.response_gradient @ binned_basis)
             
-            elif self.gamma_prediction_mode == "isotope":
+                elif config.gamma_prediction_mode == "isotope":
                 
-                isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_gamma_responses[self.fuel_type].get_response()
+                    isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_gamma_responses[config.fuel_type].get_response()
     
-                #read the isotope_list that we have a response for.
-                isotope_mass_contents = read_ORIGEN_isotope_contents(filename, self.ORIGEN_cooling_time_header, isotope_list)
+                    #read the isotope_list that we have a response for.
+                    isotope_mass_contents = read_ORIGEN_isotope_contents(ORIGEN_data, config.ORIGEN_cooling_time_header, isotope_list)
             
-                #ORIGEN provides no uncertainties on each isotope mass, so neglect this 
-                #uncertainty contribution for now.
-                isotope_uncertainties = [0] * len(isotope_mass_contents)  
-                gamma_prediction, gamma_uncertainty = Predict_isotope_response(isotope_mass_contents, isotope_uncertainties, response, response_uncertainty)
+                    #ORIGEN provides no uncertainties on each isotope mass, so neglect this 
+                    #uncertainty contribution for now.
+                    isotope_uncertainties = [0] * len(isotope_mass_contents)  
+                    gamma_breakdown = Predict_isotope_response(isotope_mass_contents, isotope_uncertainties, response, response_uncertainty, breakdown = True, gradients = gradients)
+                    gamma_breakdown.set_labels(isotope_list)
             
-            if self.beta_prediction_mode == "isotope":
+                if config.beta_prediction_mode == "isotope":
                 
-                #Read all isotopes for which we have a respone defined
-                isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_beta_responses[self.fuel_type].get_response()
+                    #Read all isotopes for which we have a respone defined
+                    isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_beta_responses[config.fuel_type].get_response()
                 
-                #read the isotope_list that we have a response for.
-                isotope_mass_contents = read_ORIGEN_isotope_contents(filename, self.ORIGEN_cooling_time_header, isotope_list)
+                    #read the isotope_list that we have a response for.
+                    isotope_mass_contents = read_ORIGEN_isotope_contents(ORIGEN_data, config.ORIGEN_cooling_time_header, isotope_list)
+            
+                    #ORIGEN provides no uncertainties on each isotope mass, so neglect this 
+                    #uncertainty contribution for now.
+                    isotope_uncertainties = [0] * len(isotope_mass_contents)  
+                    beta_breakdown = Predict_isotope_response(isotope_mass_contents, isotope_uncertainties, response, response_uncertainty, breakdown = True, gradients = gradients)
+                    beta_breakdown.set_labels(isotope_list)
             
-                #ORIGEN provides no uncertainties on each isotope mass, so neglect this 
-                #uncertainty contribution for now.
-                isotope_uncertainties = [0] * len(isotope_mass_contents)  
-                beta_prediction, beta_uncertainty = Predict_isotope_response(isotope_mass_contents, isotope_uncertainties, response, response_uncertainty)
                                                     
+            if gamma_breakdown is not None:
+                gamma_prediction, gamma_uncertainty = gamma_breakdown.prediction, gamma_breakdown.uncertainty
+            if beta_breakdown is not None:
+                beta_prediction, beta_uncertainty = beta_breakdown.prediction, beta_breakdown.uncertainty
+            
             prediction = gamma_prediction + beta_prediction
             uncertainty = math.sqrt(gamma_uncertainty**2 + beta_uncertainty**2)
                 
-            return prediction, uncertainty
+            return prediction, uncertainty, {"gamma": gamma_breakdown, "beta": beta_breakdown}
             
-        if self.burnup_calculation == "Serpent_gamma":
-            if self.gamma_prediction_mode == "binned":
+        if config.burnup_calculation == "Serpent_gamma":
+            if config.gamma_prediction_mode == "binned":
                 spectrum_energies, spectrum_counts = read_serpent_gamma_spectrum(filename)
-                response_edges, response_counts, response_uncertainties = self.binned_gamma_responses[self.fuel_type].get_response()
+                response_edges, response_counts, response_uncertainties = self.binned_gamma_responses[config.fuel_type].get_response()
                 
                 ORIGEN_binned_spectrum = convert_to_ORIGEN_binning(spectrum_energies, spectrum_counts, response_edges)
                 
                 #Uncertainty in gamma spectrum not provided by serpent, so do not include here.
                 ORIGEN_binnned_uncertainties = [0] * len(ORIGEN_binned_spectrum)    
-                gamma_prediction, gamma_uncertainty = Predict_binned_response(ORIGEN_binned_spectrum, ORIGEN_binnned_uncertainties, response_counts, response_uncertainties)    
+                gamma_breakdown = Predict_binned_response(ORIGEN_binned_spectrum, ORIGEN_binnned_uncertainties, response_counts, response_uncertainties, breakdown = True, gradients = gradients)
                 
-            elif self.gamma_prediction_mode == "sampled":
-                spectrum_energies, spectrum_counts = read_serpent_gamma_spectrum(filename)
-                sampled_energies, sampled_response, sampled_uncertainties = self.sampled_gamma_responses[self.fuel_type].get_response()
+            elif config.gamma_prediction_mode == "sampled":
+                nuclide_ZAI, spectrum_energies, spectrum_counts = read_serpent_gamma_lines(filename)
                 
                 #Uncertainties not provided by Serpent gamma spectrum output
-                spectrum_uncertainties = [0] * len(spectrum_energies)
+                spectrum_uncertainties = np.zeros(len(spectrum_energies))
                 
-                gamma_prediction, gamma_uncertainty = Predict_sampled_response(spectrum_energies, spectrum_counts, spectrum_uncertainties, sampled_energies, sampled_response, sampled_uncertainties)
-            elif self.gamma_prediction_mode == "isotope":
-                print("Prediction requisted for Serpent_gamma, but an isotope response was requested.")
-                print("Serpent_gamma can be used with a binned or a sampled response.")
-                return 0,0
+                #The loaded response has its interpolation built already.
+                gamma_breakdown = Predict_sampled_spectrum_response(spectrum_energies, spectrum_counts, spectrum_uncertainties, self.sampled_gamma_responses[config.fuel_type], breakdown = True, gradients = gradients)[0].group(nuclide_ZAI)
+            elif config.gamma_prediction_mode == "isotope":
+                report_error("Prediction requisted for Serpent_gamma, but an isotope response was requested.")
+                report_error("Serpent_gamma can be used with a binned or a sampled response.")
+                return 0, 0, {"gamma": None, "beta": None}
             
             
-            if self.beta_prediction_mode != "none":
-                print("Beta prediction requiested for Serpent_gamma burnup results, no beta data is available")
-                print("Beta predictions require a Serpent_bumat burnup result.")
-                return 0,0           
+            if config.beta_prediction_mode != "none":
+                report_error("Beta prediction requiested for Serpent_gamma burnup results, no beta data is available")
+                report_error("Beta predictions require a Serpent_bumat burnup result.")
+                return 0, 0, {"gamma": None, "beta": None}           
 
+            if gamma_breakdown is not None:
+                gamma_prediction, gamma_uncertainty = gamma_breakdown.prediction, gamma_breakdown.uncertainty
+            if beta_breakdown is not None:
+                beta_prediction, beta_uncertainty = beta_breakdown.prediction, beta_breakdown.uncertainty
+            
             prediction = gamma_prediction + beta_prediction
             uncertainty = math.sqrt(gamma_uncertainty**2 + beta_uncertainty**2)
                 
-            return prediction, uncertainty 
+            return prediction, uncertainty, {"gamma": gamma_breakdown, "beta": beta_breakdown} 
             
-        if self.burnup_calculation == "Serpent_bumat":
-            if self.gamma_prediction_mode == "isotope":
-                isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_gamma_responses[self.fuel_type].get_response()
+        if config.burnup_calculation == "Serpent_bumat":
+            if config.gamma_prediction_mode == "isotope":
+                isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_gamma_responses[config.fuel_type].get_response()
     
                 #read the isotope_list that we have a response for.
                 isotope_mass_contents = read_serpent_isotope_contents(filename, isotope_list)
@@ -311,14 +472,15 @@ class Clip:
                 #Serpent provides no uncertainties on each isotope mass, so neglect this 
                 #uncertainty contribution for now.
                 isotope_uncertainties = [0] * len(isotope_mass_contents)  
-                gamma_prediction, gamma_uncertainty = Predict_isotope_response(isotope_mass_contents, isotope_uncertainties, response, response_uncertainty)
+                gamma_breakdown = Predict_isotope_response(isotope_mass_contents, isotope_uncertainties, response, response_uncertainty, breakdown = True, gradients = gradients)
+                gamma_breakdown.set_labels(isotope_list)
             else:
-                print ("Prediction based on a Serpent_bumat burnup calculation requested, only isotope response function can be used.")
-                print("The requested response function was: " + str(self.gamma_prediction_mode))
-                return 0,0
+                report_error("Prediction based on a Serpent_bumat burnup calculation requested, only isotope response function can be used.")
+                report_error("The requested response function was: " + str(config.gamma_prediction_mode))
+                return 0, 0, {"gamma": None, "beta": None}
 
-            if self.beta_prediction_mode == "isotope":
-                isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_beta_responses[self.fuel_type].get_response()
+            if config.beta_prediction_mode == "isotope":
+                isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_beta_responses[config.fuel_type].get_response()
     
                 #read the isotope_list that we have a response for.
                 isotope_mass_contents = read_serpent_isotope_contents(filename, isotope_list)
@@ -326,19 +488,449 @@ class Clip:
                 #Serpent provides no uncertainties on each isotope mass, so neglect this 
                 #uncertainty contribution for now.
                 isotope_uncertainties = [0] * len(isotope_mass_contents)  
-                beta_prediction, beta_uncertainty = Predict_isotope_response(isotope_mass_contents, isotope_uncertainties, response, response_uncertainty)
-            elif self.beta_prediction_mode == "none":
+                beta_breakdown = Predict_isotope_response(isotope_mass_contents, isotope_uncertainties, response, response_uncertainty, breakdown = True, gradients = gradients)
+                beta_breakdown.set_labels(isotope_list)
+            elif config.beta_prediction_mode == "none":
                 beta_prediction = 0
                 beta_uncertainty = 0
             else:
-                  print("Requested prediction with beta contribution: " + str(self.beta_prediction_mode) + ", but only isotope supported.")
-                  return 0,0
+                  report_error("Requested prediction with beta contribution: " + str(config.beta_prediction_mode) + ", but only isotope supported.")
+                  return 0, 0, {"gamma": None, "beta": None}
                 
 
+            if gamma_breakdown is not None:
+                gamma_prediction, gamma_uncertainty = gamma_breakdown.prediction, gamma_breakdown.uncertainty
+            if beta_breakdown is not None:
+                beta_prediction, beta_uncertainty = beta_breakdown.prediction, beta_breakdown.uncertainty
+            
             prediction = gamma_prediction + beta_prediction
             uncertainty = math.sqrt(gamma_uncertainty**2 + beta_uncertainty**2)
                 
-            return prediction, uncertainty 
+            return prediction, uncertainty, {"gamma": gamma_breakdown, "beta": beta_breakdown} 
+        
+    def predict_timeseries(self, filename, config = None):
+        """
+        Make predictions for every cooling time column in an ORIGEN output file at once. 
+        The cooling times are taken from the gamma spectra, or from the nuclide tables for 
+        isotope-only predictions. Returns the cooling time headers, and arrays of the 
+        predictions and uncertainties for each cooling time.
+        The prediction parameters are taken from config if it is given, and otherwise from set_prediction_parameters.
+        """
+        
+        config = self.get_checked_config(config)
+        if config is None:
+            return [], np.zeros(0), np.zeros(0)
+        
+        if config.burnup_calculation != "ORIGEN":
+            report_error("Time series predictions require an ORIGEN burnup calculation, but the burnup calculation was: " + str(config.burnup_calculation))
+            return [], np.zeros(0), np.zeros(0)
+        
+        #Read the output file once, all cooling times are taken from it.
+        with read_ORIGEN_output(filename) as ORIGEN_data:
+        
+            if config.gamma_prediction_mode == "binned" or config.gamma_prediction_mode == "sampled":
+                headers = ORIGEN_data.get_cooling_time_headers("gamma")
+            else:
+                headers = ORIGEN_data.get_cooling_time_headers("isotope")
+        
+            gamma_prediction = np.zeros(len(headers))
+            gamma_uncertainty = np.zeros(len(headers))
+            beta_prediction = np.zeros(len(headers))
+            beta_uncertainty = np.zeros(len(headers))
+        
+            if config.gamma_prediction_mode == "binned":
+                spectrum_edges, spectrum_counts = ORIGEN_data.get_gamma_spectrum_series(headers)
+                response_edges, response_counts, response_uncertainties = self.binned_gamma_responses[config.fuel_type].get_response()
+            
+                #Check that bin structure matches.
+                if list(spectrum_edges) != list(response_edges):
+                    report_error("Different bin structure for the gamma emissions and the simulated response")
+                    return headers, gamma_prediction, gamma_uncertainty
+            
+                gamma_prediction, gamma_uncertainty = Predict_response_time_series(spectrum_counts, response_counts, response_uncertainties)
+            
+            elif config.gamma_prediction_mode == "sampled":
+                spectrum_edges, spectrum_counts = ORIGEN_data.get_gamma_spectrum_series(headers)
+            
+                #Convert from sampled response to the binning used in the ORIGEN gamma spectrum, once for each binning
+                binned_response, binned_response_uncertainties = self.sampled_gamma_responses[config.fuel_type].get_binned_response(spectrum_edges)
+            
+                gamma_prediction, gamma_uncertainty = Predict_response_time_series(spectrum_counts, binned_response, binned_response_uncertainties)
+            
+            elif config.gamma_prediction_mode == "isotope":
+                isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_gamma_responses[config.fuel_type].get_response()
+            
+                isotope_mass_contents = ORIGEN_data.get_isotope_contents_series(headers, isotope_list)
+                gamma_prediction, gamma_uncertainty = Predict_response_time_series(isotope_mass_contents, response, response_uncertainty)
+            
+            if config.beta_prediction_mode == "isotope":
+                isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_beta_responses[config.fuel_type].get_response()
+            
+                isotope_mass_contents = ORIGEN_data.get_isotope_contents_series(headers, isotope_list)
+                beta_prediction, beta_uncertainty = Predict_response_time_series(isotope_mass_contents, response, response_uncertainty)
+        
+            
+        prediction = gamma_prediction + beta_prediction
+        uncertainty = np.sqrt(gamma_uncertainty**2 + beta_uncertainty**2)
+        
+        return headers, prediction, uncertainty
+        
+    def predict_cases(self, filename, config = None):
+        """
+        Make predictions for the cooling time for every case in an ORIGEN output file at once, 
+        e.g. for files with one case per axial node or burnup. The cases are those with a gamma 
+        spectrum with the cooling time, or with nuclide tables for isotope-only predictions. 
+        Returns the cases, and arrays of the predictions and uncertainties for each case.
+        The prediction parameters are taken from config if it is given, and otherwise from set_prediction_parameters.
+        """
+        
+        config = self.get_checked_config(config)
+        if config is None:
+            return [], np.zeros(0), np.zeros(0)
+        
+        if config.burnup_calculation != "ORIGEN":
+            report_error("Predictions for several cases require an ORIGEN burnup calculation, but the burnup calculation was: " + str(config.burnup_calculation))
+            return [], np.zeros(0), np.zeros(0)
+        
+        #Read the output file once, all cases are taken from it.
+        with read_ORIGEN_output(filename) as ORIGEN_data:
+        
+            cases = None
+            gamma_prediction = 0
+            gamma_uncertainty = 0
+            beta_prediction = 0
+            beta_uncertainty = 0
+        
+            if config.gamma_prediction_mode == "binned":
+                cases, spectrum_edges, spectrum_counts = ORIGEN_data.get_gamma_spectrum_cases(config.ORIGEN_cooling_time_header)
+                response_edges, response_counts, response_uncertainties = self.binned_gamma_responses[config.fuel_type].get_response()
+            
+                #No case has the cooling time.
+                if len(cases) == 0:
+                    return [], np.zeros(0), np.zeros(0)
+            
+                #Check that bin structure matches.
+                if list(spectrum_edges) != list(response_edges):
+                    report_error("Different bin structure for the gamma emissions and the simulated response")
+                    return cases, np.zeros(len(cases)), np.zeros(len(cases))
+            
+                gamma_prediction, gamma_uncertainty = Predict_response_time_series(spectrum_counts, response_counts, response_uncertainties)
+            
+            elif config.gamma_prediction_mode == "sampled":
+                cases, spectrum_edges, spectrum_counts = ORIGEN_data.get_gamma_spectrum_cases(config.ORIGEN_cooling_time_header)
+            
+                if len(cases) > 0:
+                    #Convert from sampled response to the binning used in the ORIGEN gamma spectrum, once for each binning
+                    binned_response, binned_response_uncertainties = self.sampled_gamma_responses[config.fuel_type].get_binned_response(spectrum_edges)
+                
+                    gamma_prediction, gamma_uncertainty = Predict_response_time_series(spectrum_counts, binned_response, binned_response_uncertainties)
+            
+            elif config.gamma_prediction_mode == "isotope":
+                isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_gamma_responses[config.fuel_type].get_response()
+            
+                cases, isotope_mass_contents = ORIGEN_data.get_isotope_contents_cases(config.ORIGEN_cooling_time_header, isotope_list)
+                gamma_prediction, gamma_uncertainty = Predict_response_time_series(isotope_mass_contents, response, response_uncertainty)
+            
+            if config.beta_prediction_mode == "isotope":
+                isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_beta_responses[config.fuel_type].get_response()
+            
+                #The beta contribution is predicted for the same cases as the gamma contribution.
+                cases, isotope_mass_contents = ORIGEN_data.get_isotope_contents_cases(config.ORIGEN_cooling_time_header, isotope_list, cases)
+                beta_prediction, beta_uncertainty = Predict_response_time_series(isotope_mass_contents, response, response_uncertainty)
+        
+        
+        if cases is None:
+            return [], np.zeros(0), np.zeros(0)
+        
+        prediction = gamma_prediction + beta_prediction + np.zeros(len(cases))
+        uncertainty = np.sqrt(gamma_uncertainty**2 + beta_uncertainty**2) + np.zeros(len(cases))
+        
+        return cases, prediction, uncertainty
+        
+    def predict_materials(self, filename, config = None):
+        """
+        Make predictions for every material in a Serpent bumat or gamma source file, e.g. for pin-by-pin 
+        depletion outputs. Returns the material names, arrays of the predictions and uncertainties for 
+        each material, and the prediction and uncertainty for the whole assembly. 
+        For bumat files the assembly prediction is for the volume-weighted average of the material 
+        contents, and for gamma source files, which give the total emission rate of each material, it 
+        is for the sum of the emissions of all materials.
+        The prediction parameters are taken from config if it is given, and otherwise from set_prediction_parameters.
+        """
+        
+        config = self.get_checked_config(config)
+        if config is None:
+            return [], np.zeros(0), np.zeros(0), 0, 0
+        
+        if config.burnup_calculation == "Serpent_bumat":
+            if config.gamma_prediction_mode != "isotope":
+                report_error("Prediction based on a Serpent_bumat burnup calculation requested, only isotope response function can be used.")
+                report_error("The requested response function was: " + str(config.gamma_prediction_mode))
+                return [], np.zeros(0), np.zeros(0), 0, 0
+            
+            if config.beta_prediction_mode != "isotope" and config.beta_prediction_mode != "none":
+                report_error("Requested prediction with beta contribution: " + str(config.beta_prediction_mode) + ", but only isotope supported.")
+                return [], np.zeros(0), np.zeros(0), 0, 0
+            
+            isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_gamma_responses[config.fuel_type].get_response()
+            material_names, material_volumes, isotope_mass_contents = read_serpent_material_contents(filename, isotope_list)
+            
+            #The last column is the volume-weighted assembly average, predicted together with the materials.
+            weights = get_volume_weights(material_volumes)
+            contents = np.column_stack((isotope_mass_contents, isotope_mass_contents @ weights))
+            gamma_prediction, gamma_uncertainty = Predict_response_time_series(contents, response, response_uncertainty)
+            
+            beta_prediction = 0
+            beta_uncertainty = 0
+            
+            if config.beta_prediction_mode == "isotope":
+                isotope_list, unused1, unused2, response, response_uncertainty = self.isotope_beta_responses[config.fuel_type].get_response()
+                material_names, material_volumes, isotope_mass_contents = read_serpent_material_contents(filename, isotope_list)
+                
+                contents = np.column_stack((isotope_mass_contents, isotope_mass_contents @ weights))
+                beta_prediction, beta_uncertainty = Predict_response_time_series(contents, response, response_uncertainty)
+                
+        elif config.burnup_calculation == "Serpent_gamma":
+            if config.beta_prediction_mode != "none":
+                report_error("Beta prediction requiested for Serpent_gamma burnup results, no beta data is available")
+                report_error("Beta predictions require a Serpent_bumat burnup result.")
+                return [], np.zeros(0), np.zeros(0), 0, 0
+            
+            material_names, material_volumes, material_indices, nuclide_ZAI, spectrum_energies, spectrum_counts = read_serpent_material_gamma_lines(filename)
+            
+            if config.gamma_prediction_mode == "binned":
+                response_edges, response_counts, response_uncertainties = self.binned_gamma_responses[config.fuel_type].get_response()
+                
+                #One binned spectrum per material, and the last column is the sum of all materials.
+                binned_spectra = np.column_stack((convert_to_ORIGEN_binning(spectrum_energies, spectrum_counts, response_edges, material_indices, len(material_names)), 
+                                                  convert_to_ORIGEN_binning(spectrum_energies, spectrum_counts, response_edges)))
+                
+                gamma_prediction, gamma_uncertainty = Predict_response_time_series(binned_spectra, np.array(response_counts), np.array(response_uncertainties))
+                
+            elif config.gamma_prediction_mode == "sampled":
+                #Uncertainties not provided by Serpent gamma spectrum output
+                spectrum_uncertainties = np.zeros(len(spectrum_energies))
+                
+                #Each line is evaluated once. The lines are independent, so the assembly prediction is the sum of 
+                #those of the materials, and its variance the sum of their variances.
+                gamma_prediction, gamma_uncertainty = Predict_sampled_spectrum_response(spectrum_energies, spectrum_counts, spectrum_uncertainties, 
+                                                                                        self.sampled_gamma_responses[config.fuel_type], material_indices, len(material_names))
+                gamma_prediction = np.append(gamma_prediction, np.sum(gamma_prediction))
+                gamma_uncertainty = np.append(gamma_uncertainty, np.sqrt(np.sum(gamma_uncertainty**2)))
+            else:
+                report_error("Prediction requisted for Serpent_gamma, but an isotope response was requested.")
+                report_error("Serpent_gamma can be used with a binned or a sampled response.")
+                return [], np.zeros(0), np.zeros(0), 0, 0
+            
+            beta_prediction = 0
+            beta_uncertainty = 0
+            
+        else:
+            report_error("Predictions for several materials require a Serpent burnup calculation, but the burnup calculation was: " + str(config.burnup_calculation))
+            return [], np.zeros(0), np.zeros(0), 0, 0
+        
+        prediction = gamma_prediction + beta_prediction
+        uncertainty = np.sqrt(gamma_uncertainty**2 + beta_uncertainty**2)
+        
+        return material_names, prediction[:-1], uncertainty[:-1], prediction[-1], uncertainty[-1]
+        
+    def predict_depletion(self, filenames, config = None, workers = None):
+        """
+        Make predictions for every step of a Serpent depletion history, given either as a Serpent 
+        depletion output (_dep.m) file or as a list of bumat files, which are parsed in parallel by up to 
+        workers processes. The contents of the isotopes of both the gamma and the beta responses are read 
+        once, and each response is applied to all steps at once. Returns arrays of the burnup and time 
+        (days) of each step, and of the predictions and uncertainties for each step.
+        The prediction parameters are taken from config if it is given, and otherwise from set_prediction_parameters.
+        """
+        
+        config = self.get_checked_config(config)
+        if config is None:
+            return np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0)
+        
+        if config.burnup_calculation != "Serpent_bumat":
+            report_error("Predictions for a depletion history require a Serpent_bumat burnup calculation, but the burnup calculation was: " + str(config.burnup_calculation))
+            return np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0)
+        
+        if config.gamma_prediction_mode != "isotope":
+            report_error("Prediction based on a Serpent_bumat burnup calculation requested, only isotope response function can be used.")
+            report_error("The requested response function was: " + str(config.gamma_prediction_mode))
+            return np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0)
+        
+        if config.beta_prediction_mode != "isotope" and config.beta_prediction_mode != "none":
+            report_error("Requested prediction with beta contribution: " + str(config.beta_prediction_mode) + ", but only isotope supported.")
+            return np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0)
+        
+        responses = [self.isotope_gamma_responses[config.fuel_type].get_response()]
+        if config.beta_prediction_mode == "isotope":
+            responses.append(self.isotope_beta_responses[config.fuel_type].get_response())
+        
+        #Read the contents of all isotopes of all responses in one pass over the files.
+        all_isotopes = []
+        for response in responses:
+            all_isotopes += [isotope for isotope in response[0] if isotope not in all_isotopes]
+        burnups, days, isotope_mass_contents = read_serpent_isotope_contents_series(filenames, all_isotopes, workers)
+        
+        prediction = np.zeros(len(days))
+        variance = np.zeros(len(days))
+        
+        for isotope_list, unused1, unused2, response, response_uncertainty in responses:
+            rows = [all_isotopes.index(isotope) for isotope in isotope_list]
+            step_prediction, step_uncertainty = Predict_response_time_series(isotope_mass_contents[rows, :], response, response_uncertainty)
+            prediction += step_prediction
+            variance += step_uncertainty**2
+        
+        return burnups, days, prediction, np.sqrt(variance)
+        
+    def predict_many(self, filenames, configs = None, workers = None):
+        """
+        Make predictions for many burnup output files on a pool of up to workers processes, each of 
+        which loads the responses once. configs is either one prediction configuration for all files 
+        or a list with one per file, and by default the parameters from set_prediction_parameters are used. 
+        Returns a list of prediction_result, in the order of the files, where failed predictions have 
+        the type and message of the error instead of being silently 0.
+        """
+        
+        filenames = list(filenames)
+        
+        if configs is None:
+            configs = self.get_current_config()
+        if isinstance(configs, prediction_config):
+            configs = [configs] * len(filenames)
+        configs = list(configs)
+        
+        if len(configs) != len(filenames):
+            report_error("predict_many called with " + str(len(filenames)) + " files but " + str(len(configs)) + " prediction configurations")
+            return []
+        
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(filenames))
+        
+        if workers <= 1:
+            return [predict_file(self, filename, config) for filename, config in zip(filenames, configs)]
+        
+        #Several files per task, so that thousands of small files are not dominated by the task overhead.
+        chunk_size = max(1, len(filenames) // (4 * workers))
+        
+        with concurrent.futures.ProcessPoolExecutor(max_workers = workers, initializer = initialize_prediction_worker, 
+                                                    initargs = (self.data_folder, dict(cache_settings), self.lookup_table_settings)) as executor:
+            return list(executor.map(predict_in_worker, filenames, configs, chunksize = chunk_size))
+        
+    def get_prediction_executor(self, workers = None):
+        """
+        Get the pool of worker processes used by predict_async, which is started with up to workers 
+        processes on first use and then kept, with the responses loaded once per worker.
+        """
+        
+        with self.executor_lock:
+            if self.prediction_executor is None:
+                self.prediction_workers = workers or os.cpu_count() or 1
+                self.prediction_executor = concurrent.futures.ProcessPoolExecutor(max_workers = self.prediction_workers, initializer = initialize_prediction_worker, 
+                                                                                  initargs = (self.data_folder, dict(cache_settings), self.lookup_table_settings))
+            return self.prediction_executor
+        
+    def shutdown_prediction_executor(self):
+        """
+        Stop the worker processes used by predict_async, cancelling predictions that have not started.
+        """
+        
+        with self.executor_lock:
+            if self.prediction_executor is not None:
+                self.prediction_executor.shutdown(wait = True, cancel_futures = True)
+                self.prediction_executor = None
+        
+    async def predict_async(self, filename, config = None):
+        """
+        Make a prediction for a burnup output file in a worker process, without blocking the event loop. 
+        Cancelling the call cancels the prediction if it has not started. 
+        Returns a prediction_result, with the error if the prediction failed.
+        """
+        
+        with collect_messages() as messages:
+            checked_config = self.get_checked_config(config)
+        if checked_config is None:
+            return prediction_result(filename, 0, 0, {"type": "PredictionError", "message": "\n".join(get_errors(messages))})
+        
+        return await asyncio.wrap_future(self.get_prediction_executor().submit(predict_in_worker, filename, checked_config))
+        
+    async def predict_as_completed(self, filenames, configs = None, concurrency = None):
+        """
+        Asynchronously iterate over the prediction_result of each file, in the order the predictions complete. 
+        At most concurrency predictions, by default twice the number of worker processes, are submitted at 
+        once, so filenames can be a generator over very many files. configs is either one prediction 
+        configuration for all files or an iterable with one per file. 
+        Predictions that have not completed are cancelled when the iteration is stopped.
+        """
+        
+        if configs is None:
+            configs = self.get_current_config()
+        if isinstance(configs, prediction_config):
+            configs = itertools.repeat(configs)
+        
+        executor = self.get_prediction_executor()
+        if concurrency is None:
+            concurrency = 2 * self.prediction_workers
+        
+        pending = set()
+        
+        try:
+            for filename, config in zip(filenames, configs):
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(pending, return_when = asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                
+                pending.add(asyncio.wrap_future(executor.submit(predict_in_worker, filename, config)))
+            
+            while len(pending) > 0:
+                done, pending = await asyncio.wait(pending, return_when = asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+        
+    def predict_stream(self, tasks, workers = None, concurrency = None):
+        """
+        Iterate over the predictions for an iterable of (filename, config) pairs, in the order the predictions 
+        complete, as pairs of the configuration and the prediction_result. With more than one worker, the 
+        predictions are made on the pool of worker processes from get_prediction_executor, with at most 
+        concurrency predictions, by default twice the number of workers, submitted at once. tasks can 
+        therefore be a generator over very many files. Predictions that have not completed are cancelled 
+        when the iteration is stopped.
+        """
+        
+        if workers is None:
+            workers = os.cpu_count() or 1
+        
+        if workers <= 1:
+            for filename, config in tasks:
+                yield config, predict_file(self, filename, config)
+            return
+        
+        executor = self.get_prediction_executor(workers)
+        if concurrency is None:
+            concurrency = 2 * self.prediction_workers
+        
+        pending = {}
+        
+        try:
+            for filename, config in tasks:
+                if len(pending) >= concurrency:
+                    done, unused = concurrent.futures.wait(pending, return_when = concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        yield pending.pop(future), future.result()
+                
+                pending[executor.submit(predict_in_worker, filename, config)] = config
+            
+            while len(pending) > 0:
+                done, unused = concurrent.futures.wait(pending, return_when = concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            for future in pending:
+                future.cancel()
         
     def set_ORIGEN_cooling_time(self, header):
         self.ORIGEN_cooling_time_header = header
@@ -1,5 +1,5 @@
 import math
-from scipy.interpolate import interp1d
+import numpy as np
 
 from clip.read_ORIGEN_output import *
 from clip.read_responses import *
@@ -7,7 +7,12 @@ from clip.setup_response_function import *
 from clip.read_serpent_output import *
 from clip.isotope_data import *
 from clip.rescale import *
+from clip.Utils import sampled_spectrum
+from clip.Utils import prediction_breakdown
+from clip.response_registry import *
 
+#Response folders in the default data folder. The functional API finds responses with get_response_filename, 
+#in the data folder set with set_data_folder.
 Binned_gamma_response_folder = "Data/Binned_gamma_response/"
 Binned_beta_response_folder = "Data/Binned_beta_response/"
 Sampled_gamma_response_folder = "Data/Sampled_gamma_response/"
@@ -15,7 +20,113 @@ Sampled_beta_response_folder = "Data/Sampled_beta_response/"
 Isotope_gamma_response_folder = "Data/Isotope_gamma_response/"
 Isotope_beta_response_folder = "Data/Isotope_beta_response/"
 
-def Predict_binned_response(spectrum, spectrum_uncertainties, response, response_uncertainties):
+def sum_in_order(terms):
+    """
+    Add up the rows of a 2D array one at a time, in the order a single prediction adds its bins or isotopes. 
+    Unlike sum, which adds a single column pairwise, this gives the same result for one assembly as for many.
+    """
+    
+    total = np.zeros(terms.shape[1])
+    for row in terms:
+        total += row
+    return total
+
+def Predict_response_batch(contents, content_uncertainties, response, response_uncertainties, breakdown = False):
+    """This function makes Cherenkov light intensity predictions for a batch of assemblies at once, 
+    based on a binned or an isotope response function
+
+
+
+    Parameters
+
+    ----------
+
+    contents : 2D array of floats
+
+        Per-bin gamma-ray emission intensities or per-isotope contents, with one row per assembly.
+
+    content_uncertainties : 2D array of floats
+
+        Uncertainties in the contents, with the same shape as the contents.
+        
+    response : array of floats
+
+        Per-bin or per-isotope Cherenkov light response, either shared by all assemblies or with one row per assembly.
+        
+    response_uncertainties : array of floats
+
+        Uncertanties in the per-bin or per-isotope Cherenkov light response, with the same shape as the response.
+        
+    breakdown : bool, optional
+
+        Also return the contribution of each bin or isotope.
+
+
+    Returns
+
+    -------
+
+    two arrays of floats
+
+        the Cherenkov light intensity predictions and the uncertainties in the predictions, one per assembly, 
+        and if breakdown is True two 2D arrays with the contribution of each bin or isotope (rows) of each 
+        assembly (columns) to the prediction and to the squared uncertainty.
+
+    """
+    
+    #Bins or isotopes along the first axis, so that the sums over them are accumulated in the same 
+    #order as for a single assembly.
+    contents = np.ascontiguousarray(np.atleast_2d(np.asarray(contents, dtype=float)).T)
+    content_uncertainties = np.broadcast_to(np.atleast_2d(np.asarray(content_uncertainties, dtype=float)).T, contents.shape)
+    response = np.broadcast_to(np.atleast_2d(np.asarray(response, dtype=float)).T, contents.shape)
+    response_uncertainties = np.broadcast_to(np.atleast_2d(np.asarray(response_uncertainties, dtype=float)).T, contents.shape)
+    
+    if contents.shape[0] == 0:
+        if breakdown:
+            return np.zeros(contents.shape[1]), np.zeros(contents.shape[1]), contents, contents
+        return np.zeros(contents.shape[1]), np.zeros(contents.shape[1])
+    
+    terms = contents * response
+    
+    #Relative uncertainties of the contents and the response, zero where there are no counts or no response,
+    #so that the prediction and the uncertainty of such bins or isotopes are 0.
+    has_counts = contents > 0
+    content_relative_uncertainties = np.divide(content_uncertainties, contents, out=np.zeros(contents.shape), where=has_counts)
+    has_response = response > 0
+    response_relative_uncertainties = np.divide(response_uncertainties, response, out=np.zeros(contents.shape), where=has_response)
+    
+    uncertainty_terms = np.where(has_counts, terms**2 * content_relative_uncertainties**2, 0) + np.where(has_response, terms**2 * response_relative_uncertainties**2, 0)
+    
+    #Sum of square of uncertainty, and the square root to obtain a RMSE value.
+    predictions = sum_in_order(terms)
+    uncertainties = np.sqrt(sum_in_order(uncertainty_terms))
+    
+    if breakdown:
+        return predictions, uncertainties, terms, uncertainty_terms
+    
+    return predictions, uncertainties
+
+def get_prediction_breakdowns(predictions, uncertainties, terms, uncertainty_terms):
+    """
+    Get a prediction_breakdown for each assembly from the results of Predict_response_batch.
+    """
+    
+    return [prediction_breakdown(float(predictions[i]), float(uncertainties[i]), terms[:, i], uncertainty_terms[:, i]) for i in range(0, len(predictions))]
+
+def set_prediction_gradients(breakdowns, contents, response):
+    """
+    Set the gradients of binned or isotope predictions, one breakdown per row of the contents. The prediction 
+    is the sum of the contents times the response, so its derivative with respect to each content is the 
+    response, and with respect to each response value the content.
+    """
+    
+    contents = np.atleast_2d(np.asarray(contents, dtype=float))
+    response = np.broadcast_to(np.atleast_2d(np.asarray(response, dtype=float)), contents.shape)
+    
+    for i in range(0, len(breakdowns)):
+        breakdowns[i].set_gradients(response[i].copy(), contents[i].copy())
+
+def Predict_binned_response(spectrum, spectrum_uncertainties, response, response_uncertainties, breakdown = False, gradients = False):
     """This function makes a Cherenkov light intensity prediction based on a binned response function
 
 
@@ -26,11 +137,11 @@ def Predict_binned_response(spectrum, spectrum_uncertainties, response, response
 
     spectrum : array of floats
 
-        Per-bin gamma-ray emission intensities.
+        Per-bin gamma-ray emission intensities, or a 2D array with one row per assembly.
 
     spectrum_uncertainties : array of floats
 
-        Uncertainties in the per-bin gamma-ray emission intensities.
+        Uncertainties in the per-bin gamma-ray emission intensities, with the same shape as the spectrum.
         
     response : array of floats
 
@@ -39,6 +150,14 @@ def Predict_binned_response(spectrum, spectrum_uncertainties, response, response
     response_uncertainties : array of floats
 
         Uncertanties in the per-bin gamma-ray Chherenkov light response.
+        
+    breakdown : bool, optional
+
+        Return the contribution of each bin instead.
+        
+    gradients : bool, optional
+
+        Return the contribution of each bin, with the derivatives of the prediction with respect to each bin count and response value.
 
 
     Returns
@@ -47,36 +166,64 @@ def Predict_binned_response(spectrum, spectrum_uncertainties, response, response
 
     two float values
 
-        the Cherenkov light intensity prediction and the uncertainty in the prediction
+        the Cherenkov light intensity prediction and the uncertainty in the prediction, 
+        or two arrays of floats with one value per assembly for a 2D spectrum. 
+        If breakdown is True, a prediction_breakdown with the contribution of each bin, 
+        or a list with one per assembly for a 2D spectrum.
 
     """
     
-    prediction = 0.0
-    uncertainty = 0.0
+    if breakdown or gradients:
+        breakdowns = get_prediction_breakdowns(*Predict_response_batch(spectrum, spectrum_uncertainties, response, response_uncertainties, True))
+        if gradients:
+            set_prediction_gradients(breakdowns, spectrum, response)
+        return breakdowns if np.ndim(spectrum) > 1 else breakdowns[0]
     
-    for i in range (0,len(spectrum)):
-        #Per bin response
-        prediction += spectrum[i] * response[i]
-        
-        uncertainty_sum = 0
+    predictions, uncertainties = Predict_response_batch(spectrum, spectrum_uncertainties, response, response_uncertainties)
+    
+    if np.ndim(spectrum) > 1:
+        return predictions, uncertainties
+    
+    return float(predictions[0]), float(uncertainties[0])
+
+def Predict_response_time_series(contents, response, response_uncertainties):
+    """This function makes Cherenkov light intensity predictions for several cooling times or cases at once, 
+    based on a binned or an isotope response function
+
+
+
+    Parameters
+
+    ----------
+
+    contents : 2D array of floats
+
+        Per-bin gamma-ray emission intensities or per-isotope contents, with one column per cooling time or case.
         
-        #Check that the spectrum or the response has counts, otherwise let the 
-        #prediction be 0 and the uncertainty too.
-        if spectrum[i] > 0:
-            uncertainty_sum += (spectrum[i]*response[i])**2 * (spectrum_uncertainties[i]/spectrum[i])**2
-            
-        if response[i] > 0:
-            uncertainty_sum += (spectrum[i]*response[i])**2 * (response_uncertainties[i]/response[i])**2
+    response : array of floats
+
+        Per-bin or per-isotope Cherenkov light response.
         
-        #Sum of square of uncertainty
-        uncertainty = uncertainty + uncertainty_sum
-    
-    #And the square root to obtain a RMSE value.
-    uncertainty = math.sqrt(uncertainty)
+    response_uncertainties : array of floats
+
+        Uncertanties in the per-bin or per-isotope Cherenkov light response.
+
+
+    Returns
+
+    -------
+
+    two arrays of floats
+
+        the Cherenkov light intensity predictions and the uncertainties in the predictions, one per column of the contents
+
+    """
     
-    return prediction, uncertainty
+    #Burnup codes provide no uncertainties on the contents, so only the response uncertainty is included.
+    #The columns are the assemblies of a batch prediction.
+    return Predict_response_batch(np.asarray(contents, dtype=float).T, 0, response, response_uncertainties)
 
-def Predict_sampled_response(spectrum_energies, spectrum_intensities, spectrum_uncertainties, response_energies, response_counts, response_uncertainties):
+def Predict_sampled_response(spectrum_energies, spectrum_intensities, spectrum_uncertainties, response_energies, response_counts, response_uncertainties, breakdown = False, gradients = False):
     """This function makes a Cherenkov light intensity prediction based on a response function sampled at various energies
 
 
@@ -108,6 +255,15 @@ def Predict_sampled_response(spectrum_energies, spectrum_intensities, spectrum_u
     response_uncertainties : array of floats
 
         Uncertanties in the response function (i.e. in the response_counts values).
+        
+    breakdown : bool, optional
+
+        Return the contribution of each gamma line instead.
+        
+    gradients : bool, optional
+
+        Return the contribution of each gamma line, with the derivatives of the prediction with respect to 
+        each line intensity and each sampled response value.
 
 
     Returns
@@ -116,38 +272,187 @@ def Predict_sampled_response(spectrum_energies, spectrum_intensities, spectrum_u
 
     two float values
 
-        the Cherenkov light intensity prediction and the uncertainty in the prediction.
+        the Cherenkov light intensity prediction and the uncertainty in the prediction, 
+        or a prediction_breakdown with the contribution of each gamma line if breakdown or gradients is True.
 
     """
     
-    #interpolate response functions
-    response_function = interp1d(response_energies, response_counts, kind='cubic')
-    response_uncertainty_function = interp1d(response_energies, response_uncertainties, kind='cubic')
+    if breakdown or gradients:
+        return Predict_sampled_spectrum_response(spectrum_energies, spectrum_intensities, spectrum_uncertainties, 
+                                                 sampled_spectrum(response_energies, response_counts, response_uncertainties), 
+                                                 breakdown = True, gradients = gradients)[0]
     
-    response_min_energy = response_energies[0]
-    response_max_energy = response_energies[len(response_energies) - 1]
+    predictions, uncertainties = Predict_sampled_spectrum_response(spectrum_energies, spectrum_intensities, spectrum_uncertainties, 
+                                                                   sampled_spectrum(response_energies, response_counts, response_uncertainties))
     
-    prediction = 0
-    uncertainty_squared = 0
-    
-    for i in range(0,len(spectrum_energies)):
-        if spectrum_energies[i] >= response_min_energy and spectrum_energies[i] < response_max_energy:
-
-            gamma_response = spectrum_intensities[i]*response_function(spectrum_energies[i])
-            prediction += gamma_response
-                
-            #sum of square of the uncertainties
-            if spectrum_intensities[i] > 0:
-                #Spectrum uncertainty
-                uncertainty_squared += (gamma_response)**2 * (spectrum_uncertainties[i]/spectrum_intensities[i])**2
-            
-            if response_function(spectrum_energies[i]) > 0:
-                #Response uncertainty, as interpolated
-                uncertainty_squared += (gamma_response)**2 * (response_uncertainty_function(spectrum_energies[i])/response_function(spectrum_energies[i]))**2
-            
-    uncertainty = math.sqrt(uncertainty_squared)
+    return float(predictions[0]), float(uncertainties[0])
+
+def Predict_sampled_response_groups(spectrum_energies, spectrum_intensities, spectrum_uncertainties, spectrum_groups, number_of_groups, response_energies, response_counts, response_uncertainties, breakdown = False, gradients = False):
+    """This function makes Cherenkov light intensity predictions for several groups of gamma lines at once, 
+    e.g. for the materials of a Serpent gamma source file, based on a response function sampled at various energies
+
+
+
+    Parameters
+
+    ----------
+
+    spectrum_energies : array of floats
+
+        The energy of the discreet gamma lines in the gamma spectrum.
+        
+    spectrum_intensities : array of floats
+
+        The intensity (photons/second) of the discreet gamma lines in the gamma spectrum.
+
+    spectrum_uncertainties : array of floats
+
+        Uncertainties in the gamma spectrum intensities.
+        
+    spectrum_groups : array of ints
+
+        The group, from 0 to number_of_groups - 1, that each gamma line belongs to.
+        
+    number_of_groups : int
+
+        The number of groups.
+        
+    response_energies : array of floats
+
+        The gamma-ray energies that the response function was simulated for.
+        
+    response_counts : array of floats
+
+        The number of Cherenkov photons produced for a gamma-ray with energy from response_energies.
+        
+    response_uncertainties : array of floats
+
+        Uncertanties in the response function (i.e. in the response_counts values).
+        
+    breakdown : bool, optional
+
+        Return the contribution of each gamma line instead.
+        
+    gradients : bool, optional
+
+        Return the contribution of each gamma line, with the derivatives of the prediction of each group with respect to 
+        each line intensity and each sampled response value.
+
+
+    Returns
+
+    -------
+
+    two arrays of floats
+
+        the Cherenkov light intensity predictions and the uncertainties in the predictions, one per group, 
+        or a list with one prediction_breakdown per group if breakdown or gradients is True.
+
+    """
     
-    return prediction, uncertainty
+    return Predict_sampled_spectrum_response(spectrum_energies, spectrum_intensities, spectrum_uncertainties, 
+                                             sampled_spectrum(response_energies, response_counts, response_uncertainties), 
+                                             spectrum_groups, number_of_groups, breakdown, gradients)
+
+def Predict_sampled_spectrum_response(spectrum_energies, spectrum_intensities, spectrum_uncertainties, response, spectrum_groups = None, number_of_groups = 1, breakdown = False, gradients = False):
+    """This function makes Cherenkov light intensity predictions for one or several groups of gamma lines, 
+    based on a loaded sampled response whose interpolation is built once and evaluated for all lines at once
+
+
+
+    Parameters
+
+    ----------
+
+    spectrum_energies : array of floats
+
+        The energy of the discreet gamma lines in the gamma spectrum.
+        
+    spectrum_intensities : array of floats
+
+        The intensity (photons/second) of the discreet gamma lines in the gamma spectrum.
+
+    spectrum_uncertainties : array of floats
+
+        Uncertainties in the gamma spectrum intensities.
+        
+    response : sampled_spectrum
+
+        The sampled response function.
+        
+    spectrum_groups : array of ints, optional
+
+        The group, from 0 to number_of_groups - 1, that each gamma line belongs to. By default all lines are in one group.
+        
+    number_of_groups : int, optional
+
+        The number of groups.
+        
+    breakdown : bool, optional
+
+        Return the contribution of each gamma line instead.
+        
+    gradients : bool, optional
+
+        Return the contribution of each gamma line, with the derivatives of the prediction of each group with 
+        respect to the intensity of its lines and to each sampled response value. The derivative with respect 
+        to the response is exact for the cubic spline, or for the linear interpolation if the response uses a lookup table.
+
+
+    Returns
+
+    -------
+
+    two arrays of floats
+
+        the Cherenkov light intensity predictions and the uncertainties in the predictions, one per group, 
+        or if breakdown or gradients is True a list with one prediction_breakdown per group, with the 
+        contribution of each gamma line of the group labelled by its index in the spectrum.
+
+    """
+    
+    spectrum_energies = np.asarray(spectrum_energies, dtype = float)
+    spectrum_intensities = np.asarray(spectrum_intensities, dtype = float)
+    spectrum_uncertainties = np.asarray(spectrum_uncertainties, dtype = float)
+    
+    if spectrum_groups is None:
+        spectrum_groups = np.zeros(len(spectrum_energies), dtype = int)
+    spectrum_groups = np.asarray(spectrum_groups, dtype = int)
+    
+    #Lines outside the energy range of the response have no response.
+    response_values, response_uncertainty = response.evaluate(spectrum_energies)
+    
+    gamma_response = spectrum_intensities * response_values
+    
+    #Relative uncertainties, zero where there are no counts or no response.
+    has_counts = spectrum_intensities > 0
+    spectrum_relative_uncertainty = np.divide(spectrum_uncertainties, spectrum_intensities, out = np.zeros(len(spectrum_energies)), where = has_counts)
+    has_response = response_values > 0
+    response_relative_uncertainty = np.divide(response_uncertainty, response_values, out = np.zeros(len(spectrum_energies)), where = has_response)
+    
+    #The spectrum and response uncertainty of each line are added in turn, as for a single line.
+    uncertainty_squared = np.column_stack((gamma_response**2 * spectrum_relative_uncertainty**2, gamma_response**2 * response_relative_uncertainty**2)).ravel()
+    
+    #bincount adds the lines of each group in order.
+    predictions = np.bincount(spectrum_groups, weights = gamma_response, minlength = number_of_groups)
+    uncertainties = np.sqrt(np.bincount(np.repeat(spectrum_groups, 2), weights = uncertainty_squared, minlength = number_of_groups))
+    
+    if breakdown or gradients:
+        line_variances = uncertainty_squared[0::2] + uncertainty_squared[1::2]
+        lines = [np.flatnonzero(spectrum_groups == group) for group in range(0, number_of_groups)]
+        breakdowns = [prediction_breakdown(float(predictions[group]), float(uncertainties[group]), gamma_response[lines[group]], line_variances[lines[group]], lines[group]) 
+                      for group in range(0, number_of_groups)]
+        
+        if gradients:
+            #The response at each line is the spline basis times the sampled values, so the derivative of a 
+            #prediction with respect to the sampled values is the line intensities times the basis.
+            basis = response.get_basis(spectrum_energies)
+            for group in range(0, number_of_groups):
+                breakdowns[group].set_gradients(response_values[lines[group]], spectrum_intensities[lines[group]] @ basis[lines[group]])
+        
+        return breakdowns
+    
+    return predictions, uncertainties
 
 def Predict_ORIGEN_binned_gamma_response(ORIGEN_filename, cooling_time_header, response_filename):
     """This function reads a binned gamma spectrum from the ORIGEN output and a binned response to make a Cherenkov light intensity prediction
@@ -158,9 +463,9 @@ def Predict_ORIGEN_binned_gamma_response(ORIGEN_filename, cooling_time_header, r
 
     ----------
 
-    ORIGEN_filename : string
+    ORIGEN_filename : string or ORIGEN_output
 
-        Path and name of the ORIGEN output file.
+        Path and name of the ORIGEN output file, or an already read ORIGEN output.
         
     cooling_time_header : string
 
@@ -186,7 +491,7 @@ def Predict_ORIGEN_binned_gamma_response(ORIGEN_filename, cooling_time_header, r
 
     #Load data
     spectrum_edges, spectrum_counts = read_ORIGEN_gamma_spectrum(ORIGEN_filename, cooling_time_header) 
-    response_edges, response_counts, response_uncertainties = read_binned_response(response_filename)
+    response_edges, response_counts, response_uncertainties = get_registered_binned_response(response_filename).get_response()
     
     #Check that data has been loaded
     if len(spectrum_edges) == 1 or len(response_edges) == 1:
@@ -247,7 +552,7 @@ def Predict_beta_binned_response(spectrum_edges, spectrum_counts, response_filen
     uncertainty = 0
     
     #Load data
-    response_edges, response_counts, response_uncertainties = read_binned_response(response_filename)
+    response_edges, response_counts, response_uncertainties = get_registered_binned_response(response_filename).get_response()
     
     #Check that data has been loaded
     if len(spectrum_edges) == 1 or len(response_edges) == 1:
@@ -276,7 +581,7 @@ def Predict_beta_binned_response(spectrum_edges, spectrum_counts, response_filen
         
     return prediction, uncertainty
     
-def Predict_isotope_response(isotope_mass_contents, isotope_mass_uncertainty, response, response_uncertainty):
+def Predict_isotope_response(isotope_mass_contents, isotope_mass_uncertainty, response, response_uncertainty, breakdown = False, gradients = False):
     """This function makes a Cherenkov light intensity prediction based on 
     the isotopic contents of a fuel assembly and an isotope response.
 
@@ -288,11 +593,11 @@ def Predict_isotope_response(isotope_mass_contents, isotope_mass_uncertainty, re
 
     isotope_mass_contents : array of floats
 
-        The mass contents of the various isotopes.
+        The mass contents of the various isotopes, or a 2D array with one row per assembly.
         
     isotope_mass_uncertainty : array of floats
 
-        The uncertainty in the mass contents of the various isotopes.
+        The uncertainty in the mass contents of the various isotopes, with the same shape as the contents.
 
     response : array of floats
 
@@ -302,6 +607,14 @@ def Predict_isotope_response(isotope_mass_contents, isotope_mass_uncertainty, re
 
         The uncertainty in the per-isotope Cherenkov light production.
         
+    breakdown : bool, optional
+
+        Return the contribution of each isotope instead.
+        
+    gradients : bool, optional
+
+        Return the contribution of each isotope, with the derivatives of the prediction with respect to each isotope content and response value.
+        
 
     Returns
 
@@ -309,34 +622,25 @@ def Predict_isotope_response(isotope_mass_contents, isotope_mass_uncertainty, re
 
     two float values
 
-        The Cherenkov light intensity prediction and the uncertainty in the prediction.
+        The Cherenkov light intensity prediction and the uncertainty in the prediction, 
+        or two arrays of floats with one value per assembly for 2D contents. 
+        If breakdown is True, a prediction_breakdown with the contribution of each isotope, 
+        or a list with one per assembly for 2D contents.
 
     """
     
-    prediction = 0.0
-    uncertainty = 0.0
+    if breakdown or gradients:
+        breakdowns = get_prediction_breakdowns(*Predict_response_batch(isotope_mass_contents, isotope_mass_uncertainty, response, response_uncertainty, True))
+        if gradients:
+            set_prediction_gradients(breakdowns, isotope_mass_contents, response)
+        return breakdowns if np.ndim(isotope_mass_contents) > 1 else breakdowns[0]
     
-    for i in range (0,len(isotope_mass_contents)):
-        #Per isotope response
-        prediction = prediction + isotope_mass_contents[i]*response[i]
-        
-        uncertainty_sum = 0
-        
-        #Check that the spectrum or the response has counts, otherwise let the 
-        #prediction be 0 and the uncertainty too.
-        if isotope_mass_contents[i] > 0:
-            uncertainty_sum = uncertainty_sum + (isotope_mass_contents[i]*response[i])**2 * ((isotope_mass_uncertainty[i]/isotope_mass_contents[i])**2)
-            
-        if response[i] > 0:
-            uncertainty_sum = uncertainty_sum + (isotope_mass_contents[i]*response[i])**2 * (response_uncertainty[i]/response[i])**2
-        
-        #Sum of square of uncertainty
-        uncertainty = uncertainty + uncertainty_sum
+    predictions, uncertainties = Predict_response_batch(isotope_mass_contents, isotope_mass_uncertainty, response, response_uncertainty)
     
-    #And the square root to obtain a RMSE value.
-    uncertainty = math.sqrt(uncertainty)
+    if np.ndim(isotope_mass_contents) > 1:
+        return predictions, uncertainties
     
-    return prediction, uncertainty
+    return float(predictions[0]), float(uncertainties[0])
 
 def Predict_ORIGEN_beta_contents(ORIGEN_filename, cooling_time_header, response_filename):
     """This function makes a Cherenkov light intensity prediction based on the beta-decaying
@@ -348,9 +652,9 @@ def Predict_ORIGEN_beta_contents(ORIGEN_filename, cooling_time_header, response_
 
     ----------
 
-    ORIGEN_filename : string
+    ORIGEN_filename : string or ORIGEN_output
 
-        Path and name of the ORIGEN output file.
+        Path and name of the ORIGEN output file, or an already read ORIGEN output.
         
     cooling_time_header : string
 
@@ -375,7 +679,7 @@ def Predict_ORIGEN_beta_contents(ORIGEN_filename, cooling_time_header, response_
     uncertainty = 0
     
     #Read all isotopes for which we have a respone defined
-    isotope_list, response, response_uncertainty = read_isotope_response(response_filename, "mass")
+    isotope_list, unused1, unused2, response, response_uncertainty = get_registered_isotope_response(response_filename).get_response()
     
     #read the isotope_list that we have a response for.
     isotope_mass_contents = read_ORIGEN_isotope_contents(ORIGEN_filename, cooling_time_header, isotope_list)
@@ -397,9 +701,9 @@ def Predict_ORIGEN_gamma_contents(ORIGEN_filename, cooling_time_header, response
 
     ----------
 
-    ORIGEN_filename : string
+    ORIGEN_filename : string or ORIGEN_output
 
-        Path and name of the ORIGEN output file.
+        Path and name of the ORIGEN output file, or an already read ORIGEN output.
         
     cooling_time_header : string
 
@@ -422,7 +726,7 @@ def Predict_ORIGEN_gamma_contents(ORIGEN_filename, cooling_time_header, response
     prediction = 0
     uncertainty = 0
     
-    isotope_list, response, response_uncertainty = read_isotope_response(response_filename, "mass")
+    isotope_list, unused1, unused2, response, response_uncertainty = get_registered_isotope_response(response_filename).get_response()
     
     #read the isotope_list that we have a response for.
     isotope_mass_contents = read_ORIGEN_isotope_contents(ORIGEN_filename, cooling_time_header, isotope_list)
@@ -444,9 +748,9 @@ def Predict_ORIGEN_sampled_gamma_response(ORIGEN_filename, cooling_time_header,
 
     ----------
 
-    ORIGEN_filename : string
+    ORIGEN_filename : string or ORIGEN_output
 
-        Path and name of the ORIGEN output file.
+        Path and name of the ORIGEN output file, or an already read ORIGEN output.
         
     cooling_time_header : string
 
@@ -472,11 +776,9 @@ def Predict_ORIGEN_sampled_gamma_response(ORIGEN_filename, cooling_time_header,
     
     #Load data
     spectrum_edges, spectrum_counts = read_ORIGEN_gamma_spectrum(ORIGEN_filename, cooling_time_header) 
-    response_energies, response_counts, response_uncertainties = read_sampled_response(response_filename)
     
-    #Convert from sampled response to the binning used in the ORIGEN gamma spectrum
-    binned_response = get_binned_response_function(response_energies, response_counts, spectrum_edges)
-    binned_response_uncertainties = get_binned_response_function(response_energies, response_uncertainties, spectrum_edges)
+    #Convert from sampled response to the binning used in the ORIGEN gamma spectrum, once for each binning
+    binned_response, binned_response_uncertainties = get_registered_sampled_response(response_filename).get_binned_response(spectrum_edges)
       
     #Uncertainty in gamma spectrum not provided by ORIGEN, so do not include here.
     spectrum_uncertainties = [0] * len(spectrum_counts)    
@@ -517,7 +819,7 @@ def Predict_serpent_binned_gamma_response(serpent_filename, response_filename):
     uncertainty = 0
     
     spectrum_energies, spectrum_counts = read_serpent_gamma_spectrum(serpent_filename)
-    response_edges, response_counts, response_uncertainties = read_binned_response(response_filename)
+    response_edges, response_counts, response_uncertainties = get_registered_binned_response(response_filename).get_response()
     
     ORIGEN_binned_spectrum = convert_to_ORIGEN_binning(spectrum_energies, spectrum_counts, response_edges)
     
@@ -560,12 +862,12 @@ def Predict_serpent_sampled_gamma_response(serpent_filename, response_filename):
     uncertainty = 0
     
     spectrum_energies, spectrum_counts = read_serpent_gamma_spectrum(serpent_filename)
-    response_energies, response_counts, response_uncertainties = read_sampled_response(response_filename)
     
     #Uncertainties not provided by Serpent gamma spectrum output
-    spectrum_uncertainties = [0] * len(spectrum_energies)
+    spectrum_uncertainties = np.zeros(len(spectrum_energies))
     
-    prediction, uncertainty = Predict_sampled_response(spectrum_energies, spectrum_counts, spectrum_uncertainties, response_energies, response_counts, response_uncertainties)
+    predictions, uncertainties = Predict_sampled_spectrum_response(spectrum_energies, spectrum_counts, spectrum_uncertainties, get_registered_sampled_response(response_filename))
+    prediction, uncertainty = float(predictions[0]), float(uncertainties[0])
 
     return prediction, uncertainty
 
@@ -600,7 +902,7 @@ def Predict_serpent_isotope_response(serpent_filename, response_filename):
     prediction = 0
     uncertainty = 0
     
-    isotope_list, response, response_uncertainty = read_isotope_response(response_filename, "mass")
+    isotope_list, unused1, unused2, response, response_uncertainty = get_registered_isotope_response(response_filename).get_response()
     
     #read the isotope_list that we have a response for.
     isotope_mass_contents = read_serpent_isotope_contents(serpent_filename, isotope_list)
@@ -660,13 +962,13 @@ def Predict_serpent(serpent_filename, fuel_type, output_type, gamma_response_typ
     #Since gamma data and isotope composition comes from different files, allow for beta-only predictions.
         
         if output_type == "spectrum" and gamma_response_type == "binned":
-            gamma_prediction, gamma_uncertainty = Predict_serpent_binned_gamma_response(serpent_filename, Binned_gamma_response_folder + fuel_type + ".txt")
+            gamma_prediction, gamma_uncertainty = Predict_serpent_binned_gamma_response(serpent_filename, get_response_filename("Binned_gamma_response", fuel_type))
             
         elif output_type == "spectrum" and gamma_response_type == "sampled":
-            gamma_prediction, gamma_uncertainty = Predict_serpent_sampled_gamma_response(serpent_filename, Sampled_gamma_response_folder + fuel_type + ".txt")
+            gamma_prediction, gamma_uncertainty = Predict_serpent_sampled_gamma_response(serpent_filename, get_response_filename("Sampled_gamma_response", fuel_type))
             
         elif output_type == "isotope" and gamma_response_type == "isotope":
-            gamma_prediction, gamma_uncertainty = Predict_serpent_isotope_response(serpent_filename, Isotope_gamma_response_folder + fuel_type + ".txt")
+            gamma_prediction, gamma_uncertainty = Predict_serpent_isotope_response(serpent_filename, get_response_filename("Isotope_gamma_response", fuel_type))
         else:
             print("Predict_serpent called with an unsupported combination of Serpent output type and gamma response type")
             print("Implemented combinations are:")
@@ -685,7 +987,7 @@ def Predict_serpent(serpent_filename, fuel_type, output_type, gamma_response_typ
         beta_prediction = 0
         beta_uncertainty = 0
     elif beta_response_type == "isotope" and output_type == "isotope":
-         beta_prediction, beta_uncertainty = Predict_serpent_isotope_response(serpent_filename, Isotope_beta_response_folder + fuel_type + ".txt")
+         beta_prediction, beta_uncertainty = Predict_serpent_isotope_response(serpent_filename, get_response_filename("Isotope_beta_response", fuel_type))
     elif beta_response_type == "none":
         beta_prediction = 0
         beta_uncertainty = 0
@@ -754,24 +1056,28 @@ def Predict_ORIGEN(ORIGEN_filename, cooling_time_header, fuel_type, gamma_respon
         print("Predict_ORIGEN called with an unsupported beta response type. It should be \"isotope\" or \"none\"")
         return 0,0
     
-    if gamma_response_type == "binned":
-        gamma_prediction, gamma_uncertainty = Predict_ORIGEN_binned_gamma_response(ORIGEN_filename, cooling_time_header, Binned_gamma_response_folder + fuel_type + ".txt")
+    #Read the output file once, all gamma and beta predictions are made from it.
+    with read_ORIGEN_output(ORIGEN_filename) as ORIGEN_data:
+    
+        if gamma_response_type == "binned":
+            gamma_prediction, gamma_uncertainty = Predict_ORIGEN_binned_gamma_response(ORIGEN_data, cooling_time_header, get_response_filename("Binned_gamma_response", fuel_type))
         
-    elif gamma_response_type == "isotope":
-       gamma_prediction, gamma_uncertainty = Predict_ORIGEN_gamma_contents(ORIGEN_filename, cooling_time_header, Isotope_gamma_response_folder + fuel_type + ".txt")
+        elif gamma_response_type == "isotope":
+           gamma_prediction, gamma_uncertainty = Predict_ORIGEN_gamma_contents(ORIGEN_data, cooling_time_header, get_response_filename("Isotope_gamma_response", fuel_type))
         
-    elif gamma_response_type == "sampled":
-        gamma_prediction, gamma_uncertainty = Predict_ORIGEN_sampled_gamma_response(ORIGEN_filename, cooling_time_header, Sampled_gamma_response_folder + fuel_type + ".txt")
+        elif gamma_response_type == "sampled":
+            gamma_prediction, gamma_uncertainty = Predict_ORIGEN_sampled_gamma_response(ORIGEN_data, cooling_time_header, get_response_filename("Sampled_gamma_response", fuel_type))
         
-    else:
-        gamma_prediction = 0
-        beta_prediction = 0
+        else:
+            gamma_prediction = 0
+            beta_prediction = 0
+    
+        if beta_response_type == "isotope":
+            beta_prediction, beta_uncertainty = Predict_ORIGEN_beta_contents(ORIGEN_data, cooling_time_header, get_response_filename("Isotope_beta_response", fuel_type))
+        elif beta_response_type == "none":
+            beta_prediction = 0
+            beta_uncertainty = 0
     
-    if beta_response_type == "isotope":
-        beta_prediction, beta_uncertainty = Predict_ORIGEN_beta_contents(ORIGEN_filename, cooling_time_header, Isotope_beta_response_folder + fuel_type + ".txt")
-    elif beta_response_type == "none":
-        beta_prediction = 0
-        beta_uncertainty = 0
         
     prediction = gamma_prediction + beta_prediction
     uncertainty = math.sqrt(gamma_uncertainty**2 + beta_uncertainty**2)
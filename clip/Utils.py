@@ -1,6 +1,17 @@
+import hashlib
+import collections
 
+import numpy as np
 
+#Number of points of the lookup tables of sampled responses, and the largest number used when 
+#tabulating for a target accuracy.
+default_lookup_table_points = 2**16
+max_lookup_table_points = 2**24
 
+#A lookup table of a sampled response: the uniform energy grid and its step, and the response and 
+#uncertainty (rows) at each grid point (columns) with the slopes to the next point. The whole table is 
+#published as one attribute, so that predictions in other threads never see half of a new table.
+interpolation_table = collections.namedtuple("interpolation_table", ["energies", "step", "values", "slopes"])
 
 class binned_spectrum:
     bin_edges = []
@@ -33,29 +44,244 @@ class sampled_spectrum:
     sampled_energies = []
     sampled_response = []
     sampled_uncertainties = []
+    response_function = None
+    basis_function = None
+    lookup_table = None
+    lookup_table_error = 0
+    binned_responses = {}
     
     def __init__(self, energies = [], responses = [], uncertainties = []):
         self.sampled_energies = energies
         self.sampled_response = responses
         self.sampled_uncertainties = uncertainties
         
+        #Build the interpolation once, when the response is loaded. A cubic spline needs at least 
+        #four points, so malformed responses only fail if they are used.
+        self.response_function = None
+        self.basis_function = None
+        self.lookup_table = None
+        self.lookup_table_error = 0
+        self.binned_responses = {}
+        if len(energies) > 3:
+            self.get_response_function()
+        
     def set_spectrum(self, energies, responses, uncertainties):
         self.sampled_energies = energies
         self.sampled_response = responses
         self.sampled_uncertainties = uncertainties
+        self.response_function = None
+        self.basis_function = None
+        self.lookup_table = None
+        self.binned_responses = {}
         
     def set_sampled_energies(self, energies):
         self.sampled_energies = energies
+        self.response_function = None
+        self.basis_function = None
+        self.lookup_table = None
+        self.binned_responses = {}
         
     def set_sampled_responses(self, responses):
         self.sampled_response = responses
+        self.response_function = None
+        self.basis_function = None
+        self.lookup_table = None
+        self.binned_responses = {}
         
     def set_sampled_uncertainties(self, uncertainties):
         self.sampled_uncertainties = uncertainties
+        self.response_function = None
+        self.basis_function = None
+        self.lookup_table = None
+        self.binned_responses = {}
         
     def get_response(self):
         return self.sampled_energies, self.sampled_response, self.sampled_uncertainties
     
+    def get_response_function(self):
+        """
+        Get the cubic spline interpolation of the response and its uncertainty, built on first use. 
+        The spline returns a 2 x N array, with the response in the first row and the uncertainty in the second.
+        """
+        
+        if self.response_function is None:
+            #SciPy is only needed for sampled responses.
+            from scipy.interpolate import interp1d
+            
+            self.response_function = interp1d(np.asarray(self.sampled_energies, dtype = float), 
+                                              np.vstack((np.asarray(self.sampled_response, dtype = float), np.asarray(self.sampled_uncertainties, dtype = float))), 
+                                              kind = 'cubic')
+            
+        return self.response_function
+    
+    def get_basis_function(self):
+        """
+        Get the cubic spline basis functions of the response, built on first use. Since the spline is linear 
+        in the sampled values, the i:th basis function is the derivative of the response with respect to the 
+        i:th sampled value. The spline returns an N x (number of sampled energies) array.
+        """
+        
+        if self.basis_function is None:
+            #SciPy is only needed for sampled responses.
+            from scipy.interpolate import make_interp_spline
+            
+            #The same cubic spline as interp1d(kind='cubic'), for the unit vectors.
+            energies = np.asarray(self.sampled_energies, dtype = float)
+            self.basis_function = make_interp_spline(energies, np.eye(len(energies)), k = 3)
+            
+        return self.basis_function
+    
+    def get_basis(self, energies):
+        """
+        Get the derivative of the response at an array of energies with respect to each sampled response value, 
+        as an array with one row per energy. Energies outside the sampled range have no response, and a zero derivative.
+        With a lookup table, it is the derivative of the linear interpolation between the tabulated spline values.
+        """
+        
+        energies = np.asarray(energies, dtype = float)
+        basis = np.zeros((len(energies), len(self.sampled_energies)))
+        
+        inside = (energies >= self.sampled_energies[0]) & (energies < self.sampled_energies[len(self.sampled_energies) - 1])
+        if np.any(inside):
+            table = self.lookup_table
+            if table is not None:
+                #The same interpolation as evaluate_lookup_table, of the basis at the grid points
+                position = (energies[inside] - self.sampled_energies[0]) * (1 / table.step)
+                index = np.minimum(position.astype(np.intp), table.values.shape[1] - 2)
+                fraction = (position - index)[:, np.newaxis]
+                basis_function = self.get_basis_function()
+                basis[inside] = basis_function(table.energies[index]) * (1 - fraction) + basis_function(table.energies[index + 1]) * fraction
+            else:
+                basis[inside] = self.get_basis_function()(energies[inside])
+        
+        return basis
+    
+    def get_binned_basis(self, bin_edges):
+        """
+        Get the derivative of the binned response from get_binned_response with respect to each sampled 
+        response value, as an array with one row per bin. The result is kept for each set of bin edges.
+        """
+        
+        bin_edges = np.asarray(bin_edges, dtype = float)
+        fingerprint = "basis " + hashlib.sha1(bin_edges.tobytes()).hexdigest()
+        
+        if fingerprint not in self.binned_responses:
+            #SciPy is only needed for sampled responses.
+            from clip.setup_response_function import get_binned_response_function
+            
+            self.binned_responses[fingerprint] = np.asarray(get_binned_response_function(self.sampled_energies, np.eye(len(self.sampled_energies)), bin_edges))
+        
+        return self.binned_responses[fingerprint]
+    
+    def evaluate(self, energies):
+        """
+        Evaluate the response and its uncertainty at an array of energies at once. Energies outside 
+        the sampled range, from the first sampled energy up to but not including the last, have 
+        no response. Returns arrays of the response and the uncertainty at each energy.
+        """
+        
+        energies = np.asarray(energies, dtype = float)
+        
+        response = np.zeros(len(energies))
+        uncertainty = np.zeros(len(energies))
+        
+        inside = (energies >= self.sampled_energies[0]) & (energies < self.sampled_energies[len(self.sampled_energies) - 1])
+        if np.any(inside):
+            table = self.lookup_table
+            if table is not None:
+                values = self.evaluate_lookup_table(energies[inside], table)
+            else:
+                values = self.get_response_function()(energies[inside])
+            response[inside] = values[0]
+            uncertainty[inside] = values[1]
+        
+        return response, uncertainty
+    
+    def get_binned_response(self, bin_edges):
+        """
+        Get the average response and uncertainty in each bin of a binned spectrum with the given bin edges, 
+        e.g. those of an ORIGEN gamma spectrum. The result is kept for each set of bin edges, so that 
+        predictions for many spectra with the same binning only rebin the response once.
+        """
+        
+        bin_edges = np.asarray(bin_edges, dtype = float)
+        fingerprint = hashlib.sha1(bin_edges.tobytes()).hexdigest()
+        
+        if fingerprint not in self.binned_responses:
+            #SciPy is only needed for sampled responses.
+            from clip.setup_response_function import get_binned_response_function
+            
+            self.binned_responses[fingerprint] = (get_binned_response_function(self.sampled_energies, self.sampled_response, bin_edges),
+                                                  get_binned_response_function(self.sampled_energies, self.sampled_uncertainties, bin_edges))
+        
+        return self.binned_responses[fingerprint]
+    
+    def set_lookup_table(self, number_of_points = default_lookup_table_points, target_error = None):
+        """
+        Tabulate the response and its uncertainty on a uniform energy grid with number_of_points points, 
+        after which evaluate() interpolates linearly in the table instead of evaluating the cubic spline. 
+        If a target_error is given, the number of points is doubled until the error is below it. 
+        Returns the maximum interpolation error, relative to the largest value of the response or 
+        uncertainty, found by comparing to the cubic spline between the grid points.
+        """
+        
+        response_function = self.get_response_function()
+        first_energy = float(self.sampled_energies[0])
+        last_energy = float(self.sampled_energies[len(self.sampled_energies) - 1])
+        
+        while True:
+            grid = np.linspace(first_energy, last_energy, number_of_points)
+            values = np.ascontiguousarray(response_function(grid))
+            table = interpolation_table(grid, (last_energy - first_energy) / (number_of_points - 1), values, np.diff(values, axis = 1))
+            
+            #The error of linear interpolation is largest between the grid points.
+            test_energies = (grid[:-1, np.newaxis] + table.step * np.array([0.25, 0.5, 0.75])).ravel()
+            reference = response_function(test_energies)
+            scale = np.max(np.abs(reference), axis = 1, keepdims = True)
+            scale[scale == 0] = 1
+            error = float(np.max(np.abs(self.evaluate_lookup_table(test_energies, table) - reference) / scale))
+            
+            if target_error is None or error <= target_error or number_of_points >= max_lookup_table_points:
+                break
+            number_of_points = 2 * number_of_points - 1
+        
+        if target_error is not None and error > target_error:
+            print("The lookup table reached the maximum of " + str(number_of_points) + " points with a relative error of " + str(error) + ", above the target of " + str(target_error))
+        
+        #Only the finished table is used.
+        self.lookup_table_error = error
+        self.lookup_table = table
+        
+        return error
+    
+    def clear_lookup_table(self):
+        """
+        Stop using the lookup table, so that evaluate() uses the cubic spline again.
+        """
+        
+        self.lookup_table = None
+        self.lookup_table_error = 0
+    
+    def evaluate_lookup_table(self, energies, table = None):
+        """
+        Linear interpolation in the lookup table, or in the given interpolation_table, for energies within 
+        the sampled range. Returns a 2 x N array, with the response in the first row and the uncertainty in the second.
+        """
+        
+        if table is None:
+            table = self.lookup_table
+        
+        position = (energies - self.sampled_energies[0]) * (1 / table.step)
+        index = np.minimum(position.astype(np.intp), table.values.shape[1] - 2)
+        fraction = position - index
+        
+        #Indexing each row on its own is much faster than indexing the columns of the table.
+        values = np.empty((2, len(energies)))
+        for row in range(0, 2):
+            values[row] = table.values[row][index] + table.slopes[row][index] * fraction
+        
+        return values
+    
     
 class isotope_response:
     isotope_list = []
@@ -97,6 +323,92 @@ class isotope_response:
         return self.isotope_list, self.isotope_activity_response, self.isotope_activity_uncertainty, self.isotope_mass_response, self.isotope_mass_uncertainty
     
     
+class prediction_breakdown:
+    """
+    The contributions of the bins, gamma lines or isotopes of a prediction. contributions has the 
+    light intensity from each of them, which add up to the prediction, and variances their part of 
+    the squared uncertainty. They are labelled by their index unless labels are given.
+    """
+    
+    prediction = 0
+    uncertainty = 0
+    contributions = []
+    variances = []
+    labels = []
+    content_gradient = None
+    content_labels = None
+    response_gradient = None
+    
+    def __init__(self, prediction = 0, uncertainty = 0, contributions = [], variances = [], labels = None):
+        self.prediction = prediction
+        self.uncertainty = uncertainty
+        self.contributions = np.asarray(contributions, dtype = float)
+        self.variances = np.asarray(variances, dtype = float)
+        self.set_labels(labels)
+        self.content_gradient = None
+        self.content_labels = None
+        self.response_gradient = None
+        
+    def set_gradients(self, content_gradient, response_gradient, content_labels = None):
+        """
+        Set the derivatives of the prediction with respect to the content (e.g. the bin count, gamma line 
+        intensity or isotope mass) of each item, and with respect to each response value. 
+        content_labels labels the contents if they are not the items, e.g. the gamma lines of grouped items.
+        """
+        
+        self.content_gradient = content_gradient
+        self.response_gradient = response_gradient
+        self.content_labels = content_labels
+        
+    def set_labels(self, labels):
+        if labels is None:
+            labels = np.arange(len(self.contributions))
+        self.labels = np.asarray(labels)
+        
+    def get_contribution_shares(self):
+        return np.divide(self.contributions, self.prediction, out = np.zeros(len(self.contributions)), where = self.prediction != 0)
+    
+    def get_uncertainty_shares(self):
+        return np.divide(self.variances, self.uncertainty**2, out = np.zeros(len(self.variances)), where = self.uncertainty != 0)
+    
+    def group(self, labels):
+        """
+        Add up the contributions of the items with the same label, e.g. the gamma lines of each nuclide. 
+        Returns a prediction_breakdown with one item per label, in sorted order. The gradients are kept, 
+        with the content gradient still for the items before grouping, labelled by content_labels.
+        """
+        
+        groups, indices = np.unique(np.asarray(labels), return_inverse = True)
+        
+        contributions = np.bincount(indices, weights = self.contributions, minlength = len(groups))
+        variances = np.bincount(indices, weights = self.variances, minlength = len(groups))
+        
+        grouped = prediction_breakdown(self.prediction, self.uncertainty, contributions, variances, groups)
+        if self.content_gradient is not None or self.response_gradient is not None:
+            grouped.set_gradients(self.content_gradient, self.response_gradient, self.labels if self.content_labels is None else self.content_labels)
+        return grouped
+    
+    def get_top(self, k, by = "contribution"):
+        """
+        Get the k items with the largest contributions to the prediction (by \"contribution\") or to 
+        its uncertainty (by \"uncertainty\"), as a list of the label, the contribution, and the shares 
+        of the prediction and of the squared uncertainty of each item.
+        """
+        
+        if by == "contribution":
+            order = np.argsort(-np.abs(self.contributions), kind = "stable")[:k]
+        elif by == "uncertainty":
+            order = np.argsort(-self.variances, kind = "stable")[:k]
+        else:
+            print("get_top called with unsupported ranking " + str(by) + ", should be contribution or uncertainty")
+            return []
+        
+        contribution_shares = self.get_contribution_shares()
+        uncertainty_shares = self.get_uncertainty_shares()
+        
+        return [(self.labels[i].item(), float(self.contributions[i]), float(contribution_shares[i]), float(uncertainty_shares[i])) for i in order]
+    
+    
 if __name__ =="__main__":
     spectrum = binned_spectrum()
     spectrum.set_bin_edges([1,2,3,4,5])
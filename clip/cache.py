@@ -0,0 +1,250 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import collections
+
+import numpy as np
+
+from clip.messages import report_error
+
+#On-disk cache of parsed burnup code outputs. Each parsed file is stored as one .npz file, named by
+#a hash of the reader, the reader version and either the file contents or the file size and modification
+#time, so that a changed file or a changed reader never matches an old entry.
+#The cache is disabled unless a cache folder is set, either with set_cache_folder or with the
+#CLIP_CACHE_FOLDER environment variable.
+#Long-running processes can also keep the most recently used entries in memory, with set_memory_cache_size
+#or the CLIP_MEMORY_CACHE_SIZE environment variable, with or without a cache folder.
+
+cache_file_ending = ".npz"
+default_max_cache_size = 1024**3    #bytes
+
+cache_settings = {"folder": os.environ.get("CLIP_CACHE_FOLDER", ""),
+                  "max_size": int(os.environ.get("CLIP_CACHE_MAX_SIZE", default_max_cache_size)),
+                  "hash_contents": False,
+                  "memory_size": int(os.environ.get("CLIP_MEMORY_CACHE_SIZE", 0))}
+
+#Entries kept in memory, by cache key, as the JSON metadata, the read-only arrays and their size in bytes.
+memory_cache = collections.OrderedDict()
+memory_cache_lock = threading.Lock()
+
+#The size of the cache folder found by the last eviction, plus the entries written since, so that the folder
+#is only listed when it may have grown too large. Entries written by other processes are found by listing
+#it again every evict_interval writes.
+evict_interval = 1000
+#A full cache is evicted to this fraction of its maximum size, so that it is not listed again on every write.
+evict_fraction = 0.9
+folder_size = {"folder": None, "size": 0, "writes": 0}
+folder_size_lock = threading.Lock()
+
+def set_cache_folder(folder, max_size = default_max_cache_size, hash_contents = False):
+    """
+    Enable the cache of parsed outputs, stored in the given folder. When the folder grows larger
+    than max_size bytes, the least recently used entries are removed.
+    If hash_contents is True, outputs are identified by a hash of their contents rather than by their
+    size and modification time, which is slower but also finds copies of the same file.
+    An empty folder disables the cache.
+    """
+
+    cache_settings["folder"] = folder
+    cache_settings["max_size"] = max_size
+    cache_settings["hash_contents"] = hash_contents
+
+def set_memory_cache_size(max_size):
+    """
+    Keep up to max_size bytes of parsed outputs in memory, removing the least recently used entries
+    when there are more. 0 disables the memory cache.
+    """
+
+    cache_settings["memory_size"] = max_size
+    evict_memory_cache(max_size)
+
+def get_cache_folder():
+    return cache_settings["folder"]
+
+def cache_enabled():
+    return len(cache_settings["folder"]) > 0 or cache_settings["memory_size"] > 0
+
+def evict_memory_cache(max_size):
+    with memory_cache_lock:
+        total_size = sum([entry[2] for entry in memory_cache.values()])
+        while total_size > max(max_size, 0):
+            total_size -= memory_cache.popitem(last = False)[1][2]
+
+def store_in_memory(key, metadata, arrays):
+    #The arrays are shared by everyone who loads the entry, and can therefore not be changed.
+    arrays = {name: np.array(arrays[name]) for name in arrays}
+    for array in arrays.values():
+        array.setflags(write = False)
+
+    with memory_cache_lock:
+        memory_cache[key] = (json.dumps(metadata), arrays, sum([array.nbytes for array in arrays.values()]))
+        memory_cache.move_to_end(key)
+
+    evict_memory_cache(cache_settings["memory_size"])
+
+def get_cache_key(filename, reader, reader_version):
+    """
+    Get the name of the cache entry for a file read by the given reader.
+    """
+
+    key = hashlib.sha256()
+    key.update((reader + "\n" + str(reader_version) + "\n").encode())
+
+    if cache_settings["hash_contents"]:
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(1024**2), b""):
+                key.update(block)
+    else:
+        status = os.stat(filename)
+        key.update((os.path.realpath(filename) + "\n" + str(status.st_size) + "\n" + str(status.st_mtime_ns)).encode())
+
+    return key.hexdigest()
+
+def get_cache_path(filename, reader, reader_version):
+    return os.path.join(cache_settings["folder"], get_cache_key(filename, reader, reader_version) + cache_file_ending)
+
+def load_cached_output(filename, reader, reader_version):
+    """
+    Load a parsed file from the cache. Returns the metadata and a dictionary of arrays that were
+    stored for it, or None if the cache is disabled or has no valid entry for the file.
+    """
+
+    if not cache_enabled():
+        return None
+
+    try:
+        key = get_cache_key(filename, reader, reader_version)
+    except OSError:
+        return None
+
+    with memory_cache_lock:
+        entry = memory_cache.get(key)
+        if entry is not None:
+            memory_cache.move_to_end(key)
+
+    if entry is not None:
+        return json.loads(entry[0]), dict(entry[1])
+
+    if len(cache_settings["folder"]) == 0:
+        return None
+
+    try:
+        path = os.path.join(cache_settings["folder"], key + cache_file_ending)
+        with np.load(path, allow_pickle = False) as entry:
+            arrays = {name: entry[name] for name in entry.files}
+    except Exception:
+        #Missing, partially evicted or unreadable entries are treated as not cached.
+        return None
+
+    if "metadata" not in arrays:
+        return None
+    metadata = json.loads(str(arrays.pop("metadata")))
+
+    try:
+        #Mark the entry as recently used, so that it is evicted last.
+        os.utime(path)
+    except OSError:
+        pass
+
+    if cache_settings["memory_size"] > 0:
+        store_in_memory(key, metadata, arrays)
+
+    return metadata, arrays
+
+def store_cached_output(filename, reader, reader_version, metadata, arrays):
+    """
+    Store a parsed file in the cache, as the given metadata (which must be JSON serializable) and arrays.
+    The entry is written to a temporary file which is then renamed, so that concurrent readers
+    and writers never see a partially written entry.
+    """
+
+    if not cache_enabled():
+        return
+
+    if cache_settings["memory_size"] > 0:
+        try:
+            store_in_memory(get_cache_key(filename, reader, reader_version), metadata, arrays)
+        except OSError:
+            return
+
+    if len(cache_settings["folder"]) == 0:
+        return
+
+    try:
+        os.makedirs(cache_settings["folder"], exist_ok = True)
+        path = get_cache_path(filename, reader, reader_version)
+
+        handle, temporary_path = tempfile.mkstemp(suffix = ".tmp", dir = cache_settings["folder"])
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                np.savez(f, metadata = np.array(json.dumps(metadata)), **arrays)
+                size = f.tell()
+            replaced_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+    except OSError as e:
+        report_error("Failed to write to the cache folder " + cache_settings["folder"] + ": " + str(e))
+        return
+
+    with folder_size_lock:
+        if folder_size["folder"] == cache_settings["folder"]:
+            folder_size["size"] += size - replaced_size
+            folder_size["writes"] += 1
+            if folder_size["size"] <= cache_settings["max_size"] and folder_size["writes"] < evict_interval:
+                return
+
+    evict_cached_outputs(cache_settings["max_size"], int(evict_fraction * cache_settings["max_size"]))
+
+def evict_cached_outputs(max_size, target_size = None):
+    """
+    Remove the least recently used cache entries if the cache is larger than max_size bytes, until it is 
+    no larger than target_size bytes, by default max_size.
+    """
+
+    if target_size is None:
+        target_size = max_size
+
+    entries = []
+
+    for name in os.listdir(cache_settings["folder"]):
+        if not name.endswith(cache_file_ending):
+            continue
+        try:
+            status = os.stat(os.path.join(cache_settings["folder"], name))
+        except OSError:
+            #Removed by another process
+            continue
+        entries.append((status.st_mtime_ns, status.st_size, name))
+
+    total_size = sum([entry[1] for entry in entries])
+
+    #Nothing is removed unless the cache is too large.
+    if total_size <= max_size:
+        target_size = total_size
+
+    for last_used, size, name in sorted(entries):
+        if total_size <= target_size:
+            break
+        try:
+            os.remove(os.path.join(cache_settings["folder"], name))
+        except OSError:
+            pass
+        total_size -= size
+
+    with folder_size_lock:
+        folder_size.update({"folder": cache_settings["folder"], "size": total_size, "writes": 0})
+
+def clear_cache():
+    """
+    Remove all entries from the cache.
+    """
+
+    with memory_cache_lock:
+        memory_cache.clear()
+
+    if len(cache_settings["folder"]) > 0 and os.path.isdir(cache_settings["folder"]):
+        evict_cached_outputs(0)
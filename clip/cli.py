@@ -0,0 +1,232 @@
+import os
+import re
+import sys
+import csv
+import glob
+import json
+import argparse
+import contextlib
+
+from clip.Clip import *
+from clip.cache import set_cache_folder
+from clip.cache import set_memory_cache_size
+
+#Command line interface, installed as the clip command:
+#  clip predict <files, directories or globs> --fuel PWR17x17 --gamma binned --cooling-time "10.0 y"
+#  clip compile <data folder> <library file>
+#  clip serve --socket /tmp/clip.sock, or clip serve --port 8080
+#Predictions are written as CSV or JSON lines while the files complete, and the files are found and
+#predicted lazily, so that the memory used does not grow with the number of files.
+
+#The burnup calculation of an output file, from its name, for --burnup auto
+output_file_patterns = [("ORIGEN", re.compile(r"\.out$")),
+                        ("Serpent_gamma", re.compile(r"_gamma\.m$")),
+                        ("Serpent_bumat", re.compile(r"\.bumat[0-9]*$"))]
+
+output_columns = ["filename", "burnup_calculation", "cooling_time", "prediction", "uncertainty", "error_type", "error_message"]
+
+def get_burnup_calculation(filename):
+    """
+    Get the burnup calculation, ORIGEN, Serpent_gamma or Serpent_bumat, of an output file from its name,
+    or None if it is not recognised.
+    """
+
+    for burnup, pattern in output_file_patterns:
+        if pattern.search(filename) is not None:
+            return burnup
+    return None
+
+def is_output_file(filename, burnup):
+    found = get_burnup_calculation(filename)
+    return found is not None and (burnup == "auto" or burnup == found)
+
+def find_output_files(paths, burnup):
+    """
+    Iterate over the files given on the command line. Directories are searched for the output files of the 
+    burnup calculation, or of any burnup calculation if burnup is \"auto\", and so are the matches of globs, 
+    e.g. \"outputs/**\". Files that are not globs are used as given.
+    """
+
+    for path in paths:
+        if glob.has_magic(path):
+            for match in glob.iglob(path, recursive = True):
+                if os.path.isfile(match) and is_output_file(match, burnup):
+                    yield match
+        elif os.path.isdir(path):
+            for root, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for file in sorted(filenames):
+                    if is_output_file(file, burnup):
+                        yield os.path.join(root, file)
+        else:
+            yield path
+
+def get_configs(predictor, args):
+    """
+    Get the prediction configurations by burnup calculation, with one per cooling time for ORIGEN.
+    Returns None if predictions can not be made with the arguments.
+    """
+
+    if args.burnup == "auto":
+        burnups = ["ORIGEN", "Serpent_gamma", "Serpent_bumat"] if len(args.cooling_time) > 0 else ["Serpent_gamma", "Serpent_bumat"]
+    else:
+        burnups = [args.burnup]
+
+    configs = {}
+    for burnup in burnups:
+        cooling_times = args.cooling_time if burnup == "ORIGEN" and len(args.cooling_time) > 0 else [""]
+        configs[burnup] = []
+        for cooling_time in cooling_times:
+            config = predictor.get_prediction_config(args.fuel, args.gamma, args.beta, burnup, cooling_time)
+            if config is None:
+                return None
+            configs[burnup].append(config)
+
+    return configs
+
+def get_tasks(filenames, configs, burnup, skipped):
+    """
+    Iterate over the (filename, config) pairs to predict. Files without a burnup calculation are
+    reported and counted in skipped.
+    """
+
+    for filename in filenames:
+        file_burnup = get_burnup_calculation(filename) if burnup == "auto" else burnup
+
+        if file_burnup not in configs:
+            if file_burnup is None:
+                print("clip: skipping " + filename + ", which is not an ORIGEN or Serpent output", file = sys.stderr)
+            else:
+                print("clip: skipping " + filename + ", an ORIGEN output, since no --cooling-time was given", file = sys.stderr)
+            skipped[0] += 1
+            continue
+
+        for config in configs[file_burnup]:
+            yield filename, config
+
+class result_writer:
+    """
+    Write prediction results as CSV or JSON lines, flushing each row so that results can be read
+    while the predictions are running.
+    """
+
+    def __init__(self, output, output_format):
+        self.output = output
+        self.output_format = output_format
+
+        if output_format == "csv":
+            self.writer = csv.writer(output, lineterminator = "\n")
+            self.writer.writerow(output_columns)
+            output.flush()
+
+    def write(self, config, result):
+        row = [result.filename, config.burnup_calculation, config.ORIGEN_cooling_time_header, float(result.prediction), float(result.uncertainty),
+               "" if result.error is None else result.error["type"], "" if result.error is None else result.error["message"]]
+
+        if self.output_format == "csv":
+            self.writer.writerow(row)
+        else:
+            values = dict(zip(output_columns, row))
+            del values["error_type"], values["error_message"]
+            values["error"] = result.error
+            values["warnings"] = list(result.warnings)
+            self.output.write(json.dumps(values) + "\n")
+        self.output.flush()
+
+def predict_command(args):
+    output = sys.stdout if args.output == "-" else open(args.output, "w", newline = "")
+
+    try:
+        #Clip prints its messages, which must not end up among the results on stdout.
+        with contextlib.redirect_stdout(sys.stderr):
+            predictor = Clip(args.data)
+            configs = get_configs(predictor, args)
+
+        if configs is None:
+            return 2
+
+        writer = result_writer(output, args.format)
+        skipped = [0]
+        failed = 0
+
+        tasks = get_tasks(find_output_files(args.paths, args.burnup), configs, args.burnup, skipped)
+
+        try:
+            for config, result in predictor.predict_stream(tasks, args.workers):
+                writer.write(config, result)
+                if result.error is not None:
+                    failed += 1
+        finally:
+            predictor.shutdown_prediction_executor()
+
+        if failed > 0 or skipped[0] > 0:
+            print("clip: " + str(failed) + " predictions failed and " + str(skipped[0]) + " files were skipped", file = sys.stderr)
+            return 1
+        return 0
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+def compile_command(args):
+    number_of_responses = compile_response_library(args.data_folder, args.library)
+    print("Compiled " + str(number_of_responses) + " responses from " + args.data_folder + " into " + args.library)
+    return 0
+
+def serve_command(args):
+    #Only imported for the daemon, so that predict does not import the servers.
+    from clip.server import serve
+    
+    if args.cache_folder is not None:
+        set_cache_folder(args.cache_folder)
+    set_memory_cache_size(args.memory_cache_size)
+
+    serve(args.data, args.socket, args.host, args.port, args.reload_interval)
+    return 0
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog = "clip", description = "Predict the Cherenkov light intensity of nuclear fuel assemblies.")
+    commands = parser.add_subparsers(dest = "command", required = True)
+
+    predict = commands.add_parser("predict", help = "make predictions for ORIGEN and Serpent outputs",
+                                  description = "Make predictions for ORIGEN and Serpent outputs, written as they complete.")
+    predict.add_argument("paths", nargs = "+", help = "output files, directories or globs, e.g. \"outputs/**/*.out\"")
+    predict.add_argument("--fuel", required = True, help = "the fuel type, e.g. PWR17x17")
+    predict.add_argument("--gamma", default = "binned", choices = ["binned", "sampled", "isotope", "none"], help = "the gamma prediction mode (default: binned)")
+    predict.add_argument("--beta", default = "none", choices = ["isotope", "none"], help = "the beta prediction mode (default: none)")
+    predict.add_argument("--burnup", default = "auto", choices = ["auto", "ORIGEN", "Serpent_gamma", "Serpent_bumat"],
+                         help = "the burnup calculation, by default from the file names: *.out, *_gamma.m and *.bumat*")
+    predict.add_argument("--cooling-time", action = "append", default = [],
+                         help = "an ORIGEN cooling time column header, e.g. \"10.0 y\". Can be given several times, for one prediction per cooling time")
+    predict.add_argument("--workers", type = int, default = None, help = "the number of worker processes (default: the number of CPUs)")
+    predict.add_argument("--format", default = "csv", choices = ["csv", "jsonl"], help = "the output format (default: csv)")
+    predict.add_argument("--output", "-o", default = "-", help = "the output file (default: stdout)")
+    predict.add_argument("--data", default = os.environ.get("CLIP_DATA_FOLDER", default_data_folder),
+                         help = "the data folder or compiled response library (default: $CLIP_DATA_FOLDER or Data)")
+    predict.set_defaults(function = predict_command)
+
+    compile_library = commands.add_parser("compile", help = "compile the responses of a data folder into a response library")
+    compile_library.add_argument("data_folder")
+    compile_library.add_argument("library")
+    compile_library.set_defaults(function = compile_command)
+
+    serve = commands.add_parser("serve", help = "answer prediction requests from a daemon with the responses loaded",
+                                description = "Answer JSON prediction requests over a Unix socket or HTTP on localhost, with the responses and parsed outputs kept in memory.")
+    address = serve.add_mutually_exclusive_group(required = True)
+    address.add_argument("--socket", help = "the Unix socket to listen on")
+    address.add_argument("--port", type = int, help = "the HTTP port to listen on")
+    serve.add_argument("--host", default = "127.0.0.1", help = "the HTTP address to listen on (default: 127.0.0.1)")
+    serve.add_argument("--data", default = os.environ.get("CLIP_DATA_FOLDER", default_data_folder),
+                       help = "the data folder or compiled response library (default: $CLIP_DATA_FOLDER or Data)")
+    serve.add_argument("--reload-interval", type = float, default = 2.0, help = "seconds between checks for changed responses (default: 2)")
+    serve.add_argument("--cache-folder", default = None, help = "the folder of the on-disk cache of parsed outputs")
+    serve.add_argument("--memory-cache-size", type = int, default = 256 * 1024**2, help = "bytes of parsed outputs kept in memory (default: 256 MiB)")
+    serve.set_defaults(function = serve_command)
+
+    return parser
+
+def main(argv = None):
+    args = get_parser().parse_args(argv)
+    return args.function(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,181 @@
+#Nuclide data for the full chart of nuclides, with conversion between the nuclide name formats used by
+#ORIGEN (e.g Cs137, or cs137 and sr 90 in the output tables) and Serpent (e.g 55137 in bumat files).
+#Nuclides are identified by their integer ZAI, Z*10000 + A*10 + I, where I is the isomeric state.
+import os
+import re
+import functools
 
-#Conversion between ORIGEN isotope name format (e.g Cs137) and Serpent bumat format (e.g 55137)
-isotope_name_list_ORIGEN = ["Ce144","Cs134","Cs137","Eu154","Ru106","Sr90"]
-isotope_name_list_Serpent = ["58144","55134","55137","63154","44106","38090"]
+import numpy as np
 
-#isotope masses in u
-isotope_mass_list = [143.913647, 133.906718, 136.907090, 153.922979, 105.907330, 89.907738]
+#Element symbols, by atomic number
+element_symbols = ["", "H", "He", "Li", "Be", "B", "C", "N", "O", "F", "Ne", "Na", "Mg", "Al", "Si", "P", "S", "Cl", "Ar",
+                   "K", "Ca", "Sc", "Ti", "V", "Cr", "Mn", "Fe", "Co", "Ni", "Cu", "Zn", "Ga", "Ge", "As", "Se", "Br", "Kr",
+                   "Rb", "Sr", "Y", "Zr", "Nb", "Mo", "Tc", "Ru", "Rh", "Pd", "Ag", "Cd", "In", "Sn", "Sb", "Te", "I", "Xe",
+                   "Cs", "Ba", "La", "Ce", "Pr", "Nd", "Pm", "Sm", "Eu", "Gd", "Tb", "Dy", "Ho", "Er", "Tm", "Yb", "Lu",
+                   "Hf", "Ta", "W", "Re", "Os", "Ir", "Pt", "Au", "Hg", "Tl", "Pb", "Bi", "Po", "At", "Rn", "Fr", "Ra",
+                   "Ac", "Th", "Pa", "U", "Np", "Pu", "Am", "Cm", "Bk", "Cf", "Es", "Fm", "Md", "No", "Lr", "Rf", "Db",
+                   "Sg", "Bh", "Hs", "Mt", "Ds", "Rg", "Cn", "Nh", "Fl", "Mc", "Lv", "Ts", "Og"]
+
+atomic_numbers = dict([(element_symbols[i].lower(), i) for i in range(1, len(element_symbols))])
+
+#Packed array of the ZAI and the mass in u of the ground state of every nuclide, from the
+#atomic mass evaluation. Isomers have the mass of their ground state.
+nuclide_data_filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nuclide_data.npy")
+
+#Serpent writes the mass number of isomers in bumat files as 300 plus the last two digits of the 
+#mass number, e.g. 47310 for Ag110m and 95342 for Am242m.
+Serpent_isomer_offset = 300
+
+ORIGEN_name_pattern = re.compile(r"^\s*([A-Za-z]{1,2})\s*([0-9]{1,3})\s*([mM]?)\s*$")
+Serpent_name_pattern = re.compile(r"^\s*([0-9]{1,3})([0-9]{3})(\.[0-9]+[a-z])?\s*$")
+
+nuclide_data = {}
+
+def get_nuclide_data():
+    """
+    Get the nuclide database, loading it on first use. The masses are kept in an array indexed
+    by Z*1000 + A, so that masses can be looked up for any number of nuclides with array indexing.
+    """
+
+    if len(nuclide_data) == 0:
+        nuclides = np.load(nuclide_data_filename)
+
+        ZA = nuclides["ZAI"] // 10
+        masses = np.zeros(len(element_symbols) * 1000)
+        masses[ZA] = nuclides["mass"]
+
+        nuclide_data["masses"] = masses
+
+    return nuclide_data
+
+@functools.lru_cache(maxsize = None)
+def get_ZAI(isotope_name):
+    """
+    Get the ZAI of a nuclide from its name in ORIGEN format, e.g. \"Cs137\", \"cs137\", \"sr 90\" or \"Am242m\".
+    Returns 0 if the name is not a valid nuclide name.
+    """
+
+    m = ORIGEN_name_pattern.match(isotope_name)
+    if m is None or m.group(1).lower() not in atomic_numbers:
+        return 0
+
+    Z = atomic_numbers[m.group(1).lower()]
+    A = int(m.group(2))
+    I = 1 if len(m.group(3)) > 0 else 0
+
+    return Z*10000 + A*10 + I
+
+@functools.lru_cache(maxsize = None)
+def get_ZAI_from_Serpent_name(isotope_name):
+    """
+    Get the ZAI of a nuclide from its name in a Serpent bumat file, e.g. \"55137\" or \"47310.09c\".
+    Returns 0 if the name is not a valid nuclide name.
+    """
+
+    m = Serpent_name_pattern.match(isotope_name)
+    if m is None:
+        return 0
+
+    Z = int(m.group(1))
+    A = int(m.group(2))
+    I = 0
+
+    if Z < 1 or Z >= len(element_symbols):
+        return 0
+
+    if A >= Serpent_isomer_offset:
+        #Use the mass number that has the right last two digits and exists for the element.
+        I = 1
+        A -= Serpent_isomer_offset
+        masses = get_nuclide_data()["masses"]
+        for hundreds in [0, 100, 200]:
+            if masses[Z*1000 + A + hundreds] > 0:
+                A += hundreds
+                break
+
+    return Z*10000 + A*10 + I
+
+def get_ZAIs(isotope_list):
+    """
+    Get the ZAI of each nuclide in a list of names in ORIGEN format, as an integer array.
+    """
+
+    return np.array([get_ZAI(isotope) for isotope in isotope_list], dtype = np.int64)
+
+def get_ORIGEN_name(ZAI):
+    """
+    Get the ORIGEN name of a nuclide, e.g. \"Cs137\" or \"Am242m\".
+    """
+
+    Z, A, I = ZAI // 10000, (ZAI // 10) % 1000, ZAI % 10
+    return element_symbols[Z] + str(A) + ("m" if I > 0 else "")
+
+def get_ORIGEN_table_name(ZAI):
+    """
+    Get the name of a nuclide as printed in the ORIGEN output tables. The number of nucleons is
+    right-aligned in three characters, e.g. \"cs137\", \"sr 90\", \"h  3\" or \"am242m\".
+    """
+
+    Z, A, I = ZAI // 10000, (ZAI // 10) % 1000, ZAI % 10
+    return element_symbols[Z].lower() + str(A).rjust(3) + ("m" if I > 0 else "")
+
+def get_Serpent_name(ZAI):
+    """
+    Get the name of a nuclide as used in Serpent bumat files, e.g. \"55137\" or \"47310\".
+    """
+
+    Z, A, I = ZAI // 10000, (ZAI // 10) % 1000, ZAI % 10
+    if I > 0:
+        A = Serpent_isomer_offset + A % 100
+    return str(Z*1000 + A)
+
+def get_nuclide_masses(ZAIs):
+    """
+    Get the masses in u of an array of nuclides, or 0 for nuclides that are not in the database.
+    """
+
+    ZA = np.asarray(ZAIs, dtype = np.int64) // 10
+    masses = get_nuclide_data()["masses"]
+
+    #Nuclides outside the chart get index 0, which has no mass.
+    ZA[(ZA < 0) | (ZA >= len(masses))] = 0
+    return masses[ZA]
 
 def convert_isotope_name(isotope_name, to_this_format):
     """
     Function for converting an isotope name in ORIGEN format to Serpent or vice versa.
     ORIGEN uses the format \"Cs137\" while Serpent uses the format \"55137\"
     """
-    
+
     if to_this_format == "ORIGEN":
-        if isotope_name in isotope_name_list_Serpent:
-            return isotope_name_list_ORIGEN[isotope_name_list_Serpent.index(isotope_name)]
+        ZAI = get_ZAI_from_Serpent_name(isotope_name)
+        if ZAI > 0:
+            return get_ORIGEN_name(ZAI)
         else:
             return ""
     elif to_this_format == "Serpent":
-        if isotope_name in isotope_name_list_ORIGEN:
-            return isotope_name_list_Serpent[isotope_name_list_ORIGEN.index(isotope_name)]
+        ZAI = get_ZAI(isotope_name)
+        if ZAI > 0:
+            return get_Serpent_name(ZAI)
         else:
             return ""
     else:
         print("convert_isotope_name called with unsupported format, should be ORIGEN or Serpent")
         return ""
-    
+
 def get_isotope_mass(isotope_name, name_format):
     """
-    Function for getting the mass of selected nuclides. 
+    Function for getting the mass of a nuclide.
     This is needed when converting a Serpent material file, given in atoms/cm^3, to a mass in g/cm^3
     """
     if name_format == "Serpent":
-        if isotope_name in isotope_name_list_Serpent:
-            return isotope_mass_list[isotope_name_list_Serpent.index(isotope_name)]
-        else:
-            return 0
+        ZAI = get_ZAI_from_Serpent_name(isotope_name)
     elif name_format == "ORIGEN":
-        if isotope_name in isotope_name_list_ORIGEN:
-            return isotope_mass_list[isotope_name_list_ORIGEN.index(isotope_name)]
-        else:
-            return 0
+        ZAI = get_ZAI(isotope_name)
     else:
         print("get_isotope_mass called with unsupported format, should be ORIGEN or Serpent")
         return 0
-    
\ No newline at end of file
+
+    if ZAI == 0:
+        return 0
+    return float(get_nuclide_masses([ZAI])[0])
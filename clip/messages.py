@@ -0,0 +1,43 @@
+import threading
+import contextlib
+
+#Messages about failed or doubtful predictions, e.g. a missing cooling time or mismatched bins.
+#They are printed, except while they are collected with collect_messages, which keeps the messages
+#of the predictions made in the current thread only. This is how batch predictions and the daemon
+#find out why a prediction failed, without redirecting sys.stdout, which is shared by all threads.
+
+message_log = threading.local()
+
+def report(message, warning = False):
+    messages = getattr(message_log, "messages", None)
+
+    if messages is None:
+        print(message)
+    else:
+        messages.append(("warning" if warning else "error", message))
+
+def report_error(message):
+    report(message)
+
+def report_warning(message):
+    report(message, warning = True)
+
+@contextlib.contextmanager
+def collect_messages():
+    """
+    Collect the messages reported in this thread in a list of (\"error\" or \"warning\", message), instead
+    of printing them.
+    """
+
+    previous = getattr(message_log, "messages", None)
+    message_log.messages = []
+    try:
+        yield message_log.messages
+    finally:
+        message_log.messages = previous
+
+def get_errors(messages):
+    return [message for level, message in messages if level == "error"]
+
+def get_warnings(messages):
+    return tuple([message for level, message in messages if level == "warning"])
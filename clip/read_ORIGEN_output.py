@@ -1,175 +1,806 @@
 import re
-import math
+import mmap
+import bisect
 
-def read_ORIGEN_gamma_spectrum(output_filename, cooling_time_string):
+import numpy as np
+
+from clip.isotope_data import get_ZAI
+from clip.isotope_data import get_ZAIs
+from clip.isotope_data import get_ORIGEN_table_name
+from clip.cache import cache_enabled
+from clip.cache import load_cached_output
+from clip.cache import store_cached_output
+from clip.messages import report_error
+from clip.messages import report_warning
+
+#Version of the table decoding, stored with cached outputs. Change it when the decoded tables change.
+reader_version = 2
+
+#Column layout of the fixed-width ORIGEN 6.1 tables. Each cooling time column is 10 characters wide.
+gamma_spectrum_first_column = 24
+nuclide_table_first_column = 12
+column_width = 10
+
+gamma_spectrum_title = "gamma spectra, photons/sec/basis"
+nuclide_table_title = "nuclide concentrations"
+
+case_table_title = "case or subcase printed"
+
+gamma_spectrum_header_starts = [b" grp"]
+nuclide_table_header_starts = [b"               charge", b"              initial "]
+
+page_pattern = re.compile(r"page\s+([0-9]+)\s*$")
+case_table_row_pattern = re.compile(r"^\s+([0-9]+)\s+([0-9]+)\s*$")
+fortran_exponent_pattern = re.compile(r"(?<=[0-9])([+-][0-9]{3})\b")
+
+class ORIGEN_gamma_spectrum:
     """
-    Function for reading a gamma spectrum from an ORIGEN output file.
+    One gamma spectrum table from an ORIGEN output file, holding all cooling time columns.
     """
     
-    #Too long text may cause problems, so check for it.
-    if len(cooling_time_string) >= 10:
-        print("The cooling time could not be found in the input, the header text \"" + cooling_time_string + "\" is too long.")
-        return 0,0
+    def __init__(self, page, headers, bin_edges, bin_counts):
+        self.page = page                #The page of the output file the table is printed on
+        self.headers = headers          #One header string per cooling time column, e.g. "10.0 y"
+        self.bin_edges = bin_edges
+        self.bin_counts = bin_counts    #Array with one row per bin, one column per cooling time
+        
+    def get_column(self, cooling_time_string):
+        return find_cooling_time_column(self.headers, cooling_time_string)
+        
+    def get_spectrum(self, column):
+        return self.bin_counts[:, column].tolist()
+        
+class ORIGEN_nuclide_table:
+    """
+    One nuclide concentration table from an ORIGEN output file, holding all cooling time columns.
+    """
+    
+    def __init__(self, page, title, headers, nuclides, values):
+        self.page = page                #The page of the output file the table is printed on
+        self.title = title
+        self.headers = headers          #One header string per column, e.g. "initial" or "10.0 y"
+        self.nuclides = nuclides        #Nuclide names as printed by ORIGEN, e.g. "cs137" or "sr 90"
+        self.values = values            #Array with one row per nuclide, one column per header
+        
+        #Row of each nuclide in the table by ZAI, set up when first needed
+        self.nuclide_index = None
+        
+    def get_column(self, cooling_time_string):
+        return find_cooling_time_column(self.headers, cooling_time_string)
+    
+    def get_rows(self, nuclide_ZAIs):
+        """
+        Get the table row of each nuclide, given as an array of ZAI, or -1 for nuclides not in the table.
+        """
+        
+        if self.nuclide_index is None:
+            self.nuclide_index = dict(zip([get_ZAI(name) for name in self.nuclides], range(0, len(self.nuclides))))
+            self.nuclide_index.pop(0, None)
+        
+        return np.array([self.nuclide_index.get(ZAI, -1) for ZAI in np.asarray(nuclide_ZAIs).tolist()], dtype = int)
+
+class ORIGEN_case:
+    """
+    One case of an ORIGEN output file. A file can hold many cases, e.g. for different axial nodes or burnups.
+    """
     
-    found_spectrum = False
-    bin_count = [0]
-    bin_edges = [0]
+    def __init__(self, index, number, title, first_page):
+        self.index = index              #Position of the case in the file, starting from 0
+        self.number = number            #The case number printed by ORIGEN, starting from 1
+        self.title = title              #The title printed in the page headers of the case, if any
+        self.first_page = first_page    #The first page of the output file with results for the case
+        
+class ORIGEN_output:
+    """
+    An ORIGEN output file, memory-mapped so that only the gamma spectra and nuclide tables that are 
+    used are decoded. The tables are located by searching the raw bytes of the file, and decoded
+    tables are kept so that any number of predictions can be made without re-reading the file.
+    """
     
-    f = open(output_filename, 'r')
-    ORIGEN = f.read()
+    def __init__(self, filename, cached_output = None):
+        self.filename = filename
+        self.data = None
+        self.loaded = False
+        self.block_offsets = {}     #Offsets of all table titles, once the whole file has been searched
+        self.decoded_tables = {}    #Decoded tables, by the offset of their title
+        self.case_list = None       #All cases in the file, once they have been searched for
+        
+        if cached_output is not None:
+            #All tables were decoded before, so the file itself is not needed.
+            self.restore_tables(*cached_output)
+            return
+        
+        with open(filename, 'rb') as f:
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+                self.loaded = True
+            except ValueError:
+                #Empty files cannot be memory-mapped.
+                self.loaded = False
+                
+    def __enter__(self):
+        return self
     
-    if len(ORIGEN) < 1:
-        #Did not read anything, or read an empty file. Return empty arrays
-        print("Failed to open ORIGEN output file " + output_filename)
-        return bin_edges, bin_count
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+        
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
     
-    #get the gamma spectra form the output
-    #The header we are looking for starts with this string, and ends with a total row, the data we want is in between.
-    spectrumpattern = re.compile("gamma spectra, photons\/sec\/basis(.*?)\s*totals", re.DOTALL)
+    @property
+    def cases(self):
+        if self.case_list is None:
+            self.case_list = self.find_cases()
+        return self.case_list
     
-    if re.search(spectrumpattern, ORIGEN):
-        spectrum_list = re.findall(spectrumpattern, ORIGEN)
-    else:
-        #Failed to find any gamma spectrum, return empty arrays
-        print("Failed to find a gamma spectrum in ORIGEN output file " + output_filename)
-        return bin_edges, bin_count
-
-    for spectrum in spectrum_list:
-        spectrum_textlines = spectrum.splitlines()
+    @property
+    def gamma_spectra(self):
+        return [table for table in (self.get_table(offset) for offset in self.find_blocks(gamma_spectrum_title)) if table is not None]
+    
+    @property
+    def nuclide_tables(self):
+        return [table for table in (self.get_table(offset) for offset in self.find_blocks(nuclide_table_title)) if table is not None]
+    
+    def get_cache_data(self):
+        """
+        Decode all tables, and get them as metadata and arrays that can be stored in the cache.
+        """
+        
+        metadata = {"blocks": {}, "tables": [], 
+                    "cases": [[case.number, case.title, case.first_page] for case in self.cases]}
+        bin_edges = []
+        values = []
+        
+        for title in [gamma_spectrum_title, nuclide_table_title]:
+            metadata["blocks"][title] = list(self.find_blocks(title))
+            
+            for offset in metadata["blocks"][title]:
+                table = self.get_table(offset)
+                if table is None:
+                    continue
+                
+                table_metadata = {"offset": offset, "page": table.page, "headers": table.headers}
+                
+                if isinstance(table, ORIGEN_gamma_spectrum):
+                    table_metadata["kind"] = "gamma"
+                    table_metadata["rows"] = table.bin_counts.shape[0]
+                    bin_edges.append(np.array(table.bin_edges))
+                    values.append(table.bin_counts.ravel())
+                else:
+                    table_metadata["kind"] = "nuclide"
+                    table_metadata["title"] = table.title
+                    table_metadata["nuclides"] = table.nuclides
+                    table_metadata["rows"] = table.values.shape[0]
+                    values.append(table.values.ravel())
+                    
+                metadata["tables"].append(table_metadata)
+        
+        #All tables are stored in one array, which is faster to load than one array per table.
+        arrays = {"bin_edges": np.concatenate(bin_edges + [np.zeros(0)]), 
+                  "values": np.concatenate(values + [np.zeros(0)])}
+        
+        return metadata, arrays
+    
+    def restore_tables(self, metadata, arrays):
+        """
+        Restore all tables from metadata and arrays that were stored in the cache.
+        """
         
-        #Get the spectrum table header, search for cooling_time_string in the header
-        headers = spectrum_textlines[3]
+        self.loaded = True
+        self.block_offsets = {title: list(offsets) for title, offsets in metadata["blocks"].items()}
+        self.case_list = [ORIGEN_case(i, metadata["cases"][i][0], metadata["cases"][i][1], metadata["cases"][i][2]) 
+                          for i in range(0, len(metadata["cases"]))]
         
-        #after removing the 23 first characters, each column header should start with a space, followed
-        #by possibly more spaces for right-alignmnet, and then the cooling time string.
-        #Each such header is 10 characters long. 
-        header_columns = headers[23:]
+        #Titles that are not followed by a table
+        for offsets in self.block_offsets.values():
+            for offset in offsets:
+                self.decoded_tables[offset] = None
         
-        #Column headers are padded with spaces at the beginning to be 10 characters wide.
-        header_string =  cooling_time_string.strip()
-        while len(header_string ) < 10:
-            header_string = ' ' + header_string
+        bin_edges_start = 0
+        values_start = 0
         
-        if header_columns.find(header_string) != -1:
-            column = math.ceil(header_columns.find(header_string)/10)
-            found_spectrum = True
+        for table_metadata in metadata["tables"]:
+            rows = table_metadata["rows"]
+            columns = len(table_metadata["headers"])
+            values = arrays["values"][values_start:values_start + rows * columns].reshape(rows, columns)
+            values_start += rows * columns
             
-            #allocate memory
-            bin_count = [0] * (len(spectrum_textlines)-4)
-            bin_edges = [0] * (len(spectrum_textlines)-3)
+            if table_metadata["kind"] == "gamma":
+                bin_edges = arrays["bin_edges"][bin_edges_start:bin_edges_start + rows + 1].tolist()
+                bin_edges_start += rows + 1
+                table = ORIGEN_gamma_spectrum(table_metadata["page"], table_metadata["headers"], bin_edges, values)
+            else:
+                table = ORIGEN_nuclide_table(table_metadata["page"], table_metadata["title"], 
+                                             table_metadata["headers"], table_metadata["nuclides"], values)
+            self.decoded_tables[table_metadata["offset"]] = table
+    
+    def find_blocks(self, title, reverse = False):
+        """
+        Find the byte offsets of all table titles in the file. Searching in reverse yields the last 
+        tables first without searching the rest of the file, so that a search can stop early.
+        """
+        
+        if self.loaded == False:
+            return
+        
+        if title in self.block_offsets:
+            offsets = self.block_offsets[title]
+            if reverse:
+                offsets = reversed(offsets)
+            for offset in offsets:
+                yield offset
+            return
+        
+        pattern = title.encode()
+        
+        if reverse:
+            position = self.data.rfind(pattern)
+            while position != -1:
+                yield position
+                position = self.data.rfind(pattern, 0, position)
+        else:
+            offsets = []
+            position = self.data.find(pattern)
+            while position != -1:
+                offsets.append(position)
+                position = self.data.find(pattern, position + len(pattern))
+            self.block_offsets[title] = offsets
+            for offset in offsets:
+                yield offset
+                
+    def starts_with(self, prefix, position):
+        return self.data[position:position + len(prefix)] == prefix
+    
+    def get_line(self, position):
+        """
+        Get the start and end offsets of the line containing a byte offset.
+        """
+        
+        line_start = self.data.rfind(b"\n", 0, position) + 1
+        line_end = self.data.find(b"\n", position)
+        if line_end == -1:
+            line_end = len(self.data)
+        return line_start, line_end
+    
+    def find_table_header(self, title_offset, header_starts):
+        """
+        Find the column header line of a table within the few lines following its title. 
+        Returns the offset of the header line, or -1 if the title is not followed by a table.
+        """
+        
+        line_start, line_end = self.get_line(title_offset)
+        
+        for i in range(0, 4):
+            line_start = line_end + 1
+            if line_start >= len(self.data):
+                return -1
+            line_end = self.data.find(b"\n", line_start)
+            if line_end == -1:
+                line_end = len(self.data)
+            for header_start in header_starts:
+                if self.starts_with(header_start, line_start):
+                    return line_start
+        return -1
+    
+    def find_page(self, title_offset):
+        """
+        Find the page number printed in the page header above a table.
+        """
+        
+        window_start = max(0, title_offset - 4096)
+        position = self.data.rfind(b"page", window_start, title_offset)
+        while position != -1:
+            line_start, line_end = self.get_line(position)
+            m = page_pattern.search(self.data[line_start:line_end].decode())
+            if m:
+                return int(m.group(1))
+            position = self.data.rfind(b"page", window_start, line_start)
+        return 0
+    
+    def find_table_end(self, header_offset, is_table_row):
+        """
+        Find the end of a table, i.e. the first line after the header that is not a table row.
+        """
+        
+        position = self.data.find(b"\n", header_offset) + 1
+        while 0 < position < len(self.data):
+            line_end = self.data.find(b"\n", position)
+            if line_end == -1:
+                line_end = len(self.data)
+            if not is_table_row(self.data[position:line_end].decode().rstrip("\r")):
+                break
+            position = line_end + 1
+        return position
+    
+    def find_cases(self):
+        """
+        Find all cases in the file from the table of cases and their pages printed at the end of the file. 
+        If there is no such table, the whole file is treated as a single case.
+        """
+        
+        if self.loaded == False:
+            return []
+        
+        case_pages = []
+        
+        position = self.data.rfind(case_table_title.encode())
+        if position != -1:
+            line_start, line_end = self.get_line(position)
+            while line_end < len(self.data):
+                line_start, line_end = self.get_line(line_end + 1)
+                line = self.data[line_start:line_end].decode().rstrip("\r")
+                m = case_table_row_pattern.match(line)
+                if m:
+                    case_pages.append((int(m.group(1)), int(m.group(2))))
+                elif len(line.strip()) > 0:
+                    break
+        
+        if len(case_pages) == 0:
+            case_pages = [(1, 1)]
             
-            #Table should start at row 4.
-            for i in range(4,len(spectrum_textlines)):
-                #read the gamma spectrum
-                line = spectrum_textlines[i].strip()
-                split_line = line.split(" ")
-
-                #The split lines should have the following format:
-                # <line number> <low bin edge> <hyphen> <high bin edge> 
-                #<first cooling time bin count> <second cooling time bin count> <third...>
-                bin_count[i-4] = float(split_line[column + 3]) 
-                bin_edges[i-4] = float(split_line[1])
+        titles = self.find_page_titles([first_page for number, first_page in case_pages])
+        
+        return [ORIGEN_case(i, case_pages[i][0], titles.get(case_pages[i][1], ""), case_pages[i][1]) for i in range(0, len(case_pages))]
+    
+    def find_page_titles(self, pages):
+        """
+        Find the titles printed in the page headers of the given pages.
+        """
+        
+        titles = {}
+        position = self.data.find(b"page")
+        
+        while position != -1 and len(titles) < len(pages):
+            line_start, line_end = self.get_line(position)
+            line = self.data[line_start:line_end].decode().rstrip("\r")
+            m = page_pattern.search(line)
+            if m and int(m.group(1)) in pages and int(m.group(1)) not in titles:
+                #The title is followed by a description of the table on the page, e.g. "actinides"
+                titles[int(m.group(1))] = re.split(r"\s{3,}", line[1:m.start()].strip())[0]
+            position = self.data.find(b"page", line_end)
+        
+        return titles
+    
+    def get_case_index(self, page):
+        """
+        Get the index of the case that the given page of the output file belongs to.
+        """
+        
+        first_pages = [case.first_page for case in self.cases]
+        return max(0, bisect.bisect_right(first_pages, page) - 1)
+    
+    def get_table_header(self, title_offset):
+        """
+        Get the column headers of the table with the given title offset, without decoding the table.
+        """
+        
+        if title_offset in self.decoded_tables:
+            table = self.decoded_tables[title_offset]
+            if table is None:
+                return []
+            return table.headers
+        
+        if self.starts_with(gamma_spectrum_title.encode(), title_offset):
+            header_offset = self.find_table_header(title_offset, gamma_spectrum_header_starts)
+            first_column = gamma_spectrum_first_column
+        else:
+            header_offset = self.find_table_header(title_offset, nuclide_table_header_starts)
+            first_column = nuclide_table_first_column
+            
+        if header_offset == -1:
+            return []
+        
+        line_start, line_end = self.get_line(header_offset)
+        return split_header_columns(self.data[line_start:line_end].decode().rstrip("\r"), first_column)
+    
+    def get_table(self, title_offset):
+        """
+        Decode the table with the given title offset. Returns None if the title is not followed by a table.
+        """
+        
+        if title_offset in self.decoded_tables:
+            return self.decoded_tables[title_offset]
+        
+        table = None
+        
+        if self.starts_with(gamma_spectrum_title.encode(), title_offset):
+            header_offset = self.find_table_header(title_offset, gamma_spectrum_header_starts)
+            if header_offset != -1:
+                end = self.find_table_end(header_offset, is_gamma_spectrum_row)
+                lines = self.data[header_offset:end].decode().splitlines()
+                table = parse_ORIGEN_gamma_spectrum(lines, self.find_page(title_offset))
+        else:
+            header_offset = self.find_table_header(title_offset, nuclide_table_header_starts)
+            if header_offset != -1:
+                line_start, line_end = self.get_line(title_offset)
+                title = self.data[line_start:line_end].decode().strip().lstrip("0").strip()
                 
-            #Final upper bin edge.
-            bin_edges[len(spectrum_textlines)-4] = float(split_line[3])
+                end = self.find_table_end(header_offset, is_nuclide_table_row)
+                lines = self.data[header_offset:end].decode().splitlines()
+                table = parse_ORIGEN_nuclide_table(lines, self.find_page(title_offset), title)
+        
+        self.decoded_tables[title_offset] = table
+        return table
     
-    if found_spectrum == False:
+    def get_gamma_spectrum(self, cooling_time_string):
+        """
+        Get the gamma spectrum for a cooling time. If several spectra have a column with the 
+        given header, the last one is returned, which is typically the one of interest.
+        """
+        
+        #Too long text may cause problems, so check for it.
+        if len(cooling_time_string) >= 10:
+            report_error("The cooling time could not be found in the input, the header text \"" + cooling_time_string + "\" is too long.")
+            return 0,0
+        
+        if self.loaded == False:
+            #Did not read anything, or read an empty file. Return empty arrays
+            report_error("Failed to open ORIGEN output file " + self.filename)
+            return [0], [0]
+        
+        found_spectrum_table = False
+        
+        #Search from the end of the file, and stop at the first spectrum having the cooling time.
+        for offset in self.find_blocks(gamma_spectrum_title, reverse = True):
+            headers = self.get_table_header(offset)
+            if len(headers) > 0:
+                found_spectrum_table = True
+            
+            if find_cooling_time_column(headers, cooling_time_string) != -1:
+                spectrum = self.get_table(offset)
+                return list(spectrum.bin_edges), spectrum.get_spectrum(spectrum.get_column(cooling_time_string))
+        
+        if found_spectrum_table == False:
+            #Failed to find any gamma spectrum, return empty arrays
+            report_error("Failed to find a gamma spectrum in ORIGEN output file " + self.filename)
+            return [0], [0]
+        
         #Did not find the requested spectra in the file, return empty arrays.
-        print("Unable to find a gamma spectrum with cooling time " + cooling_time_string + 
-              " in ORIGEN output file " + output_filename)
+        report_error("Unable to find a gamma spectrum with cooling time " + cooling_time_string + 
+                     " in ORIGEN output file " + self.filename)
+        return [0], [0]
+    
+    def get_isotope_contents(self, cooling_time_string, isotope_list):
+        """
+        Get the isotope contents for a cooling time. If multiple cooling times with the given string exists, 
+        return the last printed value. This is typically the only case consedered which is cooling after discharge.
+        """
+        
+        #Too long text may cause problems, so check for it.
+        if len(cooling_time_string) >= 10:
+            report_error("The cooling time could not be found in the input, the header text \"" + cooling_time_string + "\" is too long.")
+            return [0] * len(isotope_list)
+        
+        if self.loaded == False:
+            #Did not read anything, or read an empty file. Return empty arrays
+            report_error("Failed to open ORIGEN output file " + self.filename)
+            return [0] * len(isotope_list)
+        
+        isotope_contents = [0] * len(isotope_list)
+        isotope_ZAIs = get_ZAIs(isotope_list)
+        found = [False] * len(isotope_list)
+        found_column = False
+        
+        #Search from the end of the file, so that the first value found for an isotope is the 
+        #last one printed, and stop once all isotopes have been found.
+        for offset in self.find_blocks(nuclide_table_title, reverse = True):
+            if find_cooling_time_column(self.get_table_header(offset), cooling_time_string) == -1:
+                continue
+            
+            found_column = True
+            table = self.get_table(offset)
+            column = table.get_column(cooling_time_string)
+            rows = table.get_rows(isotope_ZAIs)
+            
+            for i in range(0, len(isotope_list)):
+                if rows[i] != -1 and found[i] == False:
+                    isotope_contents[i] = float(table.values[rows[i], column])
+                    found[i] = True
+            
+            if all(found):
+                break
+        
+        if not found_column:
+            report_error("Unable to find the isotope contents with cooling time " + cooling_time_string + 
+                         " in ORIGEN output file " + self.filename)
+            return isotope_contents
+        
+        for i in range(0,len(isotope_list)):
+            if isotope_contents[i] == 0:
+                report_warning("Warning: did not find any isotopic contents for " + isotope_list[i] + " in the ORIGEN ouptut file.\n" +
+                               "Please check whether this isotope is listed correctly")
+        
+        return isotope_contents
 
-        bin_count = [0]
-        bin_edges = [0]
-        return bin_edges, bin_count
+    def get_cooling_time_headers(self, source = "gamma"):
+        """
+        Get all cooling time column headers, in the order they are first printed. 
+        The source is \"gamma\" for the gamma spectra, or \"isotope\" for the nuclide tables.
+        """
+        
+        if source == "gamma":
+            title = gamma_spectrum_title
+        else:
+            title = nuclide_table_title
+        
+        #Only the table headers are needed, so the tables are not decoded.
+        headers = []
+        for offset in self.find_blocks(title):
+            for header in self.get_table_header(offset):
+                if header not in headers:
+                    headers.append(header)
+                    
+        return headers
+    
+    def get_gamma_spectrum_series(self, cooling_time_headers):
+        """
+        Get the gamma spectra for several cooling times at once, as a bins x cooling times array. 
+        As for single cooling times, the last spectrum having a column with a header is used.
+        """
+        
+        gamma_spectra = self.gamma_spectra
+        
+        if len(gamma_spectra) == 0:
+            report_error("Failed to find a gamma spectrum in ORIGEN output file " + self.filename)
+            return [0], np.zeros((1, len(cooling_time_headers)))
+        
+        bin_edges = gamma_spectra[-1].bin_edges
+        bin_counts = np.zeros((len(bin_edges) - 1, len(cooling_time_headers)))
+        
+        for spectrum in gamma_spectra:
+            if spectrum.bin_edges != bin_edges:
+                report_warning("Different bin structure for the gamma spectra in ORIGEN output file " + self.filename + ", skipping the spectrum on page " + str(spectrum.page))
+                continue
+            
+            for i in range(0, len(cooling_time_headers)):
+                column = spectrum.get_column(cooling_time_headers[i])
+                if column != -1:
+                    bin_counts[:, i] = spectrum.bin_counts[:, column]
+                    
+        return list(bin_edges), bin_counts
+    
+    def get_gamma_spectrum_cases(self, cooling_time_string):
+        """
+        Get the gamma spectra for a cooling time for every case having a spectrum with that cooling time. 
+        Returns the cases, the bin edges and a bins x cases array. Within a case, the last spectrum 
+        with the cooling time is used.
+        """
+        
+        spectra = {}
+        
+        for spectrum in self.gamma_spectra:
+            if spectrum.get_column(cooling_time_string) != -1:
+                spectra[self.get_case_index(spectrum.page)] = spectrum
+        
+        if len(spectra) == 0:
+            report_error("Unable to find a gamma spectrum with cooling time " + cooling_time_string + 
+                         " in ORIGEN output file " + self.filename)
+            return [], [0], np.zeros((1, 0))
+        
+        case_indices = sorted(spectra.keys())
+        bin_edges = spectra[case_indices[-1]].bin_edges
+        
+        cases = []
+        bin_counts = []
+        for index in case_indices:
+            spectrum = spectra[index]
+            if spectrum.bin_edges != bin_edges:
+                report_warning("Different bin structure for the gamma spectra in ORIGEN output file " + self.filename + ", skipping the spectrum on page " + str(spectrum.page))
+                continue
+            cases.append(self.cases[index])
+            bin_counts.append(spectrum.bin_counts[:, spectrum.get_column(cooling_time_string)])
+        
+        return cases, list(bin_edges), np.stack(bin_counts, axis = 1)
+    
+    def get_isotope_contents_cases(self, cooling_time_string, isotope_list, cases = None):
+        """
+        Get the isotope contents for a cooling time for several cases at once, as an isotopes x cases array. 
+        If no cases are given, every case with nuclide tables having the cooling time is used.
+        Within a case, the last printed value is used. Returns the cases and the array.
+        """
+        
+        isotope_ZAIs = get_ZAIs(isotope_list)
+        tables = [table for table in self.nuclide_tables if table.get_column(cooling_time_string) != -1]
+        
+        if cases is None:
+            case_indices = sorted(set([self.get_case_index(table.page) for table in tables]))
+            cases = [self.cases[index] for index in case_indices]
+        
+        #Column of the array for each case
+        case_columns = dict([(cases[i].index, i) for i in range(0, len(cases))])
+        isotope_contents = np.zeros((len(isotope_list), len(cases)))
+        
+        for table in tables:
+            case_index = self.get_case_index(table.page)
+            if case_index not in case_columns:
+                continue
+            
+            rows = table.get_rows(isotope_ZAIs)
+            found_rows = np.nonzero(rows != -1)[0]
+            isotope_contents[found_rows, case_columns[case_index]] = table.values[rows[found_rows], table.get_column(cooling_time_string)]
+        
+        return cases, isotope_contents
+    
+    def get_isotope_contents_series(self, cooling_time_headers, isotope_list):
+        """
+        Get the isotope contents for several cooling times at once, as an isotopes x cooling times array. 
+        As for single cooling times, the last printed value is used.
+        """
+        
+        isotope_contents = np.zeros((len(isotope_list), len(cooling_time_headers)))
+        isotope_ZAIs = get_ZAIs(isotope_list)
+        
+        for table in self.nuclide_tables:
+            columns = np.array([table.get_column(header) for header in cooling_time_headers], dtype = int)
+            rows = table.get_rows(isotope_ZAIs)
+            
+            found_rows = np.nonzero(rows != -1)[0]
+            found_columns = np.nonzero(columns != -1)[0]
+            
+            isotope_contents[np.ix_(found_rows, found_columns)] = table.values[np.ix_(rows[found_rows], columns[found_columns])]
+        
+        return isotope_contents
+
+def find_cooling_time_column(headers, cooling_time_string):
+    """
+    Find the column having the given cooling time header, or -1 if there is no such column.
+    """
+    
+    header_string = cooling_time_string.strip()
+    
+    if header_string in headers:
+        return headers.index(header_string)
     else:
-        #Found the requested gamma spectrum, return it. 
-        #If several are found, this will return the last one, which is typically the one of interest. 
-        return bin_edges, bin_count
+        return -1
 
-def read_ORIGEN_isotope_contents(output_filename, cooling_time_string, isotope_list):
+def split_header_columns(header, first_column):
     """
-    Read the isotope contents from an ORIGEN output file. 
-    If multiple cooling times with the given string exists, return the last 
-    printed value. This is typically the only case consedered which is cooling after discharge.
+    Split a fixed-width ORIGEN table header into its 10 character wide column headers.
     """
     
-    #Too long text may cause problems, so check for it.
-    if len(cooling_time_string) >= 10:
-        print("The cooling time could not be found in the input, the header text \"" + cooling_time_string + "\" is too long.")
-        return [0] * len(isotope_list)
+    return [header[i:i + column_width].strip() for i in range(first_column, len(header.rstrip()), column_width)]
+
+def convert_to_ORIGEN_table_name(isotope):
+    """
+    Convert an isotope name such as \"Cs137\" to the format used in the ORIGEN tables, \"cs137\".
+    The ORIGEN output has spaces between the isotopes and the number of nucleons
+    if the number of nucleons has fewer than three digits, e.g. \"sr 90\".
+    """
+    
+    ZAI = get_ZAI(isotope)
+    if ZAI == 0:
+        return isotope.lower()
+    return get_ORIGEN_table_name(ZAI)
+
+def is_gamma_spectrum_row(textline):
+    """
+    Check whether a line is a row of a gamma spectrum table. The table ends with a totals row.
+    """
     
-    isotope_contents = [0] * len(isotope_list)
+    return len(textline.strip()) > 0 and not textline.strip().startswith("totals")
+
+def is_nuclide_table_row(textline):
+    """
+    Check whether a line is a row of a nuclide table. The table ends with a total row, 
+    or at a page break if it continues on the next page.
+    """
     
-    f = open(output_filename, 'r')
-    ORIGEN = f.read()
+    return textline.startswith(" ") and not textline.startswith("   total") and len(textline[:nuclide_table_first_column].strip()) > 0
+
+def decode_fixed_width_values(lines, first_column, number_of_columns):
+    """
+    Decode the numeric columns of a fixed-width table into a rows x columns array in one go, 
+    instead of converting each value separately.
+    """
     
-    if len(ORIGEN) < 1:
-        #Did not read anything, or read an empty file. Return empty arrays
-        print("Failed to open ORIGEN output file " + output_filename)
-        return [0] * len(isotope_list)
+    text = " ".join([line[first_column:] for line in lines])
     
-    r = re.compile("([a-zA-Z]+)([0-9]+)")
-    isotope_searchlist = [''] * (len(isotope_list))
-
-    #Get a searchable string, the ORIGEN output has spaces between the isotopes and the number of nucleons
-    #if the number of nucleons has fewer than three digits
-    for i in range(0,len(isotope_list)):
-        m = r.match(isotope_list[i])
-        if len(m.group(2)) == 1:
-            isotope_searchlist[i] = (m.group(1)).lower() + "  " + m.group(2)
-        elif len(m.group(2)) == 2:
-            isotope_searchlist[i] = (m.group(1)).lower() + " " + m.group(2)
-        else:
-            isotope_searchlist[i] = (isotope_list[i]).lower()
+    try:
+        values = np.array(text.split(), dtype = float)
+    except ValueError:
+        #ORIGEN drops the E in numbers with three digit exponents, such as 1.234-100
+        values = np.array(fortran_exponent_pattern.sub(r"E\1", text).split(), dtype = float)
+        
+    if values.size == len(lines) * number_of_columns:
+        return values.reshape(len(lines), number_of_columns)
+    
+    #Some row does not have a value for every column, decode the rows one by one.
+    rows = np.zeros((len(lines), number_of_columns))
+    for i in range(0, len(lines)):
+        row = decode_fixed_width_values([lines[i]], first_column, len(lines[i][first_column:].split()))
+        rows[i, :min(row.size, number_of_columns)] = row[0, :number_of_columns]
+    return rows
 
-    line = 0
+def parse_ORIGEN_gamma_spectrum(lines, page):
+    """
+    Parse the lines of a gamma spectrum table, starting with its column header line.
+    """
+    
+    headers = split_header_columns(lines[0], gamma_spectrum_first_column)
+    rows = lines[1:]
     
-    ORIGEN_lines = ORIGEN.splitlines()
+    if len(rows) == 0:
+        return ORIGEN_gamma_spectrum(page, headers, [], np.zeros((0, len(headers))))
     
-    reading_a_table = False
-    header = ""
-    column = 0
+    #The lines should have the following format:
+    # <line number> <low bin edge> <hyphen> <high bin edge> 
+    #<first cooling time bin count> <second cooling time bin count> <third...>
+    bin_counts = decode_fixed_width_values(rows, gamma_spectrum_first_column, len(headers))
+    edges = decode_fixed_width_values([row[:gamma_spectrum_first_column].replace(" - ", " ") for row in rows], 0, 3)
     
-    while line < len(ORIGEN_lines):
+    #Lower bin edges, and the final upper bin edge.
+    bin_edges = edges[:, 1].tolist() + [float(edges[-1, 2])]
         
-        #Start of a table with isotopes
-        #Note: this header is valid for ORIGEN 6.1
-        if ORIGEN_lines[line].startswith("               charge") or ORIGEN_lines[line].startswith("              initial "):
-            header = ORIGEN_lines[line]
-            header_columns = header[22:]
-            
-            #Column headers are padded with spaces at the beginning to be 10 characters wide.
-            header_string =  cooling_time_string.strip()
-            while len(header_string ) < 10:
-                header_string = ' ' + header_string
-        
-            #FInd if the selected cooling time is in this table, and start readig if it does.
-            if header_columns.find(header_string) != -1:
-                line = line + 1
-                reading_a_table = True
-                column = math.ceil(header_columns.find(header_string)/10) + 1
-             
-        if reading_a_table == True:
-            #Check that the table did not end on this row
-            if ORIGEN_lines[line].startswith("   total "):
-                reading_a_table = False
-            else:
-                #Parse the row.
-                textline = ORIGEN_lines[line]
-                isotope = textline[:13]
-                isotope = isotope.strip()
-                
-                #Are we interested in this isotope?
-                if isotope in isotope_searchlist:
-                    textline = textline[13:]
-                    split_line = textline.split(" ")
-                    isotope_contents[isotope_searchlist.index(isotope)] = float(split_line[column])
-                    
-        line = line + 1
+    return ORIGEN_gamma_spectrum(page, headers, bin_edges, bin_counts)
+    
+def parse_ORIGEN_nuclide_table(lines, page, title):
+    """
+    Parse the lines of a nuclide table, starting with its column header line.
+    All nuclides and all columns are decoded at once into a nuclides x columns array.
+    """
+    
+    headers = split_header_columns(lines[0], nuclide_table_first_column)
+    rows = lines[1:]
+    
+    nuclides = [row[:nuclide_table_first_column + 1].strip() for row in rows]
+    
+    if len(rows) > 0:
+        values = decode_fixed_width_values(rows, nuclide_table_first_column + 1, len(headers))
+    else:
+        values = np.zeros((0, len(headers)))
         
-    for i in range(0,len(isotope_list)):
-        if isotope_contents[i] == 0:
-            print("Warning: did not find any isotopic contents for " + isotope_list[i] + " in the ORIGEN ouptut file.")
-            print("Please check whether this isotope is listed correctly")
+    return ORIGEN_nuclide_table(page, title, headers, nuclides, values)
 
-    return isotope_contents
+def read_ORIGEN_output(output_filename):
+    """
+    Open an ORIGEN output file, and return an ORIGEN_output from which all of its 
+    gamma spectra and nuclide tables can be read. If the cache is enabled, previously decoded 
+    tables are loaded from it, and otherwise all tables are decoded and stored in it. 
+    """
+    
+    cached_output = load_cached_output(output_filename, "ORIGEN", reader_version)
+    ORIGEN_data = ORIGEN_output(output_filename, cached_output)
+    
+    if cached_output is None and cache_enabled() and ORIGEN_data.loaded:
+        metadata, arrays = ORIGEN_data.get_cache_data()
+        store_cached_output(output_filename, "ORIGEN", reader_version, metadata, arrays)
+    
+    return ORIGEN_data
+
+def read_ORIGEN_gamma_spectrum(output_filename, cooling_time_string):
+    """
+    Function for reading a gamma spectrum from an ORIGEN output file.
+    The output_filename can also be an already read ORIGEN_output.
+    """
+    
+    #Too long text may cause problems, so check for it before reading the file.
+    if len(cooling_time_string) >= 10:
+        report_error("The cooling time could not be found in the input, the header text \"" + cooling_time_string + "\" is too long.")
+        return 0,0
+    
+    if isinstance(output_filename, ORIGEN_output):
+        return output_filename.get_gamma_spectrum(cooling_time_string)
+    
+    with read_ORIGEN_output(output_filename) as ORIGEN_data:
+        return ORIGEN_data.get_gamma_spectrum(cooling_time_string)
+
+def read_ORIGEN_isotope_contents(output_filename, cooling_time_string, isotope_list):
+    """
+    Read the isotope contents from an ORIGEN output file. 
+    If multiple cooling times with the given string exists, return the last 
+    printed value. This is typically the only case consedered which is cooling after discharge.
+    The output_filename can also be an already read ORIGEN_output.
+    """
+    
+    #Too long text may cause problems, so check for it before reading the file.
+    if len(cooling_time_string) >= 10:
+        report_error("The cooling time could not be found in the input, the header text \"" + cooling_time_string + "\" is too long.")
+        return [0] * len(isotope_list)
+    
+    if isinstance(output_filename, ORIGEN_output):
+        return output_filename.get_isotope_contents(cooling_time_string, isotope_list)
+    
+    with read_ORIGEN_output(output_filename) as ORIGEN_data:
+        return ORIGEN_data.get_isotope_contents(cooling_time_string, isotope_list)
@@ -80,10 +80,10 @@ def read_sampled_response(response_filename):
     
     return sampled_energies, response, uncertainty
 
-def read_isotope_response(response_filename, response_type):
+def read_isotope_responses(response_filename):
     """
-    Function for reading an isotope response, for a respone type of \"decay\" or \"mass\"
-    depending on whether the isotopes are given as an activity or in weight.
+    Function for reading an isotope response in a single pass, returning the isotope list and both the 
+    \"decay\" response and uncertainty (per activity) and the \"mass\" response and uncertainty (per weight).
     """
 
     f = open(response_filename, 'r')
@@ -107,6 +107,16 @@ def read_isotope_response(response_filename, response_type):
             isotope_uncertainty_activity.append(float(line[2]))
             isotope_response_mass.append(float(line[3]))
             isotope_uncertainty_mass.append(float(line[4]))
+    
+    return isotope_list, isotope_response_activity, isotope_uncertainty_activity, isotope_response_mass, isotope_uncertainty_mass
+
+def read_isotope_response(response_filename, response_type):
+    """
+    Function for reading an isotope response, for a respone type of \"decay\" or \"mass\"
+    depending on whether the isotopes are given as an activity or in weight.
+    """
+    
+    isotope_list, isotope_response_activity, isotope_uncertainty_activity, isotope_response_mass, isotope_uncertainty_mass = read_isotope_responses(response_filename)
         
     if response_type == "decay":
         return isotope_list, isotope_response_activity, isotope_uncertainty_activity
@@ -1,136 +1,446 @@
 import re
-import math
+import warnings
+import concurrent.futures
 
-from clip.isotope_data import convert_isotope_name
-from clip.isotope_data import get_isotope_mass
+import numpy as np
+
+from clip.isotope_data import get_ZAIs
+from clip.isotope_data import get_ZAI_from_Serpent_name
+from clip.isotope_data import get_nuclide_masses
+from clip.cache import load_cached_output
+from clip.cache import store_cached_output
+from clip.messages import report_error
+
+#Version of the parsing, stored with cached outputs. Change it when the parsed data change.
+reader_version = 3
 
 avogadros_number = 6.022141*(10**23) #For converting atomic densities to mass densities
 
-def convert_to_ORIGEN_binning(spectrum_energies, spectrum_counts, bin_edges):
+def convert_to_ORIGEN_binning(spectrum_energies, spectrum_counts, bin_edges, spectrum_groups = None, number_of_groups = None):
     """
     Function for converting a gamma emisison spectrum to an ORIGEN-binned one.
+    If spectrum_groups gives the group, from 0 to number_of_groups - 1, of each line, e.g. its material, 
+    the result is a bins x groups array with the binned spectrum of each group.
     """
     
     #note that ORIGEN splits a gamma peak in two bins if it is close to the bin boundary, 
     #and adjustst the count for each bin to preserve total energy rather than total count.
     
+    spectrum_energies = np.asarray(spectrum_energies, dtype = float)
+    spectrum_counts = np.asarray(spectrum_counts, dtype = float)
+    bin_edges = np.asarray(bin_edges, dtype = float)
+    
     number_of_bins = len(bin_edges) - 1
-    bin_counts = [0] * number_of_bins
-    
-    for i in range(0,len(spectrum_energies)):
-        energy = spectrum_energies[i]
-        counts = spectrum_counts[i]
-
-        #Check that the energy is within the binned region.
-        if energy > bin_edges[0] and energy < bin_edges[number_of_bins]:
-            
-            #get the right bin
-            for bin in range(0,number_of_bins):
-                if bin_edges[bin] <= energy and energy < bin_edges[bin+1]:
-                    
-                    bin_mid_energy = (bin_edges[bin] + bin_edges[bin+1])/2
-                    
-                    f = (energy - bin_edges[bin])/(bin_edges[bin+1] - bin_edges[bin])
-                    
-                    if f < 0.03 and bin > 0:
-                        #Close to a bin edge and a lower bin exists, so split the counts evenly between the two.
-                        #Follows the procedure outlined in the ORIGEN documentation
-                        bin_counts[bin] += counts * (energy/bin_mid_energy) / 2
-                        
-                        lower_bin_mid_energy = (bin_edges[bin-1] + bin_edges[bin])/2
-                        
-                        bin_counts[bin - 1] += counts * (energy/lower_bin_mid_energy) / 2
-                        
-                    elif f > 0.97 and bin < number_of_bins - 1:
-                        #Close to a bin edge and a higher bin exists, wo split evenly between the bins.
-                        bin_counts[bin] += counts * (energy/bin_mid_energy) / 2
-                        
-                        higher_bin_mid_energy = (bin_edges[bin+1] + bin_edges[bin+2])/2
-                        
-                        bin_counts[bin + 1] += counts * (energy/higher_bin_mid_energy) / 2
-                    else:
-                        #All counts in the bin
-                        bin_counts[bin] += counts * (energy/bin_mid_energy)
+    
+    #Only energies within the binned region are included.
+    inside = (spectrum_energies > bin_edges[0]) & (spectrum_energies < bin_edges[number_of_bins])
+    energy = spectrum_energies[inside]
+    counts = spectrum_counts[inside]
+    groups = np.zeros(len(energy), dtype = int) if spectrum_groups is None else np.asarray(spectrum_groups, dtype = int)[inside]
+    
+    #get the right bin
+    bins = np.searchsorted(bin_edges, energy, side = "right") - 1
+    
+    bin_mid_energies = (bin_edges[:-1] + bin_edges[1:])/2
+    f = (energy - bin_edges[bins])/(bin_edges[bins + 1] - bin_edges[bins])
+    
+    #Close to a bin edge and a neighbouring bin exists, so split the counts evenly between the two.
+    #Follows the procedure outlined in the ORIGEN documentation
+    split_lower = (f < 0.03) & (bins > 0)
+    split_higher = (f > 0.97) & (bins < number_of_bins - 1) & ~split_lower
+    split = split_lower | split_higher
+    
+    other_bins = bins.copy()
+    other_bins[split_lower] -= 1
+    other_bins[split_higher] += 1
+    
+    #All counts in the bin, or half of them if split.
+    bin_weights = counts * (energy/bin_mid_energies[bins])
+    bin_weights[split] /= 2
+    
+    other_weights = np.zeros(len(energy))
+    other_weights[split] = counts[split] * (energy[split]/bin_mid_energies[other_bins[split]]) / 2
+    
+    #Add each line to its bin and then to the neighbouring bin, in the order of the lines.
+    indices = np.stack((bins, other_bins), axis = 1).ravel()
+    weights = np.stack((bin_weights, other_weights), axis = 1).ravel()
+    
+    if spectrum_groups is None:
+        return np.bincount(indices, weights = weights, minlength = number_of_bins)[:number_of_bins]
+    
+    #One bincount for all groups, over the combined (group, bin) index.
+    indices = indices + np.repeat(groups, 2) * number_of_bins
+    return np.bincount(indices, weights = weights, minlength = number_of_groups * number_of_bins).reshape(number_of_groups, number_of_bins).T
+        
+
+def parse_serpent_gamma_lines(Serpent):
+    """
+    Parse the gamma line data of a Serpent gamma source file. Returns the material names, the material 
+    volumes, an array with one row per emission line and the 7 data columns of the file, and the 
+    index of the material of each line.
+    """
+    
+    material_names = []
+    gamma_lines = []
+    material_indices = []
+    
+    #The gamma line data of each material is a matrix, "mat_<name> = [ ... ];", with 7 values 
+    #per line separated by spaces, and comment lines starting with % naming each nuclide.
+    position = Serpent.find("= [")
+    while position != -1:
+        end = Serpent.find("];", position)
+        if end == -1:
+            end = len(Serpent)
+        
+        line_start = Serpent.rfind("\n", 0, position) + 1
+        name = Serpent[line_start:position].strip()
+        if name.startswith("mat_"):
+            name = name[4:]
         
-    return bin_counts
+        with warnings.catch_warnings():
+            #Materials without gamma lines give empty matrices
+            warnings.simplefilter("ignore")
+            material_lines = np.loadtxt(Serpent[position + 3:end].splitlines(), comments = "%", ndmin = 2)
+        material_lines = material_lines.reshape(-1, 7)
         
+        material_indices.append(np.full(len(material_lines), len(material_names)))
+        material_names.append(name)
+        gamma_lines.append(material_lines)
+        position = Serpent.find("= [", end)
+    
+    #The volume of each material follows its matrix, "mat_<name>_vol = <volume>;"
+    volume_pattern = re.compile(r"^mat_(\S+)_vol\s*=\s*([0-9.Ee+-]+)\s*;", re.M)
+    volumes = dict([(m.group(1), float(m.group(2))) for m in volume_pattern.finditer(Serpent)])
+    material_volumes = np.array([volumes.get(name, 0.0) for name in material_names])
+    
+    if len(gamma_lines) == 0:
+        return material_names, material_volumes, np.zeros((0, 7)), np.zeros(0, dtype = int)
+    
+    return material_names, material_volumes, np.concatenate(gamma_lines), np.concatenate(material_indices)
 
-def read_serpent_gamma_spectrum(output_filename):
+def parse_serpent_bumat(Serpent):
     """
-    Read a Serpent gamma source file, and return a spectrum that can be used by the prediction functions. 
+    Parse a Serpent bumat file, splitting it into its materials. Returns the material names, 
+    the material volumes, an array of the ZAI of all nuclides and a nuclides x materials array of the 
+    nuclide concentrations (in atoms per barn-cm).
     """
     
+    header_pattern = re.compile(r"^\s*mat\s+(\S+)\s+([0-9.Ee+-]+)\s+vol\s+([0-9.Ee+-]+)", re.M)
+    material_pattern = re.compile(r"^\s*([0-9]+)\.[0-9]+[a-z]\s+([0-9.Ee+-]+)", re.M)
+    
+    headers = list(header_pattern.finditer(Serpent))
+    
+    material_names = [header[1] for header in headers]
+    material_volumes = np.array([float(header[3]) for header in headers]) #For a fuel rod with a height of 1cm, the surface area of the cross-section is the volume in cm^3
+    
+    material_ZAIs = []
+    material_concentrations = []
+    
+    for i in range(0, len(headers)):
+        if i + 1 < len(headers):
+            end = headers[i + 1].start()
+        else:
+            end = len(Serpent)
+        
+        material_list = material_pattern.findall(Serpent, headers[i].end(), end)
+        
+        material_ZAIs.append(np.array([get_ZAI_from_Serpent_name(material[0]) for material in material_list], dtype = np.int64))
+        material_concentrations.append(np.array([float(material[1]) for material in material_list]))
+    
+    #All nuclides found in any material, and their concentration in each material.
+    if len(headers) > 0:
+        ZAIs = np.unique(np.concatenate(material_ZAIs))
+    else:
+        ZAIs = np.zeros(0, dtype = np.int64)
+    concentrations = np.zeros((len(ZAIs), len(headers)))
+    
+    for i in range(0, len(headers)):
+        concentrations[np.searchsorted(ZAIs, material_ZAIs[i]), i] = material_concentrations[i]
+    
+    return material_names, material_volumes, ZAIs, concentrations
+
+def parse_serpent_depletion(Serpent):
+    """
+    Parse a Serpent depletion output (_dep.m) file. Returns a dictionary with an array for each 
+    variable in the file, e.g. ZAI, DAYS, BU and MAT_<name>_ADENS, which has one row per nuclide 
+    and one column per depletion step. Text variables such as NAMES are skipped.
+    """
+    
+    variable_pattern = re.compile(r"^([A-Za-z0-9_]+)\s*=\s*\[(.*?)\];", re.M | re.S)
+    
+    variables = {}
+    
+    for m in variable_pattern.finditer(Serpent):
+        if "'" in m.group(2):
+            continue
+        
+        lines = [line for line in m.group(2).splitlines() if len(line.strip()) > 0]
+        values = np.array(m.group(2).split(), dtype = float)
+        
+        if len(lines) > 1 and values.size % len(lines) == 0:
+            #A matrix, one row per line
+            values = values.reshape(len(lines), -1)
+            if values.shape[1] == 1:
+                values = values[:, 0]
+        variables[m.group(1)] = values
+        
+    return variables
+
+def read_serpent_file(output_filename, file_type):
+    """
+    Read and parse a Serpent gamma source file (file_type \"gamma\"), bumat file (file_type \"bumat\") or
+    depletion output (file_type \"depletion\"), using the cache if it is enabled. Returns None if the file 
+    is empty, and otherwise the result of parse_serpent_gamma_lines, parse_serpent_bumat or parse_serpent_depletion.
+    """
+    
+    cached_output = load_cached_output(output_filename, "Serpent " + file_type, reader_version)
+    
+    if cached_output is not None:
+        metadata, arrays = cached_output
+        if metadata["empty"]:
+            return None
+        elif file_type == "gamma":
+            return metadata["materials"], arrays["volumes"], arrays["gamma_lines"], arrays["material_indices"]
+        elif file_type == "depletion":
+            return arrays
+        else:
+            return metadata["materials"], arrays["volumes"], arrays["ZAIs"], arrays["concentrations"]
+    
     f = open(output_filename, 'r')
     Serpent = f.read()
+    f.close()
     
     if len(Serpent) < 1:
-        print("Failed to read Serpent gamma spectrum file " + output_filename)
-        return [],[]
+        parsed = None
+    elif file_type == "gamma":
+        parsed = parse_serpent_gamma_lines(Serpent)
+    elif file_type == "depletion":
+        parsed = parse_serpent_depletion(Serpent)
+    else:
+        parsed = parse_serpent_bumat(Serpent)
     
-    spectrum_energies = []
-    spectrum_counts = []
+    if parsed is None:
+        store_cached_output(output_filename, "Serpent " + file_type, reader_version, {"empty": True}, {})
+    elif file_type == "gamma":
+        store_cached_output(output_filename, "Serpent " + file_type, reader_version, {"empty": False, "materials": parsed[0]}, 
+                            {"volumes": parsed[1], "gamma_lines": parsed[2], "material_indices": parsed[3]})
+    elif file_type == "depletion":
+        store_cached_output(output_filename, "Serpent " + file_type, reader_version, {"empty": False}, parsed)
+    else:
+        store_cached_output(output_filename, "Serpent " + file_type, reader_version, {"empty": False, "materials": parsed[0]}, 
+                            {"volumes": parsed[1], "ZAIs": parsed[2], "concentrations": parsed[3]})
     
-    #Gamma line data are 7 values per line, separated by spaces.
-    spectrum_pattern = re.compile("([0-9]+)\s+([0-9.E+-]+)\s+([0-9.E+-]+)\s+([0-9.E+-]+)\s+([0-9.E+-]+)\s+([0-9.E+-]+)\s+([0-9.E+-]+)\s*")
+    return parsed
+
+def read_serpent_material_gamma_lines(output_filename):
+    """
+    Read a Serpent gamma source file with one or more materials. Returns the material names and volumes, 
+    and arrays with the material index, the nuclide ZAI (as integers), the energy and the emission 
+    rate (photons/sec) of each gamma line.
+    """
     
-    spectrum_list = re.findall(spectrum_pattern, Serpent)
+    gamma_source = read_serpent_file(output_filename, "gamma")
     
-    #Add each emission line ot the total spectrum.
-    for isotope in spectrum_list:
-        
-        #Obtain needed data. there are 7 data columns in total.
-        photons_per_decay = float(isotope[1])   #specific intensity (photons per decay)
-        total_activity = float(isotope[2])      #Total emission rate  (photons/sec)
-        gamma_energy = float(isotope[4])        #Emission line energy
-        relative_intensity = float(isotope[5])  #relative intensity (photons per decay)
-        
-        spectrum_energies.append(gamma_energy)
-        spectrum_counts.append(total_activity / photons_per_decay * relative_intensity)
+    if gamma_source is None:
+        report_error("Failed to read Serpent gamma spectrum file " + output_filename)
+        return [], np.zeros(0), np.zeros(0, dtype = int), np.zeros(0, dtype = np.int64), np.zeros(0), np.zeros(0)
+    
+    material_names, material_volumes, gamma_lines, material_indices = gamma_source
+    
+    #Obtain needed data. there are 7 data columns in total.
+    nuclide_ZAI = gamma_lines[:, 0].astype(np.int64)
+    photons_per_decay = gamma_lines[:, 1]   #specific intensity (photons per decay)
+    total_activity = gamma_lines[:, 2]      #Total emission rate  (photons/sec)
+    gamma_energy = gamma_lines[:, 4]        #Emission line energy
+    relative_intensity = gamma_lines[:, 5]  #relative intensity (photons per decay)
+    
+    return material_names, material_volumes, material_indices, nuclide_ZAI, gamma_energy, total_activity / photons_per_decay * relative_intensity
+
+def read_serpent_gamma_lines(output_filename):
+    """
+    Read a Serpent gamma source file, and return arrays with the nuclide ZAI (as integers), the energy 
+    and the emission rate (photons/sec) of each gamma line. The lines of all materials are included.
+    """
+    
+    material_names, material_volumes, material_indices, nuclide_ZAI, gamma_energy, gamma_intensity = read_serpent_material_gamma_lines(output_filename)
+    
+    return nuclide_ZAI, gamma_energy, gamma_intensity
+
+def read_serpent_gamma_spectrum(output_filename):
+    """
+    Read a Serpent gamma source file, and return a spectrum that can be used by the prediction functions, 
+    as arrays of the gamma line energies and emission rates.
+    """
+    
+    nuclide_ZAI, spectrum_energies, spectrum_counts = read_serpent_gamma_lines(output_filename)
         
     return spectrum_energies, spectrum_counts
     
+def read_serpent_material_contents(output_filename, isotope_list):
+    """
+    Read a Serpent bumat file with one or more materials, and return the material names and volumes, 
+    and an isotopes x materials array of the contents (grams per cm^3) of the selected isotopes.
+    """
+    
+    bumat = read_serpent_file(output_filename, "bumat")
+    
+    if bumat is None:
+        report_error("Failed to read Serpent bumat file " + output_filename)
+        return [], np.zeros(0), np.zeros((len(isotope_list), 0))
+    
+    material_names, material_volumes, material_ZAIs, material_concentrations = bumat
+    
+    #Row of each nuclide in the bumat file
+    material_rows = dict(zip(material_ZAIs.tolist(), range(0, len(material_ZAIs))))
+    
+    isotope_ZAIs = get_ZAIs(isotope_list)
+    rows = np.array([material_rows.get(ZAI, -1) if ZAI > 0 else -1 for ZAI in isotope_ZAIs.tolist()], dtype = int)
+    found = rows != -1
+    
+    #convert the concentration to a mass per ton fuel
+    isotope_masses = get_nuclide_masses(isotope_ZAIs[found])
+    
+    temp = material_concentrations[rows[found], :] * 10**24    #convert from atoms per cm^3 in barn to atoms/cm^3
+    isotope_weights = temp * isotope_masses[:, np.newaxis] / avogadros_number #Convert to grams of the isotope per cm^3
+    
+    isotope_contents = np.zeros((len(isotope_list), len(material_names)))
+    isotope_contents[found, :] = isotope_weights
+    
+    return material_names, material_volumes, isotope_contents
+    
 def read_serpent_isotope_contents(output_filename, isotope_list):
     """
     #Read a Serpent bumat file, and return the contents of the selected isotopes. 
+    #For files with several materials, the contents are averaged over the materials, weighted by their volumes.
     """
     
-    f = open(output_filename, 'r')
-    Serpent = f.read()
+    bumat = read_serpent_file(output_filename, "bumat")
     
-    if len(Serpent) < 1:
-        print("Failed to read Serpent gamma spectrum file " + output_filename)
+    if bumat is None:
+        report_error("Failed to read Serpent gamma spectrum file " + output_filename)
         return [],[]
     
-    isotope_contents = [0.0] * len(isotope_list)
+    if len(bumat[0]) == 0:
+        report_error("Failed to find Serpent header data")
+        return []
+    
+    material_names, material_volumes, isotope_contents = read_serpent_material_contents(output_filename, isotope_list)
+        
+    return (isotope_contents @ get_volume_weights(material_volumes)).tolist()
+
+def get_volume_weights(material_volumes):
+    """
+    Get the weight of each material in a volume-weighted average over the materials.
+    """
     
-    header_pattern = re.compile("mat\s*([A-Za-z0-9]+)\s*([0-9.E-]+)\s*vol\s*([0-9.E-]+)")
+    if np.sum(material_volumes) > 0:
+        return material_volumes / np.sum(material_volumes)
+    
+    #No volumes given, weight the materials equally.
+    return np.full(len(material_volumes), 1 / max(1, len(material_volumes)))
+
+def read_serpent_bumat_step(output_filename, isotope_list):
+    """
+    Read one step of a depletion history from a Serpent bumat file. Returns the burnup (MWd/kgU) and 
+    the time (days) of the step, given in the header of the file, and the volume-weighted average 
+    contents of the selected isotopes.
+    """
     
-    if re.search(header_pattern, Serpent):
-        header = re.search(header_pattern, Serpent)
+    step_pattern = re.compile(r"\(\s*([0-9.Ee+-]+)\s*MWd/kgU\s*/\s*([0-9.Ee+-]+)\s*days\s*\)")
+    
+    with open(output_filename, 'r') as f:
+        m = step_pattern.search(f.read(1024))
+    
+    burnup, days = 0.0, 0.0
+    if m:
+        burnup, days = float(m.group(1)), float(m.group(2))
+    
+    material_names, material_volumes, isotope_contents = read_serpent_material_contents(output_filename, isotope_list)
+    
+    return burnup, days, isotope_contents @ get_volume_weights(material_volumes)
+
+def read_serpent_bumat_series(output_filenames, isotope_list, workers = None):
+    """
+    Read a depletion history from a set of Serpent bumat files, e.g. from the bumat0, bumat1, ... files 
+    of a depletion calculation. The files are parsed in parallel by up to workers processes, and are 
+    sorted by their step number if all file names end with one. Returns arrays of the burnup and 
+    time of each step, and an isotopes x steps array of the contents of the selected isotopes.
+    """
+    
+    number_pattern = re.compile(r"([0-9]+)$")
+    
+    if all([number_pattern.search(filename) for filename in output_filenames]):
+        output_filenames = sorted(output_filenames, key = lambda filename: int(number_pattern.search(filename).group(1)))
+    
+    if workers == 1 or len(output_filenames) < 2:
+        steps = [read_serpent_bumat_step(filename, isotope_list) for filename in output_filenames]
     else:
-        print("Failed to find Serpent header data")
-        return []
+        with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+            steps = list(executor.map(read_serpent_bumat_step, output_filenames, [isotope_list] * len(output_filenames)))
     
-    material_volume = float(header[3]) #THis is the surface area of the circular cross-section of the fuel rod, but the height is 1cm so it is also the volume in cm^3
+    burnups = np.array([step[0] for step in steps])
+    days = np.array([step[1] for step in steps])
+    isotope_contents = np.zeros((len(isotope_list), len(steps)))
+    for i in range(0, len(steps)):
+        isotope_contents[:, i] = steps[i][2]
     
-    material_pattern = re.compile("\s*([0-9]+).09c\s*([0-9.E+-]+)")
+    return burnups, days, isotope_contents
+
+def read_serpent_depletion(output_filename, isotope_list, material = ""):
+    """
+    Read a depletion history from a Serpent depletion output (_dep.m) file. The contents are those of the 
+    given material, or if no material is given, the total over all materials, or the only material. 
+    Returns arrays of the burnup and time of each step, and an isotopes x steps array of the contents 
+    (grams per cm^3) of the selected isotopes.
+    """
     
-    material_list = re.findall(material_pattern, Serpent)
+    variables = read_serpent_file(output_filename, "depletion")
     
-    for material in material_list:
-        material_ZAI = material[0]
-        material_concentration = float(material[1])
-        
-        isotope_name = convert_isotope_name(material_ZAI, "ORIGEN")
-        
-        if isotope_name in isotope_list:
-            #convert the concentration to a mass per ton fuel
-            isotope_mass = get_isotope_mass(material_ZAI, "Serpent")
-            
-            temp = material_concentration * 10**24    #convert from atoms per cm^3 in barn to atoms/cm^3
-            isotope_weight = temp * isotope_mass / avogadros_number #Convert to grams of the isotope per cm^3
-
-            isotope_contents[isotope_list.index(isotope_name)] = isotope_weight
-        
-    return isotope_contents
-     
+    if variables is None or "ZAI" not in variables:
+        report_error("Failed to read Serpent depletion file " + output_filename)
+        return np.zeros(0), np.zeros(0), np.zeros((len(isotope_list), 0))
+    
+    if material != "":
+        prefix = "MAT_" + material
+    elif "TOT_ADENS" in variables:
+        prefix = "TOT"
+    else:
+        materials = [name[:-len("_ADENS")] for name in variables if name.startswith("MAT_") and name.endswith("_ADENS")]
+        prefix = materials[0] if len(materials) > 0 else ""
+    
+    if prefix + "_ADENS" not in variables:
+        report_error("Failed to find the atomic densities of material " + material + " in Serpent depletion file " + output_filename)
+        return np.zeros(0), np.zeros(0), np.zeros((len(isotope_list), 0))
+    
+    days = np.atleast_1d(variables.get("DAYS", np.zeros(0)))
+    burnups = np.atleast_1d(variables.get(prefix + "_BURNUP", variables.get("BU", np.zeros(len(days)))))
+    atomic_densities = variables[prefix + "_ADENS"].reshape(len(variables["ZAI"]), -1)
+    
+    #Row of each nuclide in the file. The last rows are lost nuclides and the total, with ZAI 666 and 0.
+    nuclide_rows = dict(zip(variables["ZAI"].astype(np.int64).tolist(), range(0, len(variables["ZAI"]))))
+    
+    isotope_ZAIs = get_ZAIs(isotope_list)
+    rows = np.array([nuclide_rows.get(ZAI, -1) if ZAI > 0 else -1 for ZAI in isotope_ZAIs.tolist()], dtype = int)
+    found = rows != -1
+    
+    temp = atomic_densities[rows[found], :] * 10**24    #convert from atoms per cm^3 in barn to atoms/cm^3
+    isotope_weights = temp * get_nuclide_masses(isotope_ZAIs[found])[:, np.newaxis] / avogadros_number #Convert to grams of the isotope per cm^3
+    
+    isotope_contents = np.zeros((len(isotope_list), atomic_densities.shape[1]))
+    isotope_contents[found, :] = isotope_weights
+    
+    return burnups, days, isotope_contents
+
+def read_serpent_isotope_contents_series(output_filenames, isotope_list, workers = None):
+    """
+    Read a depletion history, either from a Serpent depletion output (_dep.m) file or from a list of 
+    bumat files. Returns arrays of the burnup and time of each step, and an isotopes x steps 
+    array of the contents of the selected isotopes.
+    """
+    
+    if isinstance(output_filenames, str):
+        if output_filenames.endswith("_dep.m"):
+            return read_serpent_depletion(output_filenames, isotope_list)
+        output_filenames = [output_filenames]
+    
+    return read_serpent_bumat_series(output_filenames, isotope_list, workers)
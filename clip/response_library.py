@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import struct
+import hashlib
+
+import numpy as np
+
+from clip.Utils import *
+from clip.read_responses import *
+
+#Compiled response library: all responses of a data folder packed into one binary file, which is
+#memory-mapped when it is opened so that only the index is read up front.
+#The file starts with a fixed header: the magic bytes, the format version, the length and the sha256 of
+#a JSON index, followed by the index and the response arrays (little-endian float64, 64-byte aligned).
+#The index has, for each response, the offset, length and sha256 of its arrays, the isotope names of isotope
+#responses, and the name, size, modification time and sha256 of the text file it was compiled from.
+
+library_magic = b"CLIPLIB\n"
+library_version = 1
+library_header = struct.Struct("<8sIIQ32s")     #magic, version, reserved, index length, index sha256
+library_alignment = 64
+
+#The text format of the responses in each response folder
+library_response_formats = {"Binned_beta_response": "binned", "Binned_gamma_response": "binned",
+                            "Isotope_beta_response": "isotope", "Isotope_gamma_response": "isotope",
+                            "Sampled_beta_response": "sampled", "Sampled_gamma_response": "sampled"}
+
+def get_aligned_size(size):
+    return -(-size // library_alignment) * library_alignment
+
+def read_text_response(filename, response_format):
+    """
+    Read a text response file as a dictionary of arrays, and the isotope names for isotope responses.
+    """
+
+    if response_format == "binned":
+        bin_edges, bin_counts, bin_uncertainties = read_binned_response(filename)
+        return {"bin_edges": bin_edges, "bin_counts": bin_counts, "bin_uncertainties": bin_uncertainties}, []
+    elif response_format == "sampled":
+        energies, response, uncertainties = read_sampled_response(filename)
+        return {"energies": energies, "response": response, "uncertainties": uncertainties}, []
+    else:
+        isotope_list, activity_response, activity_uncertainty, mass_response, mass_uncertainty = read_isotope_responses(filename)
+        return {"activity_response": activity_response, "activity_uncertainty": activity_uncertainty,
+                "mass_response": mass_response, "mass_uncertainty": mass_uncertainty}, isotope_list
+
+def compile_response_library(data_folder, library_filename):
+    """
+    Compile all responses in the response folders of a data folder into one library file, which can be
+    given to Clip instead of the data folder. Returns the number of compiled responses.
+    """
+
+    index = {"version": library_version, "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+             "source_folder": os.path.abspath(data_folder), "responses": {}}
+    arrays = []
+    offset = 0
+
+    for folder in sorted(library_response_formats):
+        if not os.path.isdir(os.path.join(data_folder, folder)):
+            continue
+
+        index["responses"][folder] = {}
+        for file in sorted(os.listdir(os.path.join(data_folder, folder))):
+            filename = os.path.join(data_folder, folder, file)
+            with open(filename, 'rb') as f:
+                source_checksum = hashlib.sha256(f.read()).hexdigest()
+            status = os.stat(filename)
+
+            response_arrays, isotope_list = read_text_response(filename, library_response_formats[folder])
+
+            entry = {"format": library_response_formats[folder], "isotopes": isotope_list, "arrays": {},
+                     "source": {"file": folder + "/" + file, "size": status.st_size, "mtime": status.st_mtime, "sha256": source_checksum}}
+
+            #Offsets are from the start of the data, after the index.
+            for name in response_arrays:
+                values = np.ascontiguousarray(response_arrays[name], dtype = "<f8")
+                entry["arrays"][name] = {"offset": offset, "length": len(values), "sha256": hashlib.sha256(values.tobytes()).hexdigest()}
+                arrays.append(values)
+                offset += get_aligned_size(values.nbytes)
+
+            index["responses"][folder][file[:-4]] = entry   #remove the .txt
+
+    index_text = json.dumps(index).encode()
+    data_start = get_aligned_size(library_header.size + len(index_text))
+
+    #Written to a temporary file which is then renamed, so that a library being read is never partially written.
+    temporary_filename = library_filename + ".tmp"
+    with open(temporary_filename, 'wb') as f:
+        f.write(library_header.pack(library_magic, library_version, 0, len(index_text), hashlib.sha256(index_text).digest()))
+        f.write(index_text)
+        f.write(b"\0" * (data_start - f.tell()))
+        for values in arrays:
+            f.write(values.tobytes())
+            f.write(b"\0" * (get_aligned_size(values.nbytes) - values.nbytes))
+    os.replace(temporary_filename, library_filename)
+
+    return sum([len(index["responses"][folder]) for folder in index["responses"]])
+
+def is_response_library(filename):
+    """
+    Check whether a file is a compiled response library.
+    """
+
+    if not os.path.isfile(filename):
+        return False
+
+    with open(filename, 'rb') as f:
+        return f.read(len(library_magic)) == library_magic
+
+class response_library:
+    """
+    A compiled response library, opened by reading its index and memory-mapping its arrays.
+    The arrays of a response are only read, and their checksums verified, when the response is loaded.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+
+        with open(filename, 'rb') as f:
+            magic, version, reserved, index_length, index_checksum = library_header.unpack(f.read(library_header.size))
+            index_text = f.read(index_length)
+
+        if magic != library_magic:
+            raise ValueError(filename + " is not a compiled response library")
+        if version != library_version:
+            raise ValueError("The response library " + filename + " has format version " + str(version) + ", but version " + str(library_version) + " is supported. Compile it again.")
+        if hashlib.sha256(index_text).digest() != index_checksum:
+            raise ValueError("The index of the response library " + filename + " is corrupt")
+
+        self.index = json.loads(index_text.decode())
+        self.data_start = get_aligned_size(library_header.size + index_length)
+        self.data = np.memmap(filename, dtype = np.uint8, mode = 'r')
+
+    def get_fuel_types(self, folder):
+        """
+        Get the fuel types with a response in a response folder, e.g. \"Binned_gamma_response\".
+        """
+
+        return list(self.index["responses"].get(folder, {}))
+
+    def get_provenance(self, folder, fuel_type):
+        """
+        Get the name, size, modification time and sha256 of the text file a response was compiled from.
+        """
+
+        return self.index["responses"][folder][fuel_type]["source"]
+
+    def get_arrays(self, folder, fuel_type):
+        """
+        Get the arrays of a response, as read-only views of the library file.
+        Raises a ValueError if the checksum of an array does not match.
+        """
+
+        entry = self.index["responses"][folder][fuel_type]
+        arrays = {}
+
+        for name in entry["arrays"]:
+            array = entry["arrays"][name]
+            values = np.frombuffer(self.data, dtype = "<f8", count = array["length"], offset = self.data_start + array["offset"])
+            if hashlib.sha256(values.tobytes()).hexdigest() != array["sha256"]:
+                raise ValueError("The response " + folder + "/" + fuel_type + " in the response library " + self.filename + " is corrupt")
+            arrays[name] = values
+
+        return arrays
+
+    def load_response(self, folder, fuel_type):
+        """
+        Load a response as a binned_spectrum, sampled_spectrum or isotope_response, as for the text response files.
+        """
+
+        entry = self.index["responses"][folder][fuel_type]
+        arrays = self.get_arrays(folder, fuel_type)
+
+        if entry["format"] == "binned":
+            return binned_spectrum(arrays["bin_edges"], arrays["bin_counts"], arrays["bin_uncertainties"])
+        elif entry["format"] == "sampled":
+            return sampled_spectrum(arrays["energies"], arrays["response"], arrays["uncertainties"])
+        else:
+            return isotope_response(entry["isotopes"], arrays["activity_response"], arrays["activity_uncertainty"], arrays["mass_response"], arrays["mass_uncertainty"])
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m clip.response_library <data folder> <library file>")
+        sys.exit(1)
+
+    number_of_responses = compile_response_library(sys.argv[1], sys.argv[2])
+    print("Compiled " + str(number_of_responses) + " responses from " + sys.argv[1] + " into " + sys.argv[2])
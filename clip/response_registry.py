@@ -0,0 +1,102 @@
+import os
+import threading
+import collections
+
+from clip.Utils import *
+from clip.read_responses import *
+
+#Registry of parsed response functions, shared by the functional Predict_* API. Each response file is
+#parsed once and kept until it is modified, or until it is the least recently used when the registry is full.
+#Responses are found in the response folders of the data folder, which is \"Data\" unless it is set with
+#set_data_folder or with the CLIP_DATA_FOLDER environment variable.
+
+default_registry_size = 64     #responses
+
+response_folders = ["Binned_beta_response", "Binned_gamma_response", "Isotope_beta_response",
+                    "Isotope_gamma_response", "Sampled_beta_response", "Sampled_gamma_response"]
+
+registry_settings = {"data_folder": os.environ.get("CLIP_DATA_FOLDER", "Data"),
+                     "max_size": default_registry_size}
+
+registered_responses = collections.OrderedDict()
+registry_lock = threading.Lock()
+
+def set_data_folder(folder):
+    """
+    Set the data folder that the functional API reads responses from.
+    """
+
+    registry_settings["data_folder"] = folder
+
+def get_data_folder():
+    return registry_settings["data_folder"]
+
+def set_registry_size(max_size):
+    """
+    Set the largest number of responses kept in the registry, removing the least recently used ones if needed.
+    """
+
+    with registry_lock:
+        registry_settings["max_size"] = max_size
+        while len(registered_responses) > max(max_size, 0):
+            registered_responses.popitem(last = False)
+
+def clear_registry():
+    """
+    Remove all responses from the registry.
+    """
+
+    with registry_lock:
+        registered_responses.clear()
+
+def get_response_filename(response_folder, fuel_type):
+    """
+    Get the response file for a fuel type in one of the response folders of the data folder,
+    e.g. \"Binned_gamma_response\".
+    """
+
+    return os.path.join(registry_settings["data_folder"], response_folder, fuel_type + ".txt")
+
+def get_registered_response(response_filename, response_format):
+    """
+    Get the response in a file, as a binned_spectrum, sampled_spectrum or isotope_response for the
+    response formats \"binned\", \"sampled\" and \"isotope\". The file is only parsed if it is not
+    in the registry, or if it has been modified since it was parsed.
+    """
+
+    status = os.stat(response_filename)
+    key = (os.path.realpath(response_filename), response_format)
+    version = (status.st_mtime_ns, status.st_size)
+
+    with registry_lock:
+        if key in registered_responses and registered_responses[key][0] == version:
+            registered_responses.move_to_end(key)
+            return registered_responses[key][1]
+
+    #Parse outside of the lock, so that other threads can use the registry meanwhile.
+    if response_format == "binned":
+        response = binned_spectrum(*read_binned_response(response_filename))
+    elif response_format == "sampled":
+        response = sampled_spectrum(*read_sampled_response(response_filename))
+    elif response_format == "isotope":
+        response = isotope_response(*read_isotope_responses(response_filename))
+    else:
+        print("get_registered_response called with unsupported response format " + str(response_format) + ", should be binned, sampled or isotope")
+        return None
+
+    with registry_lock:
+        registered_responses[key] = (version, response)
+        registered_responses.move_to_end(key)
+        while len(registered_responses) > max(registry_settings["max_size"], 0):
+            registered_responses.popitem(last = False)
+
+    return response
+
+def get_registered_binned_response(response_filename):
+    return get_registered_response(response_filename, "binned")
+
+def get_registered_sampled_response(response_filename):
+    return get_registered_response(response_filename, "sampled")
+
+def get_registered_isotope_response(response_filename):
+    return get_registered_response(response_filename, "isotope")
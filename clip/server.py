@@ -0,0 +1,286 @@
+import os
+import sys
+import json
+import time
+import socket
+import threading
+import contextlib
+import socketserver
+import http.server
+
+from clip.Clip import *
+from clip.cli import get_burnup_calculation
+
+#Prediction daemon, started with clip serve. It keeps one Clip instance with all responses loaded, and
+#answers JSON requests over a Unix socket, one request and one response per line, or over HTTP on
+#localhost, one request per POST. Requests are e.g.
+#  {"filename": "outputs/PWR_50MWd.out", "fuel": "PWR17x17", "gamma": "binned", "beta": "isotope", "cooling_time": "10.0 y"}
+#where gamma, beta and the burnup calculation (\"burnup\", from the file name by default) are optional,
+#or {"filenames": [...], ...} for several files, {"command": "status"} and {"command": "reload"}.
+#The responses are loaded again when the files in the data folder, or the response library, change.
+
+default_reload_interval = 2.0     #seconds
+
+def get_data_signature(data_folder):
+    """
+    Get the names, sizes and modification times of the response files of a data folder, or of a
+    response library, which change when the responses change.
+    """
+
+    if os.path.isfile(data_folder):
+        status = os.stat(data_folder)
+        return ((data_folder, status.st_size, status.st_mtime_ns),)
+
+    signature = []
+    for folder in sorted(library_response_formats):
+        if not os.path.isdir(os.path.join(data_folder, folder)):
+            continue
+        for file in sorted(os.listdir(os.path.join(data_folder, folder))):
+            status = os.stat(os.path.join(data_folder, folder, file))
+            signature.append((folder + "/" + file, status.st_size, status.st_mtime_ns))
+
+    return tuple(signature)
+
+class prediction_service:
+    """
+    The predictions of the daemon, made with a Clip instance whose responses are all loaded up front.
+    The instance is replaced by a new one when the responses change, while requests are answered.
+    """
+
+    def __init__(self, data_folder = default_data_folder, reload_interval = default_reload_interval):
+        self.data_folder = data_folder
+        self.reload_interval = reload_interval
+        self.reload_lock = threading.Lock()
+        self.requests_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.reloads = 0
+        self.requests = 0
+
+        self.load()
+
+    def load(self):
+        """
+        Load all responses into a new Clip instance, and use it for the following requests.
+        """
+
+        with self.reload_lock:
+            #Taken before loading, so that changes made while loading cause another reload.
+            signature = get_data_signature(self.data_folder)
+
+            predictor = Clip(self.data_folder)
+
+            for responses in [predictor.binned_beta_responses, predictor.binned_gamma_responses, predictor.isotope_beta_responses,
+                              predictor.isotope_gamma_responses, predictor.sampled_beta_responses, predictor.sampled_gamma_responses]:
+                for fuel in responses:
+                    responses[fuel]
+
+            #The predictor and its configurations are replaced together.
+            self.state = (predictor, {})
+            self.signature = signature
+            self.loaded_at = time.time()
+            self.reloads += 1
+
+    def check_for_changes(self):
+        """
+        Load the responses again if they have changed. Returns True if they were loaded.
+        """
+
+        try:
+            if get_data_signature(self.data_folder) == self.signature:
+                return False
+            self.load()
+        except Exception as e:
+            #E.g. a response file that is being written. The old responses are kept until the next check.
+            print("clip serve: failed to load the responses in " + self.data_folder + ": " + str(e), file = sys.stderr)
+            return False
+
+        print("clip serve: loaded the changed responses in " + self.data_folder, file = sys.stderr)
+        return True
+
+    def watch(self):
+        """
+        Check for changed responses every reload_interval seconds, until stop is called.
+        """
+
+        while not self.stop_event.wait(self.reload_interval):
+            self.check_for_changes()
+
+    def start_watching(self):
+        thread = threading.Thread(target = self.watch, daemon = True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.stop_event.set()
+
+    def get_status(self):
+        predictor, configs = self.state
+        return {"data_folder": self.data_folder, "loaded_at": self.loaded_at, "reloads": self.reloads, "requests": self.requests,
+                "responses": {folder: len(getattr(predictor, folder.lower() + "s")) for folder in sorted(library_response_formats)}}
+
+    def get_config(self, predictor, configs, request, burnup):
+        """
+        Get the prediction configuration of a request, which is checked once for each predictor.
+        Returns the configuration, or None and the errors explaining why predictions can not be made with it.
+        """
+
+        key = (request["fuel"], request.get("gamma", "binned"), request.get("beta", "none"), burnup, request.get("cooling_time", "") if burnup == "ORIGEN" else "")
+
+        if key not in configs:
+            #Only the messages of this request's thread are collected.
+            with collect_messages() as messages:
+                config = predictor.get_prediction_config(*key)
+            configs[key] = (config, "\n".join(get_errors(messages)))
+
+        return configs[key]
+
+    def predict(self, predictor, configs, request, filename):
+        burnup = request.get("burnup") or get_burnup_calculation(filename)
+        result = {"filename": filename, "burnup_calculation": burnup, "cooling_time": request.get("cooling_time", "") if burnup == "ORIGEN" else "",
+                  "prediction": 0.0, "uncertainty": 0.0, "error": None, "warnings": []}
+
+        if burnup is None:
+            result["error"] = {"type": "RequestError", "message": filename + " is not an ORIGEN or Serpent output, give the burnup calculation as \"burnup\""}
+            return result
+
+        config, messages = self.get_config(predictor, configs, request, burnup)
+        if config is None:
+            result["error"] = {"type": "ConfigurationError", "message": messages}
+            return result
+
+        prediction = predict_file(predictor, filename, config)
+        result["prediction"] = float(prediction.prediction)
+        result["uncertainty"] = float(prediction.uncertainty)
+        result["error"] = prediction.error
+        result["warnings"] = list(prediction.warnings)
+        return result
+
+    def handle(self, request):
+        """
+        Answer a request, given as a dictionary, with a dictionary.
+        """
+
+        with self.requests_lock:
+            self.requests += 1
+
+        if not isinstance(request, dict):
+            return {"error": {"type": "RequestError", "message": "Requests must be JSON objects"}}
+
+        command = request.get("command", "predict")
+
+        try:
+            if command == "status":
+                return self.get_status()
+            elif command == "reload":
+                self.load()
+                return self.get_status()
+            elif command != "predict":
+                return {"error": {"type": "RequestError", "message": "Unknown command " + str(command) + ", should be predict, status or reload"}}
+
+            if "fuel" not in request or ("filename" not in request and "filenames" not in request):
+                return {"error": {"type": "RequestError", "message": "Prediction requests need a fuel and a filename or filenames"}}
+
+            #The same predictor is used for the whole request, also if the responses are reloaded meanwhile.
+            predictor, configs = self.state
+
+            if "filenames" in request:
+                return {"results": [self.predict(predictor, configs, request, filename) for filename in request["filenames"]]}
+            return self.predict(predictor, configs, request, request["filename"])
+        except Exception as e:
+            return {"error": {"type": type(e).__name__, "message": str(e)}}
+
+    def handle_text(self, text):
+        try:
+            request = json.loads(text)
+        except ValueError as e:
+            return json.dumps({"error": {"type": "RequestError", "message": "The request is not valid JSON: " + str(e)}})
+        return json.dumps(self.handle(request))
+
+class unix_request_handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        #Requests are answered in order until the client closes the connection.
+        for line in self.rfile:
+            if len(line.strip()) == 0:
+                continue
+            self.wfile.write((self.server.service.handle_text(line.decode()) + "\n").encode())
+            self.wfile.flush()
+
+class http_request_handler(http.server.BaseHTTPRequestHandler):
+
+    def send_json(self, text, status = 200):
+        body = (text + "\n").encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/status":
+            self.send_json(self.server.service.handle_text('{"command": "status"}'))
+        else:
+            self.send_json(json.dumps({"error": {"type": "RequestError", "message": "Use GET /status, or POST requests to /"}}), 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.send_json(self.server.service.handle_text(self.rfile.read(length).decode()))
+
+    def log_message(self, format, *args):
+        pass
+
+class unix_prediction_server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, service, socket_path):
+        self.service = service
+        #A socket left by a stopped daemon
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        socketserver.ThreadingUnixStreamServer.__init__(self, socket_path, unix_request_handler)
+
+class http_prediction_server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, service, host, port):
+        self.service = service
+        http.server.ThreadingHTTPServer.__init__(self, (host, port), http_request_handler)
+
+def send_request(socket_path, request):
+    """
+    Send a request, as a dictionary, to a daemon listening on a Unix socket, and get the response as a dictionary.
+    """
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall((json.dumps(request) + "\n").encode())
+        with connection.makefile("rb") as f:
+            return json.loads(f.readline().decode())
+
+def serve(data_folder = default_data_folder, socket_path = None, host = "127.0.0.1", port = None, reload_interval = default_reload_interval):
+    """
+    Run the prediction daemon on a Unix socket, or on HTTP on the given host and port, until it is interrupted.
+    """
+
+    #What Clip prints while loading responses are logs, kept on stderr. This is set once, before any
+    #thread is started, and the errors of the requests are collected per thread instead.
+    with contextlib.redirect_stdout(sys.stderr):
+        service = prediction_service(data_folder, reload_interval)
+        service.start_watching()
+
+        if socket_path is not None:
+            server = unix_prediction_server(service, socket_path)
+            print("clip serve: listening on " + socket_path, file = sys.stderr)
+        else:
+            server = http_prediction_server(service, host, port)
+            print("clip serve: listening on http://" + host + ":" + str(server.server_address[1]), file = sys.stderr)
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            service.stop()
+            server.server_close()
+            if socket_path is not None and os.path.exists(socket_path):
+                os.remove(socket_path)
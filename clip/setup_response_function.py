@@ -1,6 +1,5 @@
 
-from scipy.interpolate import interp1d
-from scipy.integrate import quad
+import numpy as np
 
 def get_binned_response_function(energies, response, bin_edges):
     """
@@ -17,34 +16,33 @@ def get_binned_response_function(energies, response, bin_edges):
     
     #This procedure follows the rebinning procedure explained in 
     #Knoll, chapter 18.IV.B, "Spectrum alignment".
-    #Hence, we interpolate the sampled response function, numerically integrate
+    #Hence, we interpolate the sampled response function, integrate
     # the area between any two bin edges, and let that area divided by the width be
     # the average response for the bin. 
     
-    func = interp1d(energies, response, kind='cubic')
-    bin_response = [0] * (len(bin_edges) - 1)
+    #SciPy is only imported when a sampled response is binned, so that it is not loaded otherwise.
+    from scipy.interpolate import make_interp_spline
+    
+    #The interpolation is the same cubic spline as interp1d(kind='cubic') uses, and the integral over
+    #each bin is given exactly by its antiderivative, for all bins at once.
+    antiderivative = make_interp_spline(np.asarray(energies, dtype = float), np.asarray(response, dtype = float), k = 3).antiderivative()
+    
+    bin_edges = np.asarray(bin_edges, dtype = float)
+    lower_edges = bin_edges[:-1]
+    upper_edges = bin_edges[1:]
     
     min_energy = energies[0]
     max_energy = energies[len(energies)-1]
     
-    for i in range(0, len(bin_edges)-1):
-        if bin_edges[i] < min_energy:
-            #Have not sampled this low, so cannot interpolate
-            bin_response[i] = 0
-        elif bin_edges[i] > min_energy and bin_edges[i+1] < min_energy:
-            #The bin covers some low energies not sampled.
-            integral = quad(func, min_energy, bin_edges[i+1])
-            bin_response[i] = integral[0] / (bin_edges[i+1] - min_energy)
-        elif bin_edges[i] >= min_energy and bin_edges[i+1] <= max_energy:
-            #have sampled the response function for this energy
-            integral = quad(func, bin_edges[i], bin_edges[i+1])
-            bin_response[i] = integral[0] / (bin_edges[i+1] - bin_edges[i])
-        elif bin_edges[i] < max_energy and bin_edges[i+1] > max_energy:
-            #The bin covers some high energies not sampled
-            integral = quad(func, bin_edges[i], max_energy)
-            bin_response[i] = integral[0] / (max_energy - bin_edges[i])
-        elif bin_edges[i+1] > max_energy:
-            #Have not sampled this high, so cannot interpolate
-            bin_response[i] = 0
-
-    return bin_response
\ No newline at end of file
+    #Bins starting below the lowest sampled energy, or at or above the highest, have not been
+    #sampled and get no response. Bins covering some high energies not sampled are averaged over 
+    #the sampled part.
+    sampled = (lower_edges >= min_energy) & ((upper_edges <= max_energy) | (lower_edges < max_energy))
+    upper_edges = np.minimum(upper_edges, max_energy)
+    
+    #The response can also have several columns, e.g. the identity matrix, which gives the derivative of 
+    #each binned response with respect to each sampled response value.
+    bin_response = np.zeros((len(lower_edges),) + np.shape(response)[1:])
+    bin_response[sampled] = ((antiderivative(upper_edges[sampled]) - antiderivative(lower_edges[sampled])).T / (upper_edges[sampled] - lower_edges[sampled])).T
+    
+    return bin_response.tolist()
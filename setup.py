@@ -12,6 +12,7 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/ebranger/clip",
     packages=setuptools.find_packages(),
+    package_data={"clip": ["nuclide_data.npy"]},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -19,7 +20,12 @@ setuptools.setup(
     ],
 
     install_requires=[
+        "numpy",
         "scipy"
-    ]
+    ],
+
+    entry_points={
+        "console_scripts": ["clip=clip.cli:main"]
+    }
 
 )
\ No newline at end of file
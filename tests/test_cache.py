@@ -0,0 +1,91 @@
+import os
+import shutil
+import unittest
+import tempfile
+import unittest.mock
+
+import numpy as np
+
+from clip.cache import *
+from clip.read_ORIGEN_output import read_ORIGEN_isotope_contents
+from clip.read_serpent_output import read_serpent_isotope_contents
+
+class TestCache(unittest.TestCase):
+    
+    def setUp(self):
+        self.cache_folder = tempfile.mkdtemp()
+        set_cache_folder(self.cache_folder)
+        
+    def tearDown(self):
+        set_cache_folder("")
+        shutil.rmtree(self.cache_folder)
+    
+    def test_cached_outputs(self):
+        
+        #The first read stores the parsed files, the second read loads them from the cache.
+        for i in range(0, 2):
+            isotope_contents = read_ORIGEN_isotope_contents("Example_ORIGEN_outputs/PWR_50MWd_test.out", "10.0 y", ["Cs137"])
+            self.assertEqual(isotope_contents[0], 1.412E+03)
+            
+            isotope_contents = read_serpent_isotope_contents("Example_Serpent_outputs/PWR_50MWd_10years.bumat", ["Cs137"])
+            self.assertAlmostEqual(isotope_contents[0], 0.0128834663837, places=10)
+            
+            self.assertEqual(len(os.listdir(self.cache_folder)), 2)
+            
+    def test_cache_key(self):
+        
+        #A new reader version must not use entries from an old one.
+        key = get_cache_key("Example_ORIGEN_outputs/PWR_50MWd_test.out", "ORIGEN", 1)
+        self.assertEqual(key, get_cache_key("Example_ORIGEN_outputs/PWR_50MWd_test.out", "ORIGEN", 1))
+        self.assertNotEqual(key, get_cache_key("Example_ORIGEN_outputs/PWR_50MWd_test.out", "ORIGEN", 2))
+        
+    def test_eviction(self):
+        
+        read_ORIGEN_isotope_contents("Example_ORIGEN_outputs/PWR_50MWd_test.out", "10.0 y", ["Cs137"])
+        read_serpent_isotope_contents("Example_Serpent_outputs/PWR_50MWd_10years.bumat", ["Cs137"])
+        
+        #The ORIGEN output is much larger than the bumat file, so only the bumat entry fits.
+        evict_cached_outputs(100000)
+        self.assertEqual(len(os.listdir(self.cache_folder)), 1)
+        
+        clear_cache()
+        self.assertEqual(len(os.listdir(self.cache_folder)), 0)
+    
+    def test_eviction_size(self):
+        
+        #The folder is only listed once for many writes that fit in the cache.
+        with unittest.mock.patch("os.listdir", wraps = os.listdir) as listdir:
+            for i in range(0, 20):
+                store_cached_output("Example_Serpent_outputs/PWR_50MWd_10years.bumat", "test " + str(i), 1, {}, {"values": np.arange(1000.0)})
+            self.assertEqual(listdir.call_count, 1)
+        
+        #A full cache is evicted to below its maximum size.
+        entry_size = os.path.getsize(os.path.join(self.cache_folder, os.listdir(self.cache_folder)[0]))
+        set_cache_folder(self.cache_folder, max_size = 10 * entry_size)
+        store_cached_output("Example_Serpent_outputs/PWR_50MWd_10years.bumat", "test 20", 1, {}, {"values": np.arange(1000.0)})
+        self.assertEqual(len(os.listdir(self.cache_folder)), 9)
+    
+    def test_memory_cache(self):
+        
+        set_cache_folder("")
+        set_memory_cache_size(10**8)
+        
+        try:
+            for i in range(0, 2):
+                isotope_contents = read_ORIGEN_isotope_contents("Example_ORIGEN_outputs/PWR_50MWd_test.out", "10.0 y", ["Cs137"])
+                self.assertEqual(isotope_contents[0], 1.412E+03)
+            self.assertEqual(len(memory_cache), 1)
+            
+            #The arrays are shared, and can not be changed
+            metadata, arrays, size = next(iter(memory_cache.values()))
+            self.assertFalse(arrays["values"].flags.writeable)
+            
+            #Too small for the ORIGEN output
+            set_memory_cache_size(1000)
+            self.assertEqual(len(memory_cache), 0)
+        finally:
+            set_memory_cache_size(0)
+            clear_cache()
+    
+if __name__ == '__main__':
+    unittest.main()
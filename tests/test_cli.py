@@ -0,0 +1,63 @@
+import os
+import csv
+import sys
+import json
+import unittest
+import tempfile
+import subprocess
+
+from clip.cli import *
+
+class TestCommandLine(unittest.TestCase):
+    
+    def test_predict_csv(self):
+        
+        with tempfile.TemporaryDirectory() as folder:
+            output = os.path.join(folder, "predictions.csv")
+            status = main(["predict", "Example_ORIGEN_outputs", "Example_Serpent_outputs/*_gamma.m", "Example_ORIGEN_outputs/missing.out", "--fuel", "PWR17x17",
+                           "--cooling-time", "10.0 y", "--cooling-time", "20.0 y", "--workers", "2", "-o", output])
+            
+            with open(output, newline = "") as f:
+                rows = list(csv.DictReader(f))
+        
+        #The missing file fails for both cooling times
+        self.assertEqual(status, 1)
+        self.assertEqual(len(rows), 5)
+        
+        rows = dict([((row["filename"], row["cooling_time"]), row) for row in rows])
+        self.assertAlmostEqual(float(rows[("Example_ORIGEN_outputs/PWR_50MWd_test.out", "10.0 y")]["prediction"]), 1051241974300.2612, places=6)
+        self.assertEqual(rows[("Example_Serpent_outputs/PWR_50MWd_10years_gamma.m", "")]["burnup_calculation"], "Serpent_gamma")
+        self.assertEqual(rows[("Example_ORIGEN_outputs/missing.out", "10.0 y")]["error_type"], "FileNotFoundError")
+    
+    def test_predict_jsonl(self):
+        
+        with tempfile.TemporaryDirectory() as folder:
+            output = os.path.join(folder, "predictions.jsonl")
+            status = main(["predict", "Example_Serpent_outputs", "--fuel", "PWR17x17", "--gamma", "isotope", "--beta", "isotope", 
+                           "--burnup", "Serpent_bumat", "--workers", "1", "--format", "jsonl", "-o", output])
+            
+            with open(output) as f:
+                rows = [json.loads(line) for line in f]
+        
+        self.assertEqual(status, 0)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["filename"], os.path.join("Example_Serpent_outputs", "PWR_50MWd_10years.bumat"))
+        self.assertIsNone(rows[0]["error"])
+        
+        #Predictions can not be made without a cooling time for ORIGEN
+        self.assertEqual(main(["predict", "Example_ORIGEN_outputs", "--fuel", "PWR17x17", "--burnup", "ORIGEN"]), 2)
+    
+    def test_predict_without_scipy(self):
+        
+        #SciPy is only needed for sampled responses
+        command = "import sys; from clip.cli import main; main(sys.argv[1:]); print('scipy' in sys.modules, file = sys.stderr)"
+        arguments = ["predict", "Example_ORIGEN_outputs", "--fuel", "PWR17x17", "--cooling-time", "10.0 y", "--workers", "1"]
+        
+        result = subprocess.run([sys.executable, "-c", command] + arguments, capture_output = True, text = True)
+        self.assertEqual(result.stderr.strip().splitlines()[-1], "False")
+        
+        result = subprocess.run([sys.executable, "-c", command] + arguments + ["--gamma", "sampled"], capture_output = True, text = True)
+        self.assertEqual(result.stderr.strip().splitlines()[-1], "True")
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,11 @@
 
+import re
+import os
 import unittest
+import tempfile
+import threading
+import asyncio
+import concurrent.futures
 
 from clip.Clip import *
 
@@ -7,6 +13,211 @@ class TestClipOrigenPrediction(unittest.TestCase):
     
             #since results are floats, test that we are very close to the expected value
     
+    def test_Clip_lazy_responses(self):
+        
+        predictor = Clip("Data")
+        self.assertTrue("PWR17x17" in predictor.isotope_gamma_responses)
+        self.assertEqual(len(predictor.isotope_gamma_responses.responses), 0)
+        
+        #Only the responses that are used are parsed.
+        predictor.set_prediction_parameters("PWR17x17", "isotope", "isotope", "ORIGEN", "10.0 y")
+        prediction, uncertainty = predictor.predict("Example_ORIGEN_outputs/PWR_50MWd_test.out") 
+        self.assertEqual(list(predictor.isotope_gamma_responses.responses), ["PWR17x17"])
+        self.assertEqual(len(predictor.sampled_gamma_responses.responses), 0)
+    
+    def test_Clip_config_threads(self):
+        
+        predictor = Clip("Data")
+        self.assertIsNone(predictor.get_prediction_config("PWR17x17", "spectrum", "isotope", "ORIGEN", "10.0 y"))
+        
+        configs = [predictor.get_prediction_config("PWR17x17", gamma, "isotope", "ORIGEN", "10.0 y") for gamma in ["binned", "isotope", "sampled"]] * 4
+        with concurrent.futures.ThreadPoolExecutor(max_workers = 4) as executor:
+            results = list(executor.map(lambda config: predictor.predict("Example_ORIGEN_outputs/PWR_50MWd_test.out", config), configs))
+        
+        self.assertAlmostEqual(results[0][0], 1116070414300.2612, places=6)
+        self.assertAlmostEqual(results[1][0], 1111343285500.0, places=6)
+        self.assertAlmostEqual(results[2][0], 1115463250434.1304, places=6)
+        self.assertEqual(results[:3] * 4, results)
+        
+        #The instance keeps no prediction parameters
+        self.assertEqual(predictor.fuel_type, "")
+        
+        #Configurations that were not made with get_prediction_config are checked too.
+        config = prediction_config("PWR17x17", "spectrum", "isotope", "ORIGEN", "10.0 y")
+        self.assertIsNone(predictor.predict("Example_ORIGEN_outputs/PWR_50MWd_test.out", config))
+        result = predict_file(predictor, "Example_ORIGEN_outputs/PWR_50MWd_test.out", config)
+        self.assertEqual(result.error["type"], "PredictionError")
+        self.assertTrue("spectrum" in result.error["message"])
+        
+        config = prediction_config("XX", "binned", "isotope", "ORIGEN", "10.0 y")
+        self.assertEqual(predict_file(predictor, "Example_ORIGEN_outputs/PWR_50MWd_test.out", config).error["type"], "PredictionError")
+    
+    #Configurations that were not made with get_prediction_config are checked by every prediction method.
+    unknown_fuel = prediction_config("XX", "isotope", "isotope", "ORIGEN", "10.0 y")
+    unknown_Serpent_fuel = prediction_config("XX", "isotope", "none", "Serpent_bumat", "")
+    
+    def test_Clip_timeseries_checked_config(self):
+        
+        headers, prediction, uncertainty = Clip("Data").predict_timeseries("Example_ORIGEN_outputs/PWR_50MWd_test.out", self.unknown_fuel)
+        self.assertEqual((len(headers), len(prediction)), (0, 0))
+    
+    def test_Clip_cases_checked_config(self):
+        
+        cases, prediction, uncertainty = Clip("Data").predict_cases("Example_ORIGEN_outputs/PWR_50MWd_test.out", self.unknown_fuel)
+        self.assertEqual((len(cases), len(prediction)), (0, 0))
+    
+    def test_Clip_materials_checked_config(self):
+        
+        materials, prediction, uncertainty, assembly_prediction, assembly_uncertainty = Clip("Data").predict_materials("Example_Serpent_outputs/PWR_50MWd_10years.bumat", self.unknown_Serpent_fuel)
+        self.assertEqual((len(materials), assembly_prediction), (0, 0))
+    
+    def test_Clip_depletion_checked_config(self):
+        
+        burnups, days, prediction, uncertainty = Clip("Data").predict_depletion(["Example_Serpent_outputs/PWR_50MWd_10years.bumat"], self.unknown_Serpent_fuel)
+        self.assertEqual(len(prediction), 0)
+    
+    def test_Clip_async_checked_config(self):
+        
+        predictor = Clip("Data")
+        result = asyncio.run(predictor.predict_async("Example_ORIGEN_outputs/PWR_50MWd_test.out", self.unknown_fuel))
+        self.assertEqual(result.error["type"], "PredictionError")
+        self.assertTrue("XX" in result.error["message"])
+        
+        #No worker processes are started for it.
+        self.assertIsNone(predictor.prediction_executor)
+    
+    def test_Clip_predict_breakdown(self):
+        
+        predictor = Clip("Data")
+        config = predictor.get_prediction_config("PWR17x17", "isotope", "isotope", "ORIGEN", "10.0 y")
+        
+        prediction, uncertainty, breakdowns = predictor.predict_breakdown("Example_ORIGEN_outputs/PWR_50MWd_test.out", config)
+        self.assertEqual((prediction, uncertainty), predictor.predict("Example_ORIGEN_outputs/PWR_50MWd_test.out", config))
+        self.assertEqual(breakdowns["gamma"].get_top(1)[0][0], "Cs137")
+        self.assertEqual(breakdowns["beta"].prediction + breakdowns["gamma"].prediction, prediction)
+        
+        #Gamma lines by nuclide
+        config = predictor.get_prediction_config("PWR17x17", "sampled", "none", "Serpent_gamma")
+        prediction, uncertainty, breakdowns = predictor.predict_breakdown("Example_Serpent_outputs/PWR_50MWd_10years_gamma.m", config)
+        self.assertEqual(breakdowns["gamma"].get_top(1, by = "uncertainty")[0][0], 561371)
+        self.assertIsNone(breakdowns["beta"])
+        self.assertAlmostEqual(sum(breakdowns["gamma"].contributions), prediction, delta = 1e-9 * prediction)
+    
+    def test_Clip_predict_gradients(self):
+        
+        predictor = Clip("Data")
+        config = predictor.get_prediction_config("PWR17x17", "sampled", "isotope", "ORIGEN", "10.0 y")
+        
+        prediction, uncertainty, breakdowns = predictor.predict_breakdown("Example_ORIGEN_outputs/PWR_50MWd_test.out", config, gradients = True)
+        
+        #The prediction is linear in the contents and in the responses.
+        gamma = breakdowns["gamma"]
+        spectrum_edges, spectrum_counts = read_ORIGEN_gamma_spectrum("Example_ORIGEN_outputs/PWR_50MWd_test.out", "10.0 y")
+        self.assertAlmostEqual(gamma.content_gradient @ spectrum_counts, gamma.prediction, delta = 1e-9 * gamma.prediction)
+        self.assertAlmostEqual(gamma.response_gradient @ predictor.sampled_gamma_responses["PWR17x17"].get_response()[1], gamma.prediction, delta = 1e-9 * gamma.prediction)
+        
+        beta = breakdowns["beta"]
+        self.assertEqual(beta.labels[0], "Sr90")
+        self.assertAlmostEqual(beta.content_gradient @ beta.response_gradient, beta.prediction, delta = 1e-9 * beta.prediction)
+        
+        #Gamma lines grouped by nuclide keep the derivatives for each line, also with a coarse lookup table.
+        config = predictor.get_prediction_config("PWR17x17", "sampled", "none", "Serpent_gamma")
+        nuclide_ZAI, spectrum_energies, spectrum_counts = read_serpent_gamma_lines("Example_Serpent_outputs/PWR_50MWd_10years_gamma.m")
+        sampled_response = predictor.sampled_gamma_responses["PWR17x17"].get_response()[1]
+        
+        for number_of_points in [None, 1000]:
+            if number_of_points is not None:
+                predictor.sampled_gamma_responses["PWR17x17"].set_lookup_table(number_of_points)
+            
+            prediction, uncertainty, breakdowns = predictor.predict_breakdown("Example_Serpent_outputs/PWR_50MWd_10years_gamma.m", config, gradients = True)
+            gamma = breakdowns["gamma"]
+            self.assertEqual(len(gamma.content_gradient), len(spectrum_counts))
+            self.assertEqual(list(gamma.content_labels), list(range(len(spectrum_counts))))
+            self.assertAlmostEqual(gamma.content_gradient @ spectrum_counts, prediction, delta = 1e-9 * prediction)
+            self.assertAlmostEqual(gamma.response_gradient @ sampled_response, prediction, delta = 1e-9 * prediction)
+        
+        predictor.sampled_gamma_responses["PWR17x17"].clear_lookup_table()
+    
+    def test_Clip_predict_many(self):
+        
+        predictor = Clip("Data")
+        config = predictor.get_prediction_config("PWR17x17", "binned", "isotope", "ORIGEN", "10.0 y")
+        
+        filenames = ["Example_ORIGEN_outputs/PWR_50MWd_test.out", "Example_ORIGEN_outputs/missing.out", "Example_ORIGEN_outputs/PWR_50MWd_test.out"]
+        results = predictor.predict_many(filenames, config, workers = 2)
+        
+        self.assertEqual([result.filename for result in results], filenames)
+        self.assertAlmostEqual(results[0].prediction, 1116070414300.2612, places=6)
+        self.assertIsNone(results[0].error)
+        self.assertEqual(results[1].error["type"], "FileNotFoundError")
+        self.assertEqual(results[2], results[0]._replace(filename = filenames[2]))
+        
+        #Failures that Clip only reports are errors too
+        config = predictor.get_prediction_config("PWR17x17", "isotope", "none", "Serpent_gamma")
+        results = predictor.predict_many(["Example_Serpent_outputs/PWR_50MWd_10years_gamma.m"], config, workers = 1)
+        self.assertEqual(results[0].error["type"], "PredictionError")
+        
+        #The workers use the lookup tables of the predictor
+        predictor.set_sampled_lookup_tables(target_error = 1e-6)
+        config = predictor.get_prediction_config("PWR17x17", "sampled", "none", "Serpent_gamma")
+        results = predictor.predict_many(["Example_Serpent_outputs/PWR_50MWd_10years_gamma.m"] * 2, config, workers = 2)
+        self.assertEqual((results[0].prediction, results[0].uncertainty), predictor.predict("Example_Serpent_outputs/PWR_50MWd_10years_gamma.m", config))
+    
+    def test_Clip_predict_file_messages(self):
+        
+        predictor = Clip("Data")
+        config = predictor.get_prediction_config("PWR17x17", "isotope", "isotope", "ORIGEN", "10.0 y")
+        missing_config = predictor.get_prediction_config("PWR17x17", "isotope", "isotope", "ORIGEN", "99.0 y")
+        
+        #Warnings are returned with the prediction, and are not errors.
+        with open("Example_ORIGEN_outputs/PWR_50MWd_test.out") as f:
+            text = f.read().replace("cs137", "xx137")
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "PWR_50MWd_no_Cs137.out")
+            with open(filename, "w") as f:
+                f.write(text)
+            result = predict_file(predictor, filename, config)
+        self.assertIsNone(result.error)
+        self.assertTrue(result.prediction > 0)
+        self.assertEqual(len(result.warnings), 1)
+        self.assertTrue("Cs137" in result.warnings[0])
+        
+        #Each prediction only gets its own errors, also when made in several threads at once.
+        configs = [config, missing_config] * 20
+        with concurrent.futures.ThreadPoolExecutor(max_workers = 8) as executor:
+            results = list(executor.map(lambda config: predict_file(predictor, "Example_ORIGEN_outputs/PWR_50MWd_test.out", config), configs))
+        
+        for config, result in zip(configs, results):
+            if config == missing_config:
+                self.assertEqual(result.error["type"], "PredictionError")
+                self.assertTrue("99.0 y" in result.error["message"])
+            else:
+                self.assertIsNone(result.error)
+                self.assertAlmostEqual(result.prediction, 1111343285500.0, places=6)
+    
+    def test_Clip_predict_async(self):
+        
+        predictor = Clip("Data")
+        config = predictor.get_prediction_config("PWR17x17", "binned", "isotope", "ORIGEN", "10.0 y")
+        predictor.get_prediction_executor(2)
+        
+        async def predict():
+            result = await predictor.predict_async("Example_ORIGEN_outputs/PWR_50MWd_test.out", config)
+            
+            filenames = ["Example_ORIGEN_outputs/PWR_50MWd_test.out"] * 5 + ["Example_ORIGEN_outputs/missing.out"]
+            results = [result async for result in predictor.predict_as_completed(filenames, config, concurrency = 2)]
+            
+            return result, results
+        
+        try:
+            result, results = asyncio.run(predict())
+        finally:
+            predictor.shutdown_prediction_executor()
+        
+        self.assertAlmostEqual(result.prediction, 1116070414300.2612, places=6)
+        self.assertEqual(len(results), 6)
+        self.assertEqual(len([result for result in results if result.error is None]), 5)
+    
     def test_Clip_ORIGEN_binned(self):
     
         predictor = Clip("Data")
@@ -15,6 +226,29 @@ class TestClipOrigenPrediction(unittest.TestCase):
         self.assertAlmostEqual(prediction, 1116070414300.2612, places=6)
         self.assertAlmostEqual(uncertainty, 21553290971.92218, places=6)
           
+    def test_Clip_ORIGEN_binned_errors(self):
+        
+        #A missing cooling time gives no prediction, as before the batch predictions.
+        predictor = Clip("Data")
+        predictor.set_prediction_parameters("PWR17x17", "binned", "none", "ORIGEN", "99 y")
+        self.assertEqual(predictor.predict("Example_ORIGEN_outputs/PWR_50MWd_test.out"), (0.0, 0.0))
+        
+        #So do responses with other bins, here without the last bin.
+        with tempfile.TemporaryDirectory() as folder:
+            os.mkdir(folder + "/Binned_gamma_response")
+            with open("Data/Binned_gamma_response/PWR17x17.txt") as f:
+                lines = f.read().strip().splitlines()
+            with open(folder + "/Binned_gamma_response/PWR17x17.txt", "w") as f:
+                f.write("\n".join(lines[:-1]))
+            
+            predictor = Clip(folder)
+            predictor.set_prediction_parameters("PWR17x17", "binned", "none", "ORIGEN", "10.0 y")
+            self.assertEqual(predictor.predict("Example_ORIGEN_outputs/PWR_50MWd_test.out"), (0.0, 0.0))
+            
+            result = predict_file(predictor, "Example_ORIGEN_outputs/PWR_50MWd_test.out", predictor.get_current_config())
+            self.assertEqual(result.error["type"], "PredictionError")
+            self.assertTrue("Different bin structure" in result.error["message"])
+        
     def test_Clip_ORIGEN_isotope(self):
         
         predictor = Clip("Data")
@@ -28,8 +262,45 @@ class TestClipOrigenPrediction(unittest.TestCase):
         predictor = Clip("Data")
         predictor.set_prediction_parameters("PWR17x17", "sampled", "isotope", "ORIGEN", "10.0 y")
         prediction, uncertainty = predictor.predict("Example_ORIGEN_outputs/PWR_50MWd_test.out") 
-        self.assertAlmostEqual(prediction, 1115463249369.859, places=6)
-        self.assertAlmostEqual(uncertainty, 4275563455.5758524, places=6)
+        self.assertAlmostEqual(prediction, 1115463250434.1304, places=6)
+        self.assertAlmostEqual(uncertainty, 4275563185.4625626, places=6)
+        
+    def test_Clip_ORIGEN_timeseries(self):
+        
+        predictor = Clip("Data")
+        predictor.set_prediction_parameters("PWR17x17", "binned", "isotope", "ORIGEN", "10.0 y")
+        headers, prediction, uncertainty = predictor.predict_timeseries("Example_ORIGEN_outputs/PWR_50MWd_test.out") 
+        
+        #All cooling times in the gamma spectra, the 10 year one should match a single prediction.
+        self.assertEqual(len(headers), 15)
+        self.assertEqual(len(prediction), 15)
+        self.assertAlmostEqual(prediction[headers.index("10.0 y")] / 1116070414300.2612, 1, places=12)
+        self.assertAlmostEqual(uncertainty[headers.index("10.0 y")] / 21553290971.92218, 1, places=12)
+        
+    def test_Clip_ORIGEN_cases(self):
+        
+        predictor = Clip("Data")
+        predictor.set_prediction_parameters("PWR17x17", "isotope", "isotope", "ORIGEN", "discharge")
+        cases, prediction, uncertainty = predictor.predict_cases("Example_ORIGEN_outputs/PWR_50MWd_test.out") 
+        
+        #Every decay case after a cycle has a discharge column, and the contents grow with each cycle.
+        self.assertEqual([case.number for case in cases], [2, 4, 6, 8, 10, 12])
+        self.assertEqual(cases[0].title, "Decay - bu40")
+        self.assertTrue(all(prediction[1:] > prediction[:-1]))
+        
+        #The last case with the cooling time is the one a single prediction uses.
+        predictor.set_prediction_parameters("PWR17x17", "binned", "isotope", "ORIGEN", "10.0 y")
+        cases, prediction, uncertainty = predictor.predict_cases("Example_ORIGEN_outputs/PWR_50MWd_test.out") 
+        self.assertEqual([case.number for case in cases], [13])
+        self.assertAlmostEqual(prediction[0] / 1116070414300.2612, 1, places=12)
+        
+        #No case has a missing cooling time.
+        for gamma in ["binned", "sampled", "isotope"]:
+            config = predictor.get_prediction_config("PWR17x17", gamma, "isotope", "ORIGEN", "99.0 y")
+            cases, prediction, uncertainty = predictor.predict_cases("Example_ORIGEN_outputs/PWR_50MWd_test.out", config) 
+            self.assertEqual(len(cases), 0)
+            self.assertEqual(len(prediction), 0)
+            self.assertEqual(len(uncertainty), 0)
         
         
 class TestClipSerpentPrediction(unittest.TestCase):
@@ -57,6 +328,93 @@ class TestClipSerpentPrediction(unittest.TestCase):
         prediction, uncertainty = predictor.predict("Example_Serpent_outputs/PWR_50MWd_10years_gamma.m") 
         self.assertAlmostEqual(prediction, 5207255.815381419, places=10)
         self.assertAlmostEqual(uncertainty, 19038.932373043383, places=10)
+        
+    def test_Clip_serpent_sampled_lookup_table(self):
+        
+        predictor = Clip("Data")
+        errors = predictor.set_sampled_lookup_tables(target_error = 1e-6)
+        self.assertTrue(errors["gamma"]["PWR17x17"] <= 1e-6)
+        
+        predictor.set_prediction_parameters("PWR17x17", "sampled", "none", "Serpent_gamma")
+        prediction, uncertainty = predictor.predict("Example_Serpent_outputs/PWR_50MWd_10years_gamma.m") 
+        self.assertAlmostEqual(prediction / 5207255.815381419, 1, places=6)
+        self.assertAlmostEqual(uncertainty / 19038.932373043383, 1, places=5)
+        
+        #Predictions made while the tables are replaced use either the old or the new table.
+        config = predictor.get_current_config()
+        response = predictor.sampled_gamma_responses["PWR17x17"]
+        
+        def tabulate():
+            for number_of_points in [1000, 3000] * 5:
+                response.set_lookup_table(number_of_points)
+        
+        thread = threading.Thread(target = tabulate)
+        thread.start()
+        predictions = []
+        while thread.is_alive():
+            predictions.append(predictor.predict("Example_Serpent_outputs/PWR_50MWd_10years_gamma.m", config)[0])
+        thread.join()
+        
+        for prediction in predictions:
+            self.assertAlmostEqual(prediction / 5207255.815381419, 1, places=2)
+        
+    def test_Clip_serpent_materials(self):
+        
+        #A bumat file with a second material having twice the volume and half the contents.
+        with open("Example_Serpent_outputs/PWR_50MWd_10years.bumat") as f:
+            bumat = f.read()
+        material = re.sub(r"([0-9.]+E[+-][0-9]+)$", lambda m: str(float(m.group(1)) / 2), bumat[bumat.index("mat "):], flags=re.M)
+        material = re.sub(r"mat .*$", "mat  UOXp1r2  3.5E-02 vol 1.017916E+00", material, count=1, flags=re.M)
+        
+        with tempfile.TemporaryDirectory() as folder:
+            with open(folder + "/materials.bumat", "w") as f:
+                f.write(bumat + "\n" + material)
+            
+            predictor = Clip("Data")
+            predictor.set_prediction_parameters("PWR17x17", "isotope", "isotope", "Serpent_bumat")
+            materials, prediction, uncertainty, assembly_prediction, assembly_uncertainty = predictor.predict_materials(folder + "/materials.bumat")
+        
+        self.assertEqual(materials, ["UOXp1r1", "UOXp1r2"])
+        self.assertAlmostEqual(prediction[0] / 10442390.687943177, 1, places=12)
+        self.assertAlmostEqual(prediction[1] / prediction[0], 0.5, places=6)
+        
+        #Volume-weighted average of the two materials
+        self.assertAlmostEqual(assembly_prediction / (prediction[0] * 2/3), 1, places=6)
+    
+    def test_Clip_serpent_gamma_materials(self):
+        
+        #A gamma source file with a second material with the same gamma lines
+        with open("Example_Serpent_outputs/PWR_50MWd_10years_gamma.m") as f:
+            gamma = f.read()
+        material = gamma[gamma.index("mat_UOX = ["):]
+        
+        with tempfile.TemporaryDirectory() as folder:
+            with open(folder + "/materials_gamma.m", "w") as f:
+                f.write(gamma + "\n" + material.replace("mat_UOX", "mat_UOX2"))
+            
+            predictor = Clip("Data")
+            for gamma_mode in ["binned", "sampled"]:
+                config = predictor.get_prediction_config("PWR17x17", gamma_mode, "none", "Serpent_gamma")
+                materials, prediction, uncertainty, assembly_prediction, assembly_uncertainty = predictor.predict_materials(folder + "/materials_gamma.m", config)
+                
+                self.assertEqual(materials, ["UOX", "UOX2"])
+                self.assertEqual((prediction[0], uncertainty[0]), predictor.predict("Example_Serpent_outputs/PWR_50MWd_10years_gamma.m", config))
+                self.assertEqual(prediction[1], prediction[0])
+                self.assertAlmostEqual(assembly_prediction / prediction[0], 2, places=12)
+                self.assertAlmostEqual(assembly_uncertainty / uncertainty[0], 2**0.5 if gamma_mode == "sampled" else 2, places=12)
+    
+    def test_Clip_serpent_depletion(self):
+        
+        predictor = Clip("Data")
+        predictor.set_prediction_parameters("PWR17x17", "isotope", "isotope", "Serpent_bumat")
+        prediction, uncertainty = predictor.predict("Example_Serpent_outputs/PWR_50MWd_10years.bumat")
+        
+        #The same step twice, predicted at once
+        burnups, days, step_prediction, step_uncertainty = predictor.predict_depletion(["Example_Serpent_outputs/PWR_50MWd_10years.bumat"] * 2, workers = 1)
+        
+        self.assertEqual(list(days), [5891.25, 5891.25])
+        self.assertAlmostEqual(step_prediction[1] / prediction, 1, places=12)
+        self.assertAlmostEqual(step_uncertainty[1] / uncertainty, 1, places=12)
     
     
 if __name__ == '__main__':
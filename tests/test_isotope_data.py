@@ -30,5 +30,19 @@ class TestIsotopeData(unittest.TestCase):
         #Mass for isotope that does not exist.
         self.assertEqual(get_isotope_mass("Pu186", "Serpent"), 0)
     
+    def test_full_chart(self):
+        
+        #Nuclides outside the original six, including isomers and the ORIGEN table spacing.
+        self.assertEqual(get_ZAI("Am242m"), 952421)
+        self.assertEqual(get_ZAI("sr 90"), get_ZAI("Sr90"))
+        self.assertEqual(get_ORIGEN_table_name(get_ZAI("H3")), "h  3")
+        self.assertEqual(convert_isotope_name("95342", "ORIGEN"), "Am242m")
+        self.assertEqual(convert_isotope_name("Ag110m", "Serpent"), "47310")
+        self.assertAlmostEqual(get_isotope_mass("94239", "Serpent"), 239.05, places=2)
+        
+        masses = get_nuclide_masses(get_ZAIs(["Cs137", "U235", "Xx1"]))
+        self.assertEqual(masses[0], 136.907090)
+        self.assertEqual(masses[2], 0)
+    
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
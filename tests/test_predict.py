@@ -3,6 +3,11 @@ import unittest
 
 from clip.Predict import Predict_ORIGEN
 from clip.Predict import Predict_serpent
+from clip.Predict import Predict_binned_response
+from clip.Predict import Predict_isotope_response
+from clip.Predict import Predict_sampled_response
+from clip.Predict import Predict_sampled_spectrum_response
+from clip.Utils import sampled_spectrum
 
 class TestOrigenPrediction(unittest.TestCase):
     
@@ -23,8 +28,8 @@ class TestOrigenPrediction(unittest.TestCase):
     def test_ORIGEN_sampled(self):
         
         prediction, uncertainty = Predict_ORIGEN("Example_ORIGEN_outputs/PWR_50MWd_test.out", "10.0 y", "PWR17x17", "sampled", "isotope")
-        self.assertAlmostEqual(prediction, 1115463249369.859, places=6)
-        self.assertAlmostEqual(uncertainty, 4275563455.5758524, places=6)
+        self.assertAlmostEqual(prediction, 1115463250434.1304, places=6)
+        self.assertAlmostEqual(uncertainty, 4275563185.4625626, places=6)
         
         
 class TestSerpentPrediction(unittest.TestCase):
@@ -48,5 +53,99 @@ class TestSerpentPrediction(unittest.TestCase):
         self.assertAlmostEqual(uncertainty, 19038.932373043383, places=10)
     
     
+class TestBatchPrediction(unittest.TestCase):
+    
+    def test_batch(self):
+        
+        spectra = [[1.0, 2.0, 0.0], [0.0, 0.0, 0.0], [3.0, 0.5, 4.0]]
+        spectrum_uncertainties = [[0.1, 0.0, 0.0], [0.0, 0.0, 0.0], [0.3, 0.1, 0.0]]
+        response = [2.0, 0.0, 5.0]
+        response_uncertainties = [0.2, 1.0, 0.5]
+        
+        predictions, uncertainties = Predict_binned_response(spectra, spectrum_uncertainties, response, response_uncertainties)
+        
+        self.assertEqual(len(predictions), 3)
+        self.assertEqual(predictions[1], 0)
+        self.assertEqual(uncertainties[1], 0)
+        for i in range(0, 3):
+            prediction, uncertainty = Predict_isotope_response(spectra[i], spectrum_uncertainties[i], response, response_uncertainties)
+            self.assertEqual(predictions[i], prediction)
+            self.assertEqual(uncertainties[i], uncertainty)
+        
+        self.assertEqual(predictions[2], 26)
+    
+    def test_sampled_spectrum_evaluate(self):
+        
+        response = sampled_spectrum([0.5, 1.0, 1.5, 2.0, 2.5], [1.0, 2.0, 3.0, 4.0, 5.0], [0.1, 0.2, 0.3, 0.4, 0.5])
+        
+        #Linear data is reproduced by the cubic spline, and energies outside the range have no response.
+        values, uncertainties = response.evaluate([0.1, 0.75, 2.25, 2.5])
+        self.assertAlmostEqual(values[1], 1.5, places=10)
+        self.assertAlmostEqual(uncertainties[2], 0.45, places=10)
+        self.assertEqual(values[0], 0)
+        self.assertEqual(values[3], 0)
+        
+        predictions, uncertainties = Predict_sampled_spectrum_response([0.75, 2.25, 3.0], [2.0, 1.0, 1.0], [0.0, 0.0, 0.0], response, [0, 1, 1], 2)
+        self.assertAlmostEqual(predictions[0], 3.0, places=10)
+        self.assertAlmostEqual(predictions[1], 4.5, places=10)
+        
+        #Linear interpolation in a lookup table is exact for linear data.
+        error = response.set_lookup_table(101)
+        self.assertTrue(error < 1e-12)
+        values, uncertainties = response.evaluate([0.1, 0.75, 2.25, 2.5])
+        self.assertAlmostEqual(values[1], 1.5, places=10)
+        self.assertEqual(values[0], 0)
+    
+    def test_breakdown(self):
+        
+        spectrum = [3.0, 0.5, 4.0]
+        spectrum_uncertainties = [0.3, 0.1, 0.0]
+        response = [2.0, 0.0, 5.0]
+        response_uncertainties = [0.2, 1.0, 0.5]
+        
+        prediction, uncertainty = Predict_binned_response(spectrum, spectrum_uncertainties, response, response_uncertainties)
+        breakdown = Predict_binned_response(spectrum, spectrum_uncertainties, response, response_uncertainties, breakdown = True)
+        
+        self.assertEqual(breakdown.prediction, prediction)
+        self.assertEqual(breakdown.uncertainty, uncertainty)
+        self.assertEqual(list(breakdown.contributions), [6.0, 0.0, 20.0])
+        self.assertAlmostEqual(sum(breakdown.get_uncertainty_shares()), 1.0, places=12)
+        self.assertEqual([item[0] for item in breakdown.get_top(2)], [2, 0])
+        
+        #Gamma lines grouped by their nuclide
+        sampled_response = sampled_spectrum([0.5, 1.0, 1.5, 2.0, 2.5], [1.0, 2.0, 3.0, 4.0, 5.0], [0.1, 0.2, 0.3, 0.4, 0.5])
+        breakdown = Predict_sampled_spectrum_response([0.75, 2.25, 1.0], [2.0, 1.0, 1.0], [0.0, 0.0, 0.0], sampled_response, breakdown = True)[0]
+        nuclides = breakdown.group([551370, 631540, 551370])
+        
+        self.assertEqual(list(nuclides.labels), [551370, 631540])
+        self.assertAlmostEqual(nuclides.contributions[0], 5.0, places=10)
+        self.assertEqual(nuclides.get_top(1)[0][0], 551370)
+        self.assertAlmostEqual(nuclides.prediction, 9.5, places=10)
+    
+    def test_gradients(self):
+        
+        spectrum = [3.0, 0.5, 4.0]
+        response = [2.0, 0.0, 5.0]
+        
+        result = Predict_binned_response(spectrum, [0, 0, 0], response, [0.2, 1.0, 0.5], gradients = True)
+        self.assertEqual(list(result.content_gradient), response)
+        self.assertEqual(list(result.response_gradient), spectrum)
+        
+        #The derivatives with respect to the sampled values, compared to finite differences
+        energies = [0.5, 1.0, 1.5, 2.0, 2.5]
+        sampled_values = [1.0, 2.5, 2.0, 4.0, 3.0]
+        line_energies = [0.75, 2.25, 1.1, 3.0]
+        intensities = [2.0, 1.0, 1.5, 1.0]
+        
+        result = Predict_sampled_response(line_energies, intensities, [0, 0, 0, 0], energies, sampled_values, [0.1] * 5, gradients = True)
+        self.assertEqual(result.content_gradient[3], 0)
+        
+        for i in range(0, len(energies)):
+            changed_values = list(sampled_values)
+            changed_values[i] += 1e-3
+            prediction, uncertainty = Predict_sampled_response(line_energies, intensities, [0, 0, 0, 0], energies, changed_values, [0.1] * 5)
+            self.assertAlmostEqual((prediction - result.prediction) / 1e-3, result.response_gradient[i], places=6)
+        
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
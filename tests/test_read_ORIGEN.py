@@ -36,7 +36,54 @@ class TestReadORIGENOutput(unittest.TestCase):
         isotope_contents = read_ORIGEN_isotope_contents("Example_ORIGEN_outputs/PWR_50MWd_test.out", "10.0 y", ["Cs137"])
         
         self.assertEqual(isotope_contents[0], 1.412E+03)
+        
+    def test_read_ORIGEN_output(self):
+        
+        #Read the file once, and get both gamma spectra and isotopes from it.
+        ORIGEN_data = read_ORIGEN_output("Example_ORIGEN_outputs/PWR_50MWd_test.out")
+        
+        self.assertEqual(len(ORIGEN_data.gamma_spectra), 2)
+        
+        bin_edges, bin_count = read_ORIGEN_gamma_spectrum(ORIGEN_data, "10.0 y")
+        self.assertEqual(bin_edges[16], 6.00E-1)
+        self.assertEqual(bin_count[16], 4.221E+15)
+        
+        #Actinides are listed in neutron source tables as well, only the nuclide concentrations should be read.
+        isotope_contents = read_ORIGEN_isotope_contents(ORIGEN_data, "10.0 y", ["Cs137", "Pu238"])
+        self.assertEqual(isotope_contents[0], 1.412E+03)
+        self.assertEqual(isotope_contents[1], 3.581E+02)
+        
+    def test_early_exit(self):
+        
+        with read_ORIGEN_output("Example_ORIGEN_outputs/PWR_50MWd_test.out") as ORIGEN_data:
+            
+            #The last gamma spectrum has the 10 year column, so only that table should be decoded.
+            bin_edges, bin_count = ORIGEN_data.get_gamma_spectrum("10.0 y")
+            self.assertEqual(bin_count[16], 4.221E+15)
+            self.assertEqual(len(ORIGEN_data.decoded_tables), 1)
+
+    def test_nuclide_table_arrays(self):
+        
+        with read_ORIGEN_output("Example_ORIGEN_outputs/PWR_50MWd_test.out") as ORIGEN_data:
+            
+            table = ORIGEN_data.nuclide_tables[-1]
+            self.assertEqual(table.values.shape, (len(table.nuclides), len(table.headers)))
+            
+            rows = table.get_rows([551370, 10])
+            self.assertEqual(rows[1], -1)
+            self.assertEqual(table.values[rows[0], table.get_column("10.0 y")], 1.412E+03)
           
     
+    def test_cases(self):
+        
+        with read_ORIGEN_output("Example_ORIGEN_outputs/PWR_50MWd_test.out") as ORIGEN_data:
+            
+            self.assertEqual(len(ORIGEN_data.cases), 13)
+            self.assertEqual(ORIGEN_data.cases[12].first_page, 180)
+            
+            cases, bin_edges, bin_counts = ORIGEN_data.get_gamma_spectrum_cases("0.1 y")
+            self.assertEqual([case.number for case in cases], [12])
+            self.assertEqual(bin_counts.shape, (len(bin_edges) - 1, 1))
+            
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
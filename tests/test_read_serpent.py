@@ -1,5 +1,9 @@
 
+import re
 import unittest
+import tempfile
+
+import numpy as np
 
 from clip.read_serpent_output import *
 
@@ -40,6 +44,18 @@ class TestReadSerpent(unittest.TestCase):
         self.assertAlmostEqual(binned_spectrum[0], 0, places=6)
         self.assertAlmostEqual(binned_spectrum[1], 0, places=6)
     
+    def test_binning_energy(self):
+        
+        bins = np.linspace(0.1, 3.0, 30)
+        energies = np.linspace(0.05, 3.05, 1000)
+        counts = np.ones(1000)
+        
+        #The binned spectrum preserves the total energy of the lines within the bins, also for split lines.
+        binned_spectrum = convert_to_ORIGEN_binning(energies, counts, bins)
+        inside = (energies > bins[0]) & (energies < bins[-1])
+        bin_mid_energies = (bins[:-1] + bins[1:])/2
+        self.assertAlmostEqual(np.sum(binned_spectrum * bin_mid_energies) / np.sum(energies[inside]), 1, places=12)
+        
     def test_read_serpent_gamma_spectrum(self):
         #Test reading in the Cs137 662 keV gamma line from a gamma spectrum file (Which actaully comes from Ba137m)
         
@@ -47,8 +63,18 @@ class TestReadSerpent(unittest.TestCase):
 
         #Ba-137m emission, which is often considered to be part of the Cs137 decay chain.
         self.assertTrue(6.61660E-01 in spectrum_energies)
-        position = spectrum_energies.index(6.61660E-01)
+        position = np.nonzero(spectrum_energies == 6.61660E-01)[0][0]
         self.assertAlmostEqual(spectrum_counts[position], 17967366148.532, places=2)
+        
+    def test_read_serpent_gamma_lines(self):
+        
+        nuclide_ZAI, spectrum_energies, spectrum_counts = read_serpent_gamma_lines("Example_Serpent_outputs/PWR_50MWd_10years_gamma.m")
+        
+        #The Ba-137m lines are listed first.
+        self.assertEqual(nuclide_ZAI.dtype, np.int64)
+        self.assertEqual(nuclide_ZAI[0], 561371)
+        self.assertEqual(len(nuclide_ZAI), len(spectrum_energies))
+        self.assertEqual(len(spectrum_energies), len(spectrum_counts))
     
     def test_read_serpent_isotope_contents(self):
         
@@ -56,5 +82,75 @@ class TestReadSerpent(unittest.TestCase):
         
         self.assertAlmostEqual(isotope_contents[0], 0.0128834663837, places=10)
     
+    def test_read_serpent_materials(self):
+        
+        material_names, material_volumes, isotope_contents = read_serpent_material_contents("Example_Serpent_outputs/PWR_50MWd_10years.bumat", ["Cs137", "Am242m"])
+        
+        self.assertEqual(material_names, ["UOXp1r1"])
+        self.assertEqual(material_volumes[0], 5.08958E-01)
+        self.assertEqual(isotope_contents.shape, (2, 1))
+        self.assertAlmostEqual(isotope_contents[0, 0], 0.0128834663837, places=10)
+        self.assertTrue(isotope_contents[1, 0] > 0)
+        
+        material_names, material_volumes, material_indices, nuclide_ZAI, spectrum_energies, spectrum_counts = read_serpent_material_gamma_lines("Example_Serpent_outputs/PWR_50MWd_10years_gamma.m")
+        self.assertEqual(material_names, ["UOX"])
+        self.assertEqual(material_volumes[0], 5.08958E-01)
+        self.assertTrue(all(material_indices == 0))
+    
+    def test_read_serpent_depletion(self):
+        
+        depletion = """
+ZAI = [
+551370
+952421
+666
+0
+];
+
+DAYS = [ 0.00000E+00 5.89125E+03 ];
+BU = [ 0.00000E+00 5.00000E+01 ];
+
+MAT_UOX_ADENS = [
+0.00000E+00 5.66705866961206E-05
+0.00000E+00 1.00000E-06
+0.00000E+00 0.00000E+00
+7.00000E-02 7.08768115243686E-02
+];
+"""
+        
+        with tempfile.TemporaryDirectory() as folder:
+            with open(folder + "/PWR_dep.m", "w") as f:
+                f.write(depletion)
+            burnups, days, isotope_contents = read_serpent_isotope_contents_series(folder + "/PWR_dep.m", ["Cs137", "Cs134"])
+        
+        self.assertEqual(list(days), [0, 5891.25])
+        self.assertEqual(list(burnups), [0, 50])
+        self.assertEqual(isotope_contents.shape, (2, 2))
+        self.assertAlmostEqual(isotope_contents[0, 1], 0.0128834663837, places=10)
+        self.assertEqual(isotope_contents[1, 1], 0)
+    
+    def test_read_serpent_bumat_series(self):
+        
+        with open("Example_Serpent_outputs/PWR_50MWd_10years.bumat") as f:
+            bumat = f.read()
+        
+        #An earlier step with half the contents
+        first_step = re.sub(r"([0-9.]+E[+-][0-9]+)$", lambda m: str(float(m.group(1)) / 2), bumat, flags=re.M)
+        first_step = first_step.replace("(50.00 MWd/kgU / 5891.25 days)", "(25.00 MWd/kgU / 2945.62 days)")
+        first_step = re.sub(r"mat .*$", "mat  UOXp1r1  3.5E-02 vol 5.08958E-01", first_step, count=1, flags=re.M)
+        
+        with tempfile.TemporaryDirectory() as folder:
+            with open(folder + "/PWR.bumat10", "w") as f:
+                f.write(bumat)
+            with open(folder + "/PWR.bumat2", "w") as f:
+                f.write(first_step)
+            
+            burnups, days, isotope_contents = read_serpent_isotope_contents_series([folder + "/PWR.bumat10", folder + "/PWR.bumat2"], ["Cs137"], workers = 2)
+        
+        self.assertEqual(list(burnups), [25, 50])
+        self.assertEqual(list(days), [2945.62, 5891.25])
+        self.assertAlmostEqual(isotope_contents[0, 0], 0.0128834663837 / 2, places=10)
+        self.assertAlmostEqual(isotope_contents[0, 1], 0.0128834663837, places=10)
+    
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,56 @@
+import os
+import unittest
+import tempfile
+
+from clip.response_library import *
+from clip.Clip import Clip
+
+class TestResponseLibrary(unittest.TestCase):
+
+    def test_compiled_library(self):
+
+        with tempfile.TemporaryDirectory() as folder:
+            library_filename = os.path.join(folder, "Data.cliplib")
+            compile_response_library("Data", library_filename)
+
+            self.assertTrue(is_response_library(library_filename))
+            self.assertFalse(is_response_library("Data"))
+
+            library = response_library(library_filename)
+            self.assertTrue("PWR17x17" in library.get_fuel_types("Isotope_gamma_response"))
+            self.assertEqual(library.get_provenance("Isotope_gamma_response", "PWR17x17")["file"], "Isotope_gamma_response/PWR17x17.txt")
+
+            #The same predictions as from the text responses
+            for gamma in ["binned", "sampled", "isotope"]:
+                text_predictor = Clip("Data")
+                text_predictor.set_prediction_parameters("PWR17x17", gamma, "isotope", "ORIGEN", "10.0 y")
+                library_predictor = Clip(library_filename)
+                library_predictor.set_prediction_parameters("PWR17x17", gamma, "isotope", "ORIGEN", "10.0 y")
+
+                self.assertEqual(library_predictor.predict("Example_ORIGEN_outputs/PWR_50MWd_test.out"), text_predictor.predict("Example_ORIGEN_outputs/PWR_50MWd_test.out"))
+
+            del library, library_predictor
+
+    def test_corrupt_library(self):
+
+        with tempfile.TemporaryDirectory() as folder:
+            library_filename = os.path.join(folder, "Data.cliplib")
+            compile_response_library("Data", library_filename)
+
+            #Change the first response value of a response
+            library = response_library(library_filename)
+            position = library.data_start + library.index["responses"]["Isotope_gamma_response"]["PWR17x17"]["arrays"]["mass_response"]["offset"]
+            del library
+            
+            with open(library_filename, "r+b") as f:
+                f.seek(position)
+                f.write(b"\x01")
+
+            library = response_library(library_filename)
+            self.assertRaises(ValueError, library.load_response, "Isotope_gamma_response", "PWR17x17")
+            library.load_response("Isotope_gamma_response", "BWR8x8-1")
+
+            del library
+
+if __name__ == '__main__':
+    unittest.main()
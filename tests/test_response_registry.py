@@ -0,0 +1,57 @@
+import os
+import shutil
+import unittest
+import tempfile
+
+from clip.response_registry import *
+from clip.Predict import Predict_ORIGEN
+
+class TestResponseRegistry(unittest.TestCase):
+
+    def tearDown(self):
+        set_data_folder("Data")
+        set_registry_size(default_registry_size)
+        clear_registry()
+
+    def test_registry(self):
+
+        with tempfile.TemporaryDirectory() as folder:
+            shutil.copytree("Data/Isotope_gamma_response", folder + "/Isotope_gamma_response")
+            set_data_folder(folder)
+
+            filename = get_response_filename("Isotope_gamma_response", "PWR17x17")
+            self.assertEqual(filename, os.path.join(folder, "Isotope_gamma_response", "PWR17x17.txt"))
+
+            #Parsed once
+            response = get_registered_isotope_response(filename)
+            self.assertIs(get_registered_isotope_response(filename), response)
+            self.assertTrue("Cs137" in response.get_response()[0])
+
+            #Parsed again when the file is modified
+            with open(filename) as f:
+                text = f.read()
+            with open(filename, "w") as f:
+                f.write(text.splitlines()[0] + "\n" + "\n".join([line for line in text.splitlines() if line.startswith("Cs137")]))
+            os.utime(filename, ns = (0, 0))
+
+            response = get_registered_isotope_response(filename)
+            self.assertEqual(response.get_response()[0], ["Cs137"])
+
+            #Least recently used responses are removed
+            set_registry_size(1)
+            get_registered_isotope_response(get_response_filename("Isotope_gamma_response", "BWR8x8-1"))
+            self.assertIsNot(get_registered_isotope_response(filename), response)
+
+    def test_Predict_ORIGEN_registry(self):
+
+        prediction, uncertainty = Predict_ORIGEN("Example_ORIGEN_outputs/PWR_50MWd_test.out", "10.0 y", "PWR17x17", "isotope", "isotope")
+        self.assertAlmostEqual(prediction, 1111343285500.0, places=6)
+
+        #The second prediction reuses the responses.
+        response = get_registered_isotope_response(get_response_filename("Isotope_gamma_response", "PWR17x17"))
+        prediction, uncertainty = Predict_ORIGEN("Example_ORIGEN_outputs/PWR_50MWd_test.out", "10.0 y", "PWR17x17", "isotope", "isotope")
+        self.assertIs(get_registered_isotope_response(get_response_filename("Isotope_gamma_response", "PWR17x17")), response)
+        self.assertAlmostEqual(prediction, 1111343285500.0, places=6)
+
+if __name__ == '__main__':
+    unittest.main()
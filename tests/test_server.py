@@ -0,0 +1,104 @@
+import os
+import json
+import shutil
+import unittest
+import tempfile
+import threading
+import concurrent.futures
+import urllib.request
+
+from clip.server import *
+
+class TestPredictionServer(unittest.TestCase):
+    
+    request = {"filename": "Example_ORIGEN_outputs/PWR_50MWd_test.out", "fuel": "PWR17x17", "beta": "isotope", "cooling_time": "10.0 y"}
+    
+    def test_service(self):
+        
+        service = prediction_service("Data")
+        
+        result = service.handle(self.request)
+        self.assertAlmostEqual(result["prediction"], 1116070414300.2612, places=6)
+        self.assertEqual(result["burnup_calculation"], "ORIGEN")
+        self.assertIsNone(result["error"])
+        
+        results = service.handle({"filenames": ["Example_Serpent_outputs/PWR_50MWd_10years_gamma.m", "Example_ORIGEN_outputs/missing.out"], "fuel": "PWR17x17", "cooling_time": "10.0 y"})["results"]
+        self.assertAlmostEqual(results[0]["prediction"], 4954354.283979443, places=6)
+        self.assertEqual(results[1]["error"]["type"], "FileNotFoundError")
+        
+        self.assertEqual(service.handle(dict(self.request, fuel = "XX"))["error"]["type"], "ConfigurationError")
+        self.assertEqual(service.handle({"command": "stop"})["error"]["type"], "RequestError")
+        self.assertEqual(json.loads(service.handle_text("{"))["error"]["type"], "RequestError")
+        self.assertEqual(service.handle({"command": "status"})["responses"]["Isotope_gamma_response"], 3)
+    
+    def test_concurrent_requests(self):
+        
+        service = prediction_service("Data")
+        requests = [self.request, dict(self.request, cooling_time = "99.0 y"), dict(self.request, fuel = "XX")] * 10
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers = 8) as executor:
+            results = list(executor.map(service.handle, requests))
+        
+        #Each request only gets its own errors.
+        for request, result in zip(requests, results):
+            if request["fuel"] == "XX":
+                self.assertEqual(result["error"]["type"], "ConfigurationError")
+                self.assertTrue("XX" in result["error"]["message"])
+            elif request["cooling_time"] == "99.0 y":
+                self.assertTrue("99.0 y" in result["error"]["message"])
+            else:
+                self.assertIsNone(result["error"])
+                self.assertAlmostEqual(result["prediction"], 1116070414300.2612, places=6)
+        
+        self.assertEqual(service.get_status()["requests"], len(requests))
+    
+    def test_reload(self):
+        
+        with tempfile.TemporaryDirectory() as folder:
+            shutil.copytree("Data/Isotope_gamma_response", folder + "/Isotope_gamma_response")
+            service = prediction_service(folder)
+            request = dict(self.request, gamma = "isotope", beta = "none")
+            
+            prediction = service.handle(request)["prediction"]
+            self.assertFalse(service.check_for_changes())
+            
+            #Only the Cs137 response is kept
+            filename = os.path.join(folder, "Isotope_gamma_response", "PWR17x17.txt")
+            with open(filename) as f:
+                lines = f.read().splitlines()
+            with open(filename, "w") as f:
+                f.write(lines[0] + "\n" + "\n".join([line for line in lines if line.startswith("Cs137")]))
+            os.utime(filename, ns = (0, 0))
+            
+            self.assertTrue(service.check_for_changes())
+            self.assertLess(service.handle(request)["prediction"], prediction)
+            self.assertEqual(service.handle({"command": "status"})["reloads"], 2)
+    
+    def test_servers(self):
+        
+        service = prediction_service("Data")
+        
+        with tempfile.TemporaryDirectory() as folder:
+            socket_path = os.path.join(folder, "clip.sock")
+            unix_server = unix_prediction_server(service, socket_path)
+            http_server = http_prediction_server(service, "127.0.0.1", 0)
+            
+            for server in [unix_server, http_server]:
+                threading.Thread(target = server.serve_forever, daemon = True).start()
+            
+            try:
+                result = send_request(socket_path, self.request)
+                self.assertAlmostEqual(result["prediction"], 1116070414300.2612, places=6)
+                
+                address = "http://127.0.0.1:" + str(http_server.server_address[1])
+                with urllib.request.urlopen(address, json.dumps(self.request).encode()) as response:
+                    self.assertEqual(json.loads(response.read()), result)
+                with urllib.request.urlopen(address + "/status") as response:
+                    self.assertEqual(json.loads(response.read())["data_folder"], "Data")
+            finally:
+                for server in [unix_server, http_server]:
+                    server.shutdown()
+                    server.server_close()
+    
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@
 import unittest
 
 from clip.setup_response_function import *
+from clip.Utils import sampled_spectrum
 
 class TestSetupResponeFunction(unittest.TestCase):
     
@@ -21,5 +22,28 @@ class TestSetupResponeFunction(unittest.TestCase):
         self.assertAlmostEqual(binned_response[1], 3.5, places = 10)    #smaller bin
         self.assertAlmostEqual(binned_response[2], 4.5, places = 10)    #smaller bin, and not sampled to the highest edge.
     
+    def test_cubic_response_function(self):
+        
+        #The cubic spline reproduces a cubic function, so the bin averages are exact.
+        sampled_energies = [0.0, 0.5, 1.0, 1.5, 2.0, 2.5]
+        sampled_response = [energy**3 for energy in sampled_energies]
+        bin_edges = [0.0, 1.0, 2.5, 3.0]
+        
+        binned_response = get_binned_response_function(sampled_energies, sampled_response, bin_edges)
+        
+        self.assertAlmostEqual(binned_response[0], 0.25, places = 12)
+        self.assertAlmostEqual(binned_response[1], (2.5**4 - 1) / 4 / 1.5, places = 12)
+        self.assertEqual(binned_response[2], 0)
+    
+    def test_binned_response_memoized(self):
+        
+        response = sampled_spectrum([0.1, 0.2, 0.3, 0.4, 0.5, 0.6], [0, 1, 2, 3, 4, 5], [0, 0.1, 0.2, 0.3, 0.4, 0.5])
+        
+        binned_response, binned_uncertainties = response.get_binned_response([0.2, 0.4, 0.5, 0.7])
+        self.assertAlmostEqual(binned_response[0], 2, places = 10)
+        self.assertAlmostEqual(binned_uncertainties[0], 0.2, places = 10)
+        
+        self.assertIs(response.get_binned_response([0.2, 0.4, 0.5, 0.7])[0], binned_response)
+    
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file